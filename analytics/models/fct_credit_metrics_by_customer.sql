@@ -12,7 +12,9 @@ WITH daily_aggregates AS (
         most_recent_statement_date_minus_180d,
         most_recent_statement_date_minus_365d,
         SUM(IF(is_revenue, deposits, 0)) as daily_revenue,
-        SUM(IF(is_debit, withdrawals, 0)) as daily_debits
+        SUM(IF(is_debit, withdrawals, 0)) as daily_debits,
+        SUM(IF(is_debit AND is_credit_card_payment, withdrawals, 0)) as daily_credit_card_payments,
+        SUM(IF(is_debit AND is_debt_payment, withdrawals, 0)) as daily_debt_payments
     FROM {{ ref('int_transactions_enriched') }}
     GROUP BY ALL
 )
@@ -86,10 +88,10 @@ SELECT
     SUM(IF(date >= most_recent_statement_date_minus_90d, daily_debits, 0)) AS debits_recent_90d,
     SUM(IF(date >= most_recent_statement_date_minus_180d AND date < most_recent_statement_date_minus_90d, daily_debits, 0)) AS debits_91_to_180d,
 
-    -- Placeholder Credit Metrics
-    0 AS credit_card_payments,
-    0 AS credit_card_recent_90d,
-    0 AS credit_card_91_to_180d,
+    -- Credit Metrics, from the payments categorized when the silver table was written
+    SUM(daily_credit_card_payments) AS credit_card_payments,
+    SUM(IF(date >= most_recent_statement_date_minus_90d, daily_credit_card_payments, 0)) AS credit_card_recent_90d,
+    SUM(IF(date >= most_recent_statement_date_minus_180d AND date < most_recent_statement_date_minus_90d, daily_credit_card_payments, 0)) AS credit_card_91_to_180d,
 
     -- Averages and Balances
     adb.average_daily_balance_180d AS average_daily_balance_across_bank_accounts,
@@ -101,7 +103,8 @@ SELECT
     MAX(drv.average_daily_revenue) as average_daily_revenue,
     MAX(dxp.average_daily_expense) as average_daily_expense,
     IF(SUM(dag.daily_revenue) * 2 > MAX(mrb.most_recent_balance), SUM(dag.daily_revenue) * 2, MAX(mrb.most_recent_balance)) AS smart_revenue,
-    0 AS existing_debt_payments_consideration,
+    -- Monthly credit card and debt payments over the last 90 days
+    ROUND(SUM(IF(date >= most_recent_statement_date_minus_90d, daily_credit_card_payments + daily_debt_payments, 0)) / 3, 2) AS existing_debt_payments_consideration,
     MAX(wrv.average_weekly_revenue) AS average_weekly_revenue
 FROM daily_aggregates AS dag
 LEFT JOIN average_daily_balance_180d AS adb USING(request_id, email)
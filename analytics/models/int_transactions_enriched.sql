@@ -3,13 +3,17 @@
 -- This model combines all transactions from the statements view
 -- and assigns a unique request_id.
 
--- CTE to calculate the most recent statement date per login_id
+-- CTE to calculate the most recent statement date per login_id.
+-- Silver is normalized, so the customer and account columns are joined back
+-- onto the transactions here, from the dimensions they are stored in.
 WITH transactions_with_latest_date AS (
     SELECT
         *,
         -- Cast the date column to TIMESTAMP to ensure correct date arithmetic
         MAX(CAST(date AS TIMESTAMP)) OVER(PARTITION BY login_id) as most_recent_statement_date
     FROM {{ ref('stg_transactions') }}
+    LEFT JOIN {{ ref('stg_customers') }} USING (email, request_id)
+    LEFT JOIN {{ ref('stg_accounts') }} USING (email, request_id, account_number)
 )
 
 ,enriched_transactions AS (
@@ -44,6 +48,12 @@ WITH transactions_with_latest_date AS (
         IF(deposits = '', NULL, CAST(deposits AS DOUBLE)) > 0 AS is_revenue,
         IF(withdrawals = '', NULL, CAST(withdrawals AS DOUBLE)) > 0 AS is_debit,
 
+        -- Category tagged from the description when the silver table was written
+        -- (pipelines/categorize.py); rows written before categorization have none.
+        COALESCE(transaction_category, '') AS transaction_category,
+        COALESCE(transaction_category = 'credit_card_payment', FALSE) AS is_credit_card_payment,
+        COALESCE(transaction_category = 'debt_payment', FALSE) AS is_debt_payment,
+
         -- Date columns for metrics calculations downstream
         most_recent_statement_date,
         (most_recent_statement_date - INTERVAL '30' DAY)::DATE AS most_recent_statement_date_minus_30d,
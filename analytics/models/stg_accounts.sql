@@ -0,0 +1,8 @@
+{{ config(materialized='table') }}
+
+-- This model reads the account dimension of the Silver layer: one row per
+-- account of a data request (email, request_id, account_number), with the
+-- account columns that every transaction of the account shares.
+-- SILVER_ACCOUNTS_TABLE_PATH scopes the model to a single analysis run's namespace.
+
+SELECT * FROM delta_scan("{{ env_var('SILVER_ACCOUNTS_TABLE_PATH', env_var('DATA_LAKE_ROOT', '..') ~ '/data_lake/silver_accounts') }}")
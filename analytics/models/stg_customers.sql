@@ -0,0 +1,8 @@
+{{ config(materialized='table') }}
+
+-- This model reads the customer dimension of the Silver layer: one row per
+-- data request (email, request_id), with the account holder and request
+-- columns that every transaction of the request shares.
+-- SILVER_CUSTOMERS_TABLE_PATH scopes the model to a single analysis run's namespace.
+
+SELECT * FROM delta_scan("{{ env_var('SILVER_CUSTOMERS_TABLE_PATH', env_var('DATA_LAKE_ROOT', '..') ~ '/data_lake/silver_customers') }}")
@@ -4,5 +4,19 @@
 -- By using delta_scan(), we instruct DuckDB's delta extension
 -- to correctly read the latest version of the table from the transaction log,
 -- ignoring any orphaned files from previous overwrites.
+-- SILVER_TABLE_PATH scopes the model to a single analysis run's namespace;
+-- by default the shared Silver table is read.
+-- Silver holds one row per transaction; the customer and account columns
+-- are in the stg_customers and stg_accounts dimensions. A silver table written
+-- before normalization still has them, NULL on newer rows, so they are left out
+-- here: otherwise they would shadow the dimensions' columns in the joins of
+-- int_transactions_enriched. The list matches CUSTOMER_COLUMNS and
+-- ACCOUNT_COLUMNS in pipelines/transform_statements.py.
+{% set dimension_columns = [
+    'username', 'address', 'financial_institution', 'employer_name', 'login_id',
+    'request_date_time', 'request_status', 'days_detected', 'tag',
+    'account_id', 'account_name', 'account_type', 'account_balance',
+] %}
 
-SELECT * FROM delta_scan("{{ env_var('DATA_LAKE_ROOT', '..') }}/data_lake/silver")
+SELECT COLUMNS(c -> c NOT IN ('{{ dimension_columns | join("', '") }}'))
+FROM delta_scan("{{ env_var('SILVER_TABLE_PATH', env_var('DATA_LAKE_ROOT', '..') ~ '/data_lake/silver') }}")
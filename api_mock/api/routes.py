@@ -3,48 +3,143 @@ import io
 import csv
 import zipfile
 import base64
+import itertools
+import json
+import time
+from datetime import date
 from uuid import uuid4
-from flask import Blueprint, jsonify, request, render_template, flash, send_from_directory, redirect, url_for, Response, current_app
-from api_mock.services import data_service
+from flask import Blueprint, jsonify, request, render_template, flash, send_from_directory, redirect, url_for, Response, current_app, g
+import pyarrow as pa
+from werkzeug.http import parse_etags, quote_etag
+from api_mock.services import data_service, fault_service, serialization
 import logging
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__, static_folder='static')
 
-@api_bp.route('/', methods=['GET'])
-def index():
-    """Serves the main page."""
-    current_app.logger.info("Serving index page.")
-    return render_template('index.html')
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ZIP_MIMETYPE = 'application/zip'
+# Streamed NDJSON is sent this many lines per chunk.
+NDJSON_ROWS_PER_CHUNK = 500
 
-@api_bp.route('/download', methods=['POST'])
-def download_statement():
+# Statement files are copied into the zip stream in chunks of this size, so a
+# download holds at most one chunk of each file in memory.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStreamBuffer:
     """
-    Handles statement download requests from the main page by email.
-    Returns a JSON response with base64-encoded CSV data for each account.
+    A write-only file for zipfile that hands out what was written so far.
+    It has no tell() or seek(), so zipfile writes sizes after each member's
+    data instead of seeking back to its header.
     """
-    email = request.form.get('email')
-    if not email:
-        current_app.logger.error("Download request received without an email address.")
-        return jsonify({'error': 'Email is required.'}), 400
 
-    current_app.logger.info(f"Download request received for email: {email}")
-    account_ids = data_service.get_account_ids_by_email(email)
+    def __init__(self):
+        self._chunks = []
 
-    if not account_ids:
-        # This is an API-like endpoint now, so we return JSON for errors too.
-        current_app.logger.warning(f"No accounts found for email: {email}")
-        return jsonify({'error': f"Email '{email}' not found."}), 404
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def _ndjson_chunks(rows, rows_per_chunk: int = NDJSON_ROWS_PER_CHUNK):
+    """Serializes rows as NDJSON, a chunk of several lines at a time."""
+    while batch := list(itertools.islice(rows, rows_per_chunk)):
+        yield ''.join(json.dumps(row) + '\n' for row in batch)
+
+
+def _stream_zip(files, chunk_size: int):
+    """Yields a deflated zip archive of (archive name, path on disk) files, chunk by chunk."""
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for archive_name, path in files:
+            with open(path, 'rb') as source, archive.open(archive_name, mode='w') as member:
+                while chunk := source.read(chunk_size):
+                    member.write(chunk)
+                    if data := buffer.drain():
+                        yield data
+    # Closing the archive writes the last member's sizes and the central directory.
+    yield buffer.drain()
 
+
+# The request handling below is shared by the Flask routes and the ASGI app in
+# `api_mock.asgi`, which only adapt requests and responses. Each *_result
+# function returns (status, body, mimetype, headers), where the body is
+# JSON-serializable data for JSON responses, bytes, or an iterator of chunks
+# to stream, or None for a 304.
+
+def _error(message: str, status: int) -> tuple:
+    return status, {'error': message}, serialization.JSON_MIMETYPE, {}
+
+def _json_result(payload, headers: dict | None = None) -> tuple:
+    return 200, payload, serialization.JSON_MIMETYPE, headers or {}
+
+def _conditional(etag: str | None, if_none_match: str | None) -> tuple[tuple | None, dict]:
+    """
+    Returns a 304 result if the client's If-None-Match header matches the
+    statement ETag, or None, and the headers that carry the ETag either way.
+    """
+    if etag is None:
+        return None, {}
+    headers = {'ETag': quote_etag(etag)}
+    if parse_etags(if_none_match).contains(etag):
+        return (304, None, None, headers), headers
+    return None, headers
+
+def _parse_from_date(value) -> str | None:
+    """Returns a FromDate as an ISO date, or raises ValueError if it is not one."""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError('FromDate must be a date in YYYY-MM-DD format.') from None
+
+def _parse_pagination(limit: str | None, cursor: str) -> tuple[int | None, int]:
+    """Returns the page size and start position of /api/statements, or raises ValueError if they are invalid."""
+    if limit is not None and (not limit.isdigit() or int(limit) == 0):
+        raise ValueError('limit must be a positive integer.')
+    if not cursor.isdigit():
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+    return (int(limit) if limit is not None else None), int(cursor)
+
+def _combined_rows(account_ids, start: int, limit: int | None):
+    """
+    Returns an iterator over the combined transactions from `start`, at most
+    `limit` of them, or None if there are none, and the cursor of the next page.
+    The first transaction is read up front, so that an empty result is known
+    before the response starts.
+    """
+    transactions = data_service.iter_combined_transactions(account_ids, start)
+    if limit is not None:
+        page = list(itertools.islice(transactions, limit + 1))
+        next_cursor = str(page[limit - 1][0] + 1) if len(page) > limit else None
+        transactions = iter(page[:limit])
+    else:
+        next_cursor = None
+    first = next(transactions, None)
+    if first is None:
+        return None, next_cursor
+    return (row for _, row in itertools.chain([first], transactions)), next_cursor
+
+def _encoded_statements(account_ids) -> list:
+    """Returns each account's transactions as a base64-encoded CSV, skipping accounts without any."""
     statements_data = []
-    current_app.logger.info(f"Found {len(account_ids)} account(s) for email: {email}")
     for account_id in account_ids:
-        account_details = next((acc for acc in data_service.ACCOUNTS if acc['Id'] == account_id), {})
+        account_details = data_service.get_account(account_id) or {}
         transactions, headers = data_service.load_raw_transactions(account_id)
 
         if not transactions:
-            current_app.logger.info(f"No transactions found for account ID: {account_id}. Skipping.")
+            logger.info(f"No transactions found for account ID: {account_id}. Skipping.")
             continue
 
         output = io.StringIO()
@@ -62,105 +157,395 @@ def download_statement():
             'FileName': f"statement_{account_details.get('AccountNumber')}.csv",
             'Content_Base64': csv_base64
         })
+    return statements_data
 
-    if not statements_data:
-        current_app.logger.warning(f"No transactions found across all accounts for email: {email}")
-        return jsonify({'error': f"No transactions found for email '{email}'."}), 404
-
-    current_app.logger.info(f"Successfully prepared {len(statements_data)} statement(s) for email: {email}")
-    return jsonify({
-        'Email': email,
-        'Statements': statements_data
-    })
-
-@api_bp.route('/api/statements', methods=['GET'])
-def get_combined_statements_by_email():
-    """
-    A simple endpoint to get all transactions for a given email,
-    combined from multiple statements into a single list.
-    """
-    email = request.args.get('email')
-    if not email:
-        return jsonify({'error': 'Email query parameter is required.'}), 400
-
-    current_app.logger.info(f"Combined statement request received for email: {email}")
-    account_ids = data_service.get_account_ids_by_email(email)
-
-    if not account_ids:
-        return jsonify({'error': f"Email '{email}' not found."}), 404
-
-    all_transactions = []
-    # Use a set to keep track of seen transaction identifiers to avoid duplicates
-    # assuming a tuple of key fields can uniquely identify a transaction
-    seen_transactions = set()
-
-    for account_id in account_ids:
-        transactions, _ = data_service.load_raw_transactions(account_id)
-        for t in transactions:
-            # Create a unique identifier for the transaction to avoid duplicates
-            # This assumes that (Date, Description, Amount) is unique. Adjust if needed.
-            transaction_id = (t.get('Date'), t.get('Description'), t.get('Deposits'), t.get('Withdrawals'))
-            if transaction_id not in seen_transactions:
-                all_transactions.append(t)
-                seen_transactions.add(transaction_id)
-
-    if not all_transactions:
-        return jsonify({'error': f"No transactions found for email '{email}'."}), 404
-
-    current_app.logger.info(f"Successfully combined {len(all_transactions)} transactions for email: {email}")
-    return jsonify(all_transactions)
-
-@api_bp.route('/v3/<uuid:customerId>/BankingServices/Authorize', methods=['POST'])
-def authorize(customerId):
-    """Mock Authorize endpoint."""
-    return jsonify({
+def authorize_result() -> tuple:
+    return _json_result({
         'LoginId': str(uuid4()),
         'RequestId': str(uuid4()),
         'StatusCode': 200,
     })
 
-@api_bp.route('/v3/<uuid:customerId>/BankingServices/GetAccountsDetail', methods=['POST'])
-def get_accounts_detail(customerId):
-    """Mock GetAccountsDetail endpoint."""
-    data = request.get_json()
+def accounts_detail_result(data) -> tuple:
+    """GetAccountsDetail, for the parsed JSON body (None if there is none)."""
     if not data or 'LoginId' not in data:
-        return jsonify({'error': 'LoginId is required'}), 400
+        return _error('LoginId is required', 400)
 
     accounts = data_service.get_accounts()
-    return jsonify({
+    return _json_result({
         'Accounts': accounts,
         'Login': {'Id': data['LoginId']},
         'Institution': 'Flinks Capital',
         'RequestId': str(uuid4()),
     })
 
-@api_bp.route('/v3/<uuid:customerId>/BankingServices/GetStatements', methods=['POST'])
-def get_statements(customerId):
-    """Mock GetStatements endpoint."""
-    data = request.get_json()
+def statements_result(data, accept_mimetypes, if_none_match: str | None = None) -> tuple:
+    """GetStatements, for the parsed JSON body and the client's Accept and If-None-Match headers."""
     if not data or 'LoginId' not in data:
-        return jsonify({'error': 'LoginId is required'}), 400
+        return _error('LoginId is required', 400)
 
     account_number = data.get('AccountNumber')
     if not account_number:
-        return jsonify({'error': 'AccountNumber is required'}), 400
+        return _error('AccountNumber is required', 400)
+
+    try:
+        from_date = _parse_from_date(data.get('FromDate'))
+    except ValueError as e:
+        return _error(str(e), 400)
 
     # Look up the internal account ID from the account number
     account_id = data_service.get_account_id_by_number(account_number)
     if not account_id:
-        return jsonify({'error': f"Account with AccountNumber '{account_number}' not found."}), 404
+        return _error(f"Account with AccountNumber '{account_number}' not found.", 404)
+
+    mimetype = serialization.negotiate(accept_mimetypes, (serialization.JSON_MIMETYPE, *serialization.TABLE_MIMETYPES))
+    etag = data_service.statement_etag([account_id], mimetype, from_date)
+    not_modified, headers = _conditional(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
+    statement_id, request_id = str(uuid4()), str(uuid4())
+    if mimetype != serialization.JSON_MIMETYPE:
+        # The transactions are sent as a table; the rest of the envelope travels in its schema metadata.
+        table = data_service.load_transactions_table(account_id, from_date)
+        if table is None:
+            table = pa.table({})
+        metadata = {'StatementId': statement_id, 'AccountId': account_id, 'LoginId': str(data['LoginId']), 'RequestId': request_id}
+        return 200, serialization.serialize_table(table, mimetype, metadata), mimetype, headers
 
     # The rest of the logic uses the internal account_id
-    transactions = data_service.load_transactions(account_id)
+    transactions = data_service.load_transactions(account_id, from_date)
 
-    return jsonify({
+    return _json_result({
         'Statements': [
             {
-                'Id': str(uuid4()),
+                'Id': statement_id,
                 'AccountId': account_id,
                 'Transactions': transactions,
             }
         ],
         'Login': {'Id': data['LoginId']},
-        'RequestId': str(uuid4()),
+        'RequestId': request_id,
+    }, headers)
+
+def bulk_statements_result(data, accept_mimetypes) -> tuple:
+    """
+    GetStatementsBulk, for the parsed JSON body and the client's Accept header:
+    the statements of several accounts, or of every account of the login, in
+    one response. Accounts whose statement matches the ETag sent for it are
+    listed as not modified instead.
+    """
+    if not data or 'LoginId' not in data:
+        return _error('LoginId is required', 400)
+
+    account_numbers = data.get('AccountNumbers')
+    if account_numbers is None:
+        # Every account of the login; the mock has a single login with all of them.
+        account_numbers = [account['AccountNumber'] for account in data_service.get_accounts() if 'AccountNumber' in account]
+    elif not isinstance(account_numbers, list) or not account_numbers:
+        return _error('AccountNumbers must be a non-empty list.', 400)
+    from_dates, etags = data.get('FromDates') or {}, data.get('ETags') or {}
+    if not isinstance(from_dates, dict) or not isinstance(etags, dict):
+        return _error('FromDates and ETags must map account numbers to values.', 400)
+    try:
+        from_dates = {number: _parse_from_date(value) for number, value in from_dates.items()}
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    account_ids = {number: data_service.get_account_id_by_number(number) for number in account_numbers}
+    missing = [number for number, account_id in account_ids.items() if not account_id]
+    if missing:
+        return _error(f"Accounts with AccountNumber {', '.join(map(repr, missing))} not found.", 404)
+
+    mimetype = serialization.negotiate(accept_mimetypes, (serialization.JSON_MIMETYPE, *serialization.TABLE_MIMETYPES))
+    # Each account's ETag is the one GetStatements sends for it, so clients can mix both endpoints.
+    statements, not_modified = [], []
+    for number, account_id in account_ids.items():
+        etag = data_service.statement_etag([account_id], mimetype, from_dates.get(number))
+        if etag is not None and parse_etags(etags.get(number)).contains(etag):
+            not_modified.append(number)
+        else:
+            statements.append((number, account_id, quote_etag(etag) if etag is not None else None))
+    logger.info(f"Bulk statement request for {len(account_ids)} account(s), {len(not_modified)} not modified")
+
+    request_id = str(uuid4())
+    if mimetype != serialization.JSON_MIMETYPE:
+        tables = []
+        for number, account_id, _ in statements:
+            table = data_service.load_transactions_table(account_id, from_dates.get(number))
+            if table is not None:
+                tables.append(table.append_column('AccountNumber', pa.array([number] * table.num_rows, pa.string())))
+        metadata = {
+            'LoginId': str(data['LoginId']),
+            'RequestId': request_id,
+            'ETags': json.dumps({number: etag for number, _, etag in statements if etag is not None}),
+            'NotModified': json.dumps(not_modified),
+        }
+        if mimetype == serialization.ARROW_STREAM_MIMETYPE:
+            schema = pa.unify_schemas([table.schema for table in tables]) if tables else pa.schema([])
+            return 200, serialization.stream_tables(tables, schema, metadata), mimetype, {}
+        table = pa.concat_tables(tables, promote_options='permissive') if tables else pa.table({})
+        return 200, serialization.serialize_table(table, mimetype, metadata), mimetype, {}
+
+    return _json_result({
+        'Statements': [
+            {
+                'Id': str(uuid4()),
+                'AccountId': account_id,
+                'AccountNumber': number,
+                'ETag': etag,
+                'Transactions': data_service.load_transactions(account_id, from_dates.get(number)),
+            }
+            for number, account_id, etag in statements
+        ],
+        'NotModified': not_modified,
+        'Login': {'Id': data['LoginId']},
+        'RequestId': request_id,
     })
+
+def combined_statements_result(args, accept_mimetypes, if_none_match: str | None = None) -> tuple:
+    """/api/statements, for the query parameters and the client's Accept and If-None-Match headers."""
+    email = args.get('email')
+    if not email:
+        return _error('Email query parameter is required.', 400)
+    try:
+        limit, start = _parse_pagination(args.get('limit'), args.get('cursor', '0'))
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    logger.info(f"Combined statement request received for email: {email}")
+    account_ids = data_service.get_account_ids_by_email(email)
+
+    if not account_ids:
+        return _error(f"Email '{email}' not found.", 404)
+
+    mimetype = serialization.negotiate(
+        accept_mimetypes, (serialization.JSON_MIMETYPE, NDJSON_MIMETYPE, *serialization.TABLE_MIMETYPES))
+    etag = data_service.statement_etag(account_ids, mimetype, start, limit)
+    not_modified, etag_headers = _conditional(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
+    if mimetype in serialization.TABLE_MIMETYPES:
+        table, next_cursor = data_service.combined_transactions_table(account_ids, start, limit)
+        if table.num_rows == 0 and start == 0:
+            return _error(f"No transactions found for email '{email}'.", 404)
+        logger.info(f"Sending {table.num_rows} combined transactions for email {email} as {mimetype}")
+        headers = {'X-Next-Cursor': str(next_cursor)} if next_cursor is not None else {}
+        return 200, serialization.serialize_table(table, mimetype), mimetype, {**etag_headers, **headers}
+
+    rows, next_cursor = _combined_rows(account_ids, start, limit)
+    if rows is None and start == 0:
+        return _error(f"No transactions found for email '{email}'.", 404)
+    rows = rows if rows is not None else iter(())
+
+    if mimetype == NDJSON_MIMETYPE:
+        logger.info(f"Streaming combined transactions for email: {email}")
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return 200, _ndjson_chunks(rows), NDJSON_MIMETYPE, {**etag_headers, **headers}
+
+    all_transactions = list(rows)
+    logger.info(f"Successfully combined {len(all_transactions)} transactions for email: {email}")
+    if limit is not None:
+        # The cursor is in a header too, so that clients can follow the pages whatever the format.
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return _json_result({'Transactions': all_transactions, 'NextCursor': next_cursor}, {**etag_headers, **headers})
+    return _json_result(all_transactions, etag_headers)
+
+def download_result(email: str | None) -> tuple:
+    """The base64-encoded statements of an email, for /download."""
+    if not email:
+        logger.error("Download request received without an email address.")
+        return _error('Email is required.', 400)
+
+    logger.info(f"Download request received for email: {email}")
+    account_ids = data_service.get_account_ids_by_email(email)
+
+    if not account_ids:
+        # This is an API-like endpoint now, so we return JSON for errors too.
+        logger.warning(f"No accounts found for email: {email}")
+        return _error(f"Email '{email}' not found.", 404)
+
+    logger.info(f"Found {len(account_ids)} account(s) for email: {email}")
+    statements_data = _encoded_statements(account_ids)
+
+    if not statements_data:
+        logger.warning(f"No transactions found across all accounts for email: {email}")
+        return _error(f"No transactions found for email '{email}'.", 404)
+
+    logger.info(f"Successfully prepared {len(statements_data)} statement(s) for email: {email}")
+    return _json_result({
+        'Email': email,
+        'Statements': statements_data
+    })
+
+def download_zip_result(email: str | None) -> tuple:
+    """The streamed zip of an email's statement files, for /download/zip."""
+    if not email:
+        logger.error("Zip download request received without an email address.")
+        return _error('Email is required.', 400)
+
+    account_ids = data_service.get_account_ids_by_email(email)
+    if not account_ids:
+        logger.warning(f"No accounts found for email: {email}")
+        return _error(f"Email '{email}' not found.", 404)
+
+    files = []
+    for account_id in account_ids:
+        path = data_service.get_statement_path(account_id)
+        if path is not None:
+            account_number = (data_service.get_account(account_id) or {}).get('AccountNumber')
+            files.append((f"statement_{account_number}.csv", path))
+    if not files:
+        logger.warning(f"No statement files found for email: {email}")
+        return _error(f"No transactions found for email '{email}'.", 404)
+
+    logger.info(f"Streaming {len(files)} statement file(s) for email: {email}")
+    safe_email = ''.join(c if c.isalnum() else '_' for c in email)
+    headers = {'Content-Disposition': f'attachment; filename="statements_{safe_email}.zip"'}
+    return 200, _stream_zip(files, DOWNLOAD_CHUNK_SIZE), ZIP_MIMETYPE, headers
+
+def _flask_response(result: tuple):
+    status, body, mimetype, headers = result
+    if body is None:
+        return Response(status=status, headers=headers)
+    if mimetype == serialization.JSON_MIMETYPE and not isinstance(body, bytes):
+        return jsonify(body), status, headers
+    return Response(body, status=status, mimetype=mimetype, headers=headers)
+
+@api_bp.before_request
+def inject_faults():
+    """
+    Applies the active fault profile (see `fault_service`) to the request:
+    waits out its latency, then answers 429 or a 5xx instead of the endpoint
+    when the profile says so. Injected responses carry an X-Mock-Fault header.
+    """
+    endpoint = (request.endpoint or '').rpartition('.')[2]
+    if endpoint in ('', 'static'):
+        return None
+    profile_name = fault_service.active_profile_name(request.headers.get(fault_service.PROFILE_HEADER))
+    try:
+        faults = fault_service.plan_faults(profile_name, endpoint)
+    except KeyError:
+        return jsonify({'error': f"Unknown fault profile '{profile_name}'."}), 400
+
+    if faults['delay_s']:
+        time.sleep(faults['delay_s'])
+    injected = fault_service.injected_response(faults)
+    if injected is not None:
+        status, payload, headers = injected
+        current_app.logger.info(f"Answering {endpoint} with {status} under fault profile '{profile_name}'.")
+        return jsonify(payload), status, headers
+    g.truncate_fraction = faults.get('truncate_fraction')
+    return None
+
+@api_bp.after_request
+def truncate_response(response):
+    """Cuts the body short when the fault profile drew a truncation (see `fault_service.truncate_body`)."""
+    fraction = g.pop('truncate_fraction', None)
+    if fraction is None:
+        return response
+    if response.is_streamed:
+        # Cut the stream as it is sent, rather than buffering all of it first.
+        limit = int((response.content_length or fault_service.STREAM_TRUNCATE_BYTES) * fraction)
+        chunks = response.response
+        response.response = fault_service.truncate_chunks(response.iter_encoded(), limit)
+        if hasattr(chunks, 'close'):
+            response.call_on_close(chunks.close)
+        response.headers.update({'Connection': 'close', 'X-Mock-Fault': 'truncated'})
+        return response
+    body, headers = fault_service.truncate_body(response.get_data(), fraction)
+    response.set_data(body)
+    response.headers.update(headers)
+    return response
+
+@api_bp.route('/', methods=['GET'])
+def index():
+    """Serves the main page."""
+    current_app.logger.info("Serving index page.")
+    return render_template('index.html')
+
+@api_bp.route('/download', methods=['POST'])
+def download_statement():
+    """
+    Handles statement download requests from the main page by email.
+    Returns a JSON response with base64-encoded CSV data for each account.
+    """
+    return _flask_response(download_result(request.form.get('email')))
+
+@api_bp.route('/download/zip', methods=['GET', 'POST'])
+def download_statements_zip():
+    """
+    Streams a zip of the original statement files of every account associated
+    with an email, read from disk in chunks rather than loaded into memory.
+    The email is taken from the form or the query string.
+    """
+    return _flask_response(download_zip_result(request.values.get('email')))
+
+@api_bp.route('/api/statements', methods=['GET'])
+def get_combined_statements_by_email():
+    """
+    Returns all transactions for a given email, combined from multiple
+    statements into a single list, without duplicates.
+
+    - With `limit`, returns one page of at most `limit` transactions as
+      `{"Transactions": [...], "NextCursor": ...}`; pass `NextCursor` back as
+      `cursor` for the next page. It is null after the last page, and is
+      also sent in the `X-Next-Cursor` header while there is one.
+    - With `Accept: application/x-ndjson`, streams one transaction per line as
+      it is deduplicated, and the cursor of the next page, if any, in the
+      `X-Next-Cursor` header.
+    - With `Accept: application/vnd.apache.arrow.stream` or
+      `application/vnd.apache.parquet`, returns the transactions as one table
+      in that format, with the next cursor in the same header.
+
+    Responses carry a strong ETag of the statements they were read from; a
+    request whose If-None-Match matches it is answered with a 304.
+    """
+    return _flask_response(combined_statements_result(
+        request.args, request.accept_mimetypes, request.headers.get('If-None-Match')))
+
+@api_bp.route('/v3/<uuid:customerId>/BankingServices/Authorize', methods=['POST'])
+def authorize(customerId):
+    """Mock Authorize endpoint."""
+    return _flask_response(authorize_result())
+
+@api_bp.route('/v3/<uuid:customerId>/BankingServices/GetAccountsDetail', methods=['POST'])
+def get_accounts_detail(customerId):
+    """Mock GetAccountsDetail endpoint."""
+    return _flask_response(accounts_detail_result(request.get_json(silent=True)))
+
+@api_bp.route('/v3/<uuid:customerId>/BankingServices/GetStatements', methods=['POST'])
+def get_statements(customerId):
+    """
+    Mock GetStatements endpoint.
+
+    With `Accept: application/vnd.apache.arrow.stream` or
+    `application/vnd.apache.parquet`, the transactions are returned as a table
+    in that format, with the statement id, account id, login id and request id
+    in its schema metadata.
+
+    With `FromDate` (YYYY-MM-DD) in the body, only the transactions dated
+    that day or later are returned, so a client can fetch just the days after
+    the last ones it has.
+
+    Responses carry a strong ETag of the account's statement file, in the
+    negotiated format; a request whose If-None-Match matches it is answered
+    with a 304 and no body.
+    """
+    return _flask_response(statements_result(
+        request.get_json(silent=True), request.accept_mimetypes, request.headers.get('If-None-Match')))
+
+@api_bp.route('/v3/<uuid:customerId>/BankingServices/GetStatementsBulk', methods=['POST'])
+def get_statements_bulk(customerId):
+    """
+    Bulk GetStatements: the statements of the accounts in `AccountNumbers`,
+    or of every account of the login without it, in one response.
+
+    `FromDates` and `ETags` map account numbers to the FromDate and the
+    If-None-Match of GetStatements; accounts whose ETag still matches are
+    listed in `NotModified` rather than sent again. As an Arrow IPC stream,
+    the transactions are streamed one account at a time, with an
+    `AccountNumber` column and the ETags in the schema metadata.
+    """
+    return _flask_response(bulk_statements_result(request.get_json(silent=True), request.accept_mimetypes))
@@ -0,0 +1,200 @@
+"""
+ASGI serving mode for the mock API.
+
+Serves the routes of the Flask blueprint in `api_mock.api.routes` as async
+Starlette handlers, so that a production ASGI server can run them in several
+worker processes. The handlers share the blueprint's request handling (its
+*_result functions) and fault profiles, and only adapt requests and responses:
+
+    uvicorn api_mock.asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+Statement reads and serialization block, so they run in the thread pool;
+injected latency is awaited, so a slow request holds no thread while it waits.
+Fault-profile rate limits are kept by each worker process, so with N workers
+a profile's `requests_per_second` allows up to N times as many requests.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+from urllib.parse import parse_qsl
+
+import jinja2
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from api_mock.api import routes
+from api_mock.services import fault_service, serialization
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The page's template calls Flask's url_for for its static files.
+_templates = jinja2.Environment(loader=jinja2.FileSystemLoader(os.path.join(PACKAGE_DIR, 'templates')), autoescape=True)
+_templates.globals['url_for'] = lambda endpoint, filename: f"/{endpoint}/{filename}"
+
+
+def _json(payload, status_code: int = 200, headers: dict | None = None) -> Response:
+    return Response(json.dumps(payload), status_code=status_code, headers=headers, media_type=serialization.JSON_MIMETYPE)
+
+
+def _error(message: str, status_code: int) -> Response:
+    return _json({'error': message}, status_code)
+
+
+def _accept_mimetypes(request: Request) -> MIMEAccept:
+    return parse_accept_header(request.headers.get('accept'), MIMEAccept)
+
+
+async def _json_body(request: Request):
+    """Returns the request's JSON body, or None if it has none or it is not valid JSON."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def _form(request: Request) -> dict:
+    """Returns the URL-encoded form fields of the request body."""
+    if not request.headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+        return {}
+    return dict(parse_qsl((await request.body()).decode('utf-8')))
+
+
+class _TruncatedResponse(Response):
+    """
+    Sends the start of a body under its full Content-Length, then stops. The
+    server closes the connection of a response left incomplete (uvicorn logs
+    it as an error), so the client sees the transfer break off mid-response.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        await send({'type': 'http.response.body', 'body': self.body, 'more_body': True})
+
+
+async def _truncated(response: Response, fraction: float) -> Response:
+    """Returns the response with its body cut short (see `fault_service.truncate_body`)."""
+    if isinstance(response, StreamingResponse):
+        chunks = [chunk if isinstance(chunk, bytes) else chunk.encode(response.charset)
+                  async for chunk in response.body_iterator]
+        body = b''.join(chunks)
+    else:
+        body = response.body
+    partial, fault_headers = fault_service.truncate_body(body, fraction)
+    # The connection is closed by leaving the response incomplete, not by a Connection header.
+    fault_headers.pop('Connection')
+    headers = {name: value for name, value in response.headers.items() if name != 'content-length'}
+    return _TruncatedResponse(partial, status_code=response.status_code, headers={**headers, **fault_headers})
+
+
+def _with_faults(handler):
+    """Applies the active fault profile to a handler, under the name of the matching Flask endpoint."""
+    endpoint = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(request: Request) -> Response:
+        profile_name = fault_service.active_profile_name(request.headers.get(fault_service.PROFILE_HEADER))
+        try:
+            faults = fault_service.plan_faults(profile_name, endpoint)
+        except KeyError:
+            return _error(f"Unknown fault profile '{profile_name}'.", 400)
+        if faults['delay_s']:
+            await asyncio.sleep(faults['delay_s'])
+        injected = fault_service.injected_response(faults)
+        if injected is not None:
+            status_code, payload, headers = injected
+            return _json(payload, status_code, headers)
+        response = await handler(request)
+        if 'truncate_fraction' in faults:
+            response = await _truncated(response, faults['truncate_fraction'])
+        return response
+    return wrapper
+
+
+def _response(result: tuple) -> Response:
+    status, body, mimetype, headers = result
+    if body is None:
+        return Response(status_code=status, headers=headers)
+    if mimetype == serialization.JSON_MIMETYPE and not isinstance(body, bytes):
+        return _json(body, status, headers)
+    if isinstance(body, bytes):
+        return Response(body, status_code=status, media_type=mimetype, headers=headers)
+    # Starlette iterates a synchronous generator in the thread pool.
+    return StreamingResponse(body, status_code=status, media_type=mimetype, headers=headers)
+
+
+@_with_faults
+async def index(request: Request) -> Response:
+    return HTMLResponse(_templates.get_template('index.html').render())
+
+
+@_with_faults
+async def authorize(request: Request) -> Response:
+    return _response(routes.authorize_result())
+
+
+@_with_faults
+async def get_accounts_detail(request: Request) -> Response:
+    return _response(routes.accounts_detail_result(await _json_body(request)))
+
+
+@_with_faults
+async def get_statements(request: Request) -> Response:
+    data, accept = await _json_body(request), _accept_mimetypes(request)
+    if_none_match = request.headers.get('if-none-match')
+    return _response(await run_in_threadpool(routes.statements_result, data, accept, if_none_match))
+
+
+@_with_faults
+async def get_statements_bulk(request: Request) -> Response:
+    data, accept = await _json_body(request), _accept_mimetypes(request)
+    return _response(await run_in_threadpool(routes.bulk_statements_result, data, accept))
+
+
+@_with_faults
+async def get_combined_statements_by_email(request: Request) -> Response:
+    args, accept = request.query_params, _accept_mimetypes(request)
+    if_none_match = request.headers.get('if-none-match')
+    return _response(await run_in_threadpool(routes.combined_statements_result, args, accept, if_none_match))
+
+
+@_with_faults
+async def download_statement(request: Request) -> Response:
+    email = (await _form(request)).get('email')
+    return _response(await run_in_threadpool(routes.download_result, email))
+
+
+@_with_faults
+async def download_statements_zip(request: Request) -> Response:
+    email = {**request.query_params, **(await _form(request))}.get('email')
+    return _response(await run_in_threadpool(routes.download_zip_result, email))
+
+
+def create_asgi_app() -> Starlette:
+    """Creates the ASGI application with the mock API routes."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    return Starlette(routes=[
+        Route('/', index, methods=['GET']),
+        Route('/download', download_statement, methods=['POST']),
+        Route('/download/zip', download_statements_zip, methods=['GET', 'POST']),
+        Route('/api/statements', get_combined_statements_by_email, methods=['GET']),
+        Route('/v3/{customerId:uuid}/BankingServices/Authorize', authorize, methods=['POST']),
+        Route('/v3/{customerId:uuid}/BankingServices/GetAccountsDetail', get_accounts_detail, methods=['POST']),
+        Route('/v3/{customerId:uuid}/BankingServices/GetStatements', get_statements, methods=['POST']),
+        Route('/v3/{customerId:uuid}/BankingServices/GetStatementsBulk', get_statements_bulk, methods=['POST']),
+        Mount('/static', StaticFiles(directory=os.path.join(PACKAGE_DIR, 'static')), name='static'),
+    ])
+
+
+app = create_asgi_app()
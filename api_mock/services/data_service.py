@@ -1,42 +1,105 @@
+import bisect
 import csv
+import hashlib
+import io
+import itertools
 import os
 import json
 import logging
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, Iterator, List
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.json')
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
 
-def _load_config():
-    """Loads configuration from config.json."""
+# Both can be overridden to serve another dataset, such as synthetic statements.
+DATA_DIR = os.getenv("API_MOCK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+CONFIG_PATH = os.getenv("API_MOCK_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.json'))
+
+def _load_config() -> Dict[str, Any] | None:
+    """Loads configuration from config.json, or returns None if it cannot be read."""
     if not os.path.exists(CONFIG_PATH):
         logging.error(f"Config file not found at {CONFIG_PATH}")
-        return {"accounts": []}
+        return None
     try:
         with open(CONFIG_PATH, 'r') as f:
             return json.load(f)
     except json.JSONDecodeError as e:
         logging.error(f"Error decoding JSON from {CONFIG_PATH}: {e}")
-        return {"accounts": []}
-
-_config = _load_config()
-ACCOUNTS = _config.get("accounts", [])
-STATEMENTS_MAPPING = {
-    account['Id']: account['statementFile']
-    for account in ACCOUNTS
-    if 'Id' in account and 'statementFile' in account
-}
+        return None
+
+def _normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def _build_index(accounts: List[Dict[str, Any]], signature) -> Dict[str, Any]:
+    """Builds the account lookups by id, account number and normalized email."""
+    by_email: Dict[str, List[str]] = {}
+    for account in accounts:
+        email = account.get('Holder', {}).get('Email', '')
+        if 'Id' in account and email:
+            by_email.setdefault(_normalize_email(email), []).append(account['Id'])
+    return {
+        'signature': signature,
+        'accounts': accounts,
+        'by_id': {account['Id']: account for account in accounts if 'Id' in account},
+        'by_number': {
+            account['AccountNumber']: account['Id']
+            for account in reversed(accounts)  # The first account with a number wins, as with a linear scan.
+            if 'AccountNumber' in account and 'Id' in account
+        },
+        'by_email': by_email,
+        'statements': {
+            account['Id']: account['statementFile']
+            for account in accounts
+            if 'Id' in account and 'statementFile' in account
+        },
+    }
+
+def _config_signature():
+    try:
+        stat = os.stat(CONFIG_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+_INDEX_LOCK = threading.Lock()
+_config = _load_config() or {"accounts": []}
+_INDEX = _build_index(_config.get("accounts", []), _config_signature())
+# Kept in sync with the current index for existing callers.
+ACCOUNTS = _INDEX['accounts']
+STATEMENTS_MAPPING = _INDEX['statements']
 
 if not ACCOUNTS:
     logging.warning("No accounts loaded from configuration.")
 
-def _get_transaction_type(amount: float) -> str:
-    """Determines transaction type based on amount."""
-    return 'credit' if amount > 0 else 'debit'
+def _account_index() -> Dict[str, Any]:
+    """
+    Returns the account index, rebuilding it first if config.json changed on disk.
+
+    A new index is built aside and swapped in with a single assignment, so
+    concurrent requests see either the old or the new accounts, never a mix.
+    A config that cannot be read keeps the previous index in place.
+    """
+    global _INDEX, ACCOUNTS, STATEMENTS_MAPPING
+    index = _INDEX
+    signature = _config_signature()
+    if signature == index['signature']:
+        return index
+    with _INDEX_LOCK:
+        if _INDEX['signature'] != signature:
+            config = _load_config()
+            if config is None:
+                return _INDEX
+            logging.info(f"Reloading accounts from {CONFIG_PATH}")
+            _INDEX = _build_index(config.get("accounts", []), signature)
+            ACCOUNTS, STATEMENTS_MAPPING = _INDEX['accounts'], _INDEX['statements']
+        return _INDEX
 
 CREDIT_MULTIPLIER = 1
 DEBIT_MULTIPLIER = -1
 
+# Columns an amount is read from, in order of precedence, by lower-cased header name.
 _AMOUNT_FIELD_MAPPING = {
     'deposits': CREDIT_MULTIPLIER,
     'credit': CREDIT_MULTIPLIER,
@@ -44,103 +107,307 @@ _AMOUNT_FIELD_MAPPING = {
     'debit': DEBIT_MULTIPLIER,
 }
 
-def _parse_amount(row_data: Dict[str, str]) -> float:
-    """Parses transaction amount from row data using a predefined mapping."""
+# Parsed statement files by path. An entry is reused for as long as the file's
+# modification time and size are unchanged, so each file is parsed once rather
+# than on every request.
+_STATEMENT_CACHE: Dict[str, Dict[str, Any]] = {}
+_STATEMENT_CACHE_LOCK = threading.Lock()
+
+# Part of every statement ETag. Bump it whenever the way statement files are
+# parsed or served changes, so that clients holding an old ETag download again.
+STATEMENT_FORMAT_VERSION = 1
+
+
+def _parse_amounts(table: pa.Table) -> pa.Array:
+    """
+    Computes the signed amount of every row from the first non-empty amount
+    column, by the precedence of _AMOUNT_FIELD_MAPPING. Rows without one are 0.
+    """
+    columns = {name.lower().strip(): table.column(name) for name in table.column_names}
+    amounts = pa.nulls(table.num_rows, pa.float64())
     for field, sign in _AMOUNT_FIELD_MAPPING.items():
-        if field in row_data and row_data[field]:
-            amount_str = row_data[field].replace(',', '')
-            return float(amount_str) * sign
-    return 0.0
+        if field not in columns:
+            continue
+        values = pc.replace_substring(columns[field], ',', '')
+        values = pc.if_else(pc.equal(values, ''), None, values)
+        amounts = pc.coalesce(amounts, pc.multiply(pc.cast(values, pa.float64()), float(sign)))
+    return pc.fill_null(amounts, 0.0)
+
 
-def load_transactions(account_id: str) -> List[Dict[str, Any]]:
+def _parse_statement_file(filepath: str) -> Dict[str, Any]:
     """
-    Loads and processes transactions for the mock Flinks API.
-    Returns a list of processed transaction dictionaries.
+    Parses a statement CSV into a table of string columns, with its amounts,
+    transaction types and the SHA-256 hash of the file's content.
     """
-    transactions: List[Dict[str, Any]] = []
-    filename = STATEMENTS_MAPPING.get(account_id)
+    with open(filepath, mode='rb') as infile:
+        data = infile.read()
+    headers = next(csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline='')), [])
+    table = pv.read_csv(
+        pa.BufferReader(data),
+        read_options=pv.ReadOptions(use_threads=True),
+        # Every column stays a string, exactly as csv.DictReader returns it.
+        convert_options=pv.ConvertOptions(column_types={name: pa.string() for name in headers}),
+    )
+    amounts = _parse_amounts(table)
+    types = pc.if_else(pc.greater(amounts, 0), 'credit', 'debit')
+    return {'headers': headers, 'table': table, 'amounts': amounts, 'types': types,
+            'content_hash': hashlib.sha256(data).hexdigest()}
+
+
+def _materialize(statement: Dict[str, Any], key: str, build) -> List[Dict[str, Any]]:
+    """Builds the row dicts of a parsed statement on first use and keeps them with it."""
+    if key not in statement:
+        statement[key] = build(statement)
+    return statement[key]
+
+
+def _raw_rows(statement: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return statement['table'].to_pylist()
+
+
+def _processed_rows(statement: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = _materialize(statement, 'raw_rows', _raw_rows)
+    return [
+        {
+            # Use original column names from the CSV for the mock API response
+            'Date': row.get('Date', ''),
+            'Description': row.get('Description', ''),
+            'Amount': amount,
+            'Type': transaction_type,
+            'Balance': row.get('Balance', '0'),
+            # Keep other original fields as-is if they exist
+            **row,
+        }
+        for row, amount, transaction_type in zip(rows, statement['amounts'].to_pylist(), statement['types'].to_pylist())
+    ]
+
+
+def get_statement_path(account_id: str) -> str | None:
+    """Returns the path of an account's statement file, or None if it has none on disk."""
+    filename = _account_index()['statements'].get(account_id)
     if not filename:
         logging.warning(f"No statement file mapping found for account_id: {account_id}")
-        return transactions
+        return None
 
     filepath = os.path.join(DATA_DIR, filename)
     if not os.path.exists(filepath):
         logging.error(f"Transaction file not found: {filepath}")
-        return transactions
-
-    logging.info(f"Loading and processing transactions for account {account_id} from {filename}")
-    with open(filepath, mode='r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        for row in reader:
-            row_data_lower = {k.lower().strip(): v for k, v in row.items()}
-            amount = _parse_amount(row_data_lower)
-
-            transaction = {
-                # Use original column names from the CSV for the mock API response
-                'Date': row.get('Date', ''),
-                'Description': row.get('Description', ''),
-                'Amount': amount,
-                'Type': _get_transaction_type(amount),
-                'Balance': row.get('Balance', '0'),
-                 # Keep other original fields as-is if they exist
-                **row
-            }
-            transactions.append(transaction)
-
-    logging.info(f"Successfully loaded and processed {len(transactions)} transactions for account {account_id}.")
-    return transactions
+        return None
+    return filepath
+
+
+def load_statement(account_id: str) -> Dict[str, Any] | None:
+    """
+    Returns the parsed statement file of an account, parsing it only if it was
+    not parsed yet or changed on disk since. Returns None if the account has no
+    statement file.
+    """
+    filepath = get_statement_path(account_id)
+    if filepath is None:
+        return None
+
+    filename = os.path.basename(filepath)
+    stat = os.stat(filepath)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _STATEMENT_CACHE_LOCK:
+        statement = _STATEMENT_CACHE.get(filepath)
+        if statement is None or statement['signature'] != signature:
+            logging.info(f"Parsing statement file {filename} for account {account_id}")
+            statement = {**_parse_statement_file(filepath), 'signature': signature}
+            _STATEMENT_CACHE[filepath] = statement
+        return statement
+
+
+def clear_statement_cache():
+    """Forgets every parsed statement file, so the next request parses them again."""
+    with _STATEMENT_CACHE_LOCK:
+        _STATEMENT_CACHE.clear()
+        _COMBINED_INDEX.clear()
+
+
+def statement_etag(account_ids: List[str], *variant) -> str | None:
+    """
+    Returns a strong ETag for the statements of some accounts, derived from
+    the content of their files, STATEMENT_FORMAT_VERSION and the `variant` of
+    the response that serves them (such as its format or page). Returns None
+    if none of the accounts has a statement file.
+    """
+    hasher = hashlib.sha256(f"{STATEMENT_FORMAT_VERSION}".encode())
+    found = False
+    for account_id in account_ids:
+        statement = load_statement(account_id)
+        if statement is not None:
+            found = True
+            hasher.update(f"\n{account_id}:{statement['content_hash']}".encode())
+    if not found:
+        return None
+    hasher.update(json.dumps(variant, default=str).encode())
+    return hasher.hexdigest()[:32]
+
+
+def load_transactions(account_id: str, from_date: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Loads and processes transactions for the mock Flinks API, only those
+    dated `from_date` (an ISO date) or later if given.
+    Returns a list of processed transaction dictionaries, shared across
+    requests for the same file: callers must not modify them.
+    """
+    statement = load_statement(account_id)
+    if statement is None:
+        return []
+    with _STATEMENT_CACHE_LOCK:
+        transactions = _materialize(statement, 'transactions', _processed_rows)
+    if from_date is not None:
+        # Statement dates are ISO dates, which compare in date order as strings.
+        transactions = [transaction for transaction in transactions if transaction['Date'] >= from_date]
+    logging.info(f"Loaded {len(transactions)} processed transactions for account {account_id}.")
+    return list(transactions)
+
+
+def load_transactions_table(account_id: str, from_date: str | None = None) -> pa.Table | None:
+    """
+    Returns the processed transactions of an account as an Arrow table: the
+    statement's columns followed by the computed Amount and Type, only those
+    dated `from_date` (an ISO date) or later if given. Returns None if the
+    account has no statement file.
+    """
+    statement = load_statement(account_id)
+    if statement is None:
+        return None
+    table = statement['table'].append_column('Amount', statement['amounts']).append_column('Type', statement['types'])
+    if from_date is not None and 'Date' in table.column_names:
+        table = table.filter(pc.greater_equal(table.column('Date'), from_date))
+    return table
+
 
 def load_raw_transactions(account_id: str) -> tuple[list[dict[str, Any]], list[str]]:
     """
     Loads raw, unprocessed transactions and headers from a CSV file.
     Returns a tuple containing the list of rows and the original headers.
+    The rows are shared across requests for the same file: callers must not modify them.
     """
-    transactions: List[Dict[str, Any]] = []
-    headers: List[str] = []
-    filename = STATEMENTS_MAPPING.get(account_id)
-    if not filename:
-        logging.warning(f"No statement file mapping found for account_id: {account_id}")
-        return transactions, headers
+    statement = load_statement(account_id)
+    if statement is None:
+        return [], []
+    with _STATEMENT_CACHE_LOCK:
+        transactions = _materialize(statement, 'raw_rows', _raw_rows)
+    logging.info(f"Loaded {len(transactions)} raw transactions for account {account_id}.")
+    return list(transactions), list(statement['headers'])
+
+_TRANSACTION_KEY_COLUMNS = ('Date', 'Description', 'Deposits', 'Withdrawals')
+
+# The first-occurrence positions of the combined transactions of a list of
+# accounts, by account ids, with the content hashes of the statements they
+# were computed from. An entry is reused for as long as those files are
+# unchanged, so resuming a page does not replay the rows before it.
+_COMBINED_INDEX: Dict[tuple, Dict[str, Any]] = {}
 
-    filepath = os.path.join(DATA_DIR, filename)
-    if not os.path.exists(filepath):
-        logging.error(f"Transaction file not found: {filepath}")
-        return transactions, headers
 
-    logging.info(f"Loading raw transactions for account {account_id} from {filename}")
-    with open(filepath, mode='r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        headers = list(reader.fieldnames) if reader.fieldnames else []
-        transactions = list(reader)
+def _combined_statements(account_ids: List[str]) -> list[tuple[str, Dict[str, Any]]]:
+    """Returns the (account id, parsed statement) of the accounts that have a statement file, in order."""
+    statements = [(account_id, load_statement(account_id)) for account_id in account_ids]
+    return [(account_id, statement) for account_id, statement in statements if statement is not None]
 
-    logging.info(f"Successfully loaded {len(transactions)} raw transactions for account {account_id}.")
-    return transactions, headers
+
+def _build_combined_index(statements: list[tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Finds the first occurrence of every transaction across the statements,
+    with a vectorized group-by over the key columns. A transaction is
+    identified by its Date, Description, Deposits and Withdrawals; the same
+    key in two statements is one transaction.
+    """
+    tables = [statement['table'] for _, statement in statements]
+    # Statements with different columns are combined with nulls for the missing ones.
+    combined = pa.concat_tables(tables, promote_options='permissive')
+    keys = pa.table({
+        **{
+            name: combined.column(name) if name in combined.column_names else pa.nulls(combined.num_rows, pa.string())
+            for name in _TRANSACTION_KEY_COLUMNS
+        },
+        'position': pa.array(range(combined.num_rows), pa.int64()),
+    })
+    first_positions = keys.group_by(list(_TRANSACTION_KEY_COLUMNS), use_threads=False).aggregate([('position', 'min')])
+    offsets = list(itertools.accumulate((table.num_rows for table in tables), initial=0))
+    return {'offsets': offsets, 'positions': sorted(first_positions.column('position_min').to_pylist())}
+
+
+def _combined_index(statements: list[tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Returns the index of the combined transactions of the statements, building it only if they changed."""
+    account_ids = tuple(account_id for account_id, _ in statements)
+    hashes = tuple(statement['content_hash'] for _, statement in statements)
+    with _STATEMENT_CACHE_LOCK:
+        index = _COMBINED_INDEX.get(account_ids)
+    if index is None or index['hashes'] != hashes:
+        index = {**_build_combined_index(statements), 'hashes': hashes}
+        with _STATEMENT_CACHE_LOCK:
+            _COMBINED_INDEX[account_ids] = index
+    return index
+
+
+def iter_combined_transactions(account_ids: List[str], start: int = 0) -> Iterator[tuple[int, Dict[str, Any]]]:
+    """
+    Yields the raw transactions of several accounts, in order and without
+    duplicates, as (position, row) pairs. A position counts every row of the
+    accounts, duplicates included, so iteration can resume after any position
+    with `start=position + 1`.
+
+    Duplicates are dropped keeping the first occurrence. Where those are is
+    kept between requests, so resuming reads only the accounts from `start` on.
+    """
+    statements = _combined_statements(account_ids)
+    if not statements:
+        return
+    index = _combined_index(statements)
+    offsets, positions = index['offsets'], index['positions']
+    account, rows = None, []
+    for position in positions[bisect.bisect_left(positions, start):]:
+        if account is None or position >= offsets[account + 1]:
+            account = bisect.bisect_right(offsets, position) - 1
+            rows, _ = load_raw_transactions(statements[account][0])
+        yield position, rows[position - offsets[account]]
+
+def combined_transactions_table(account_ids: List[str], start: int = 0,
+                                limit: int | None = None) -> tuple[pa.Table, int | None]:
+    """
+    Returns the raw transactions of several accounts as one Arrow table, with
+    the same rows, order, positions and cursor as iter_combined_transactions.
+
+    Returns the table and the position to resume from, or None after the last page.
+    """
+    statements = _combined_statements(account_ids)
+    if not statements:
+        return pa.table({}), None
+    positions = _combined_index(statements)['positions']
+    positions = positions[bisect.bisect_left(positions, start):]
+
+    next_cursor = None
+    if limit is not None and len(positions) > limit:
+        next_cursor = positions[limit - 1] + 1
+        positions = positions[:limit]
+    combined = pa.concat_tables([statement['table'] for _, statement in statements], promote_options='permissive')
+    return combined.take(pa.array(positions, pa.int64())), next_cursor
 
 def get_accounts() -> List[Dict[str, Any]]:
     """Returns the list of accounts from the config."""
-    return ACCOUNTS
+    return _account_index()['accounts']
+
+def get_account(account_id: str) -> Dict[str, Any] | None:
+    """Returns the account with the given internal ID, or None if there is none."""
+    return _account_index()['by_id'].get(account_id)
 
 def is_valid_account(account_id: str) -> bool:
     """Checks if the account ID is valid."""
-    return account_id in STATEMENTS_MAPPING
+    return account_id in _account_index()['statements']
 
 def get_account_id_by_number(account_number: str) -> str | None:
     """Finds an account by its account number and returns its internal ID."""
-    for account in ACCOUNTS:
-        if account.get('AccountNumber') == account_number:
-            return account.get('Id')
-    return None
+    return _account_index()['by_number'].get(account_number)
 
 def get_account_ids_by_email(email: str) -> list[str]:
     """Finds all account IDs associated with a given email."""
     if not email:
         return []
 
-    logging.info(f"Searching for accounts with email: {email}")
-    found_ids = [
-        account['Id']
-        for account in ACCOUNTS
-        if account.get('Holder', {}).get('Email', '').lower() == email.lower()
-    ]
+    found_ids = list(_account_index()['by_email'].get(_normalize_email(email), []))
     logging.info(f"Found {len(found_ids)} account(s) for email: {email}")
     return found_ids
@@ -0,0 +1,195 @@
+"""
+Latency, rate limiting and fault injection profiles for the mock API.
+
+A profile maps blueprint endpoint names (e.g. `get_statements`) to the faults
+injected into their responses, with `*` applying to every endpoint. An
+endpoint's own settings override the `*` ones key by key:
+
+- `latency`: a delay drawn from a distribution before the request is handled.
+- `rate_limit`: a token bucket of `requests_per_second` and `burst`; requests
+  over it get a 429 with Retry-After.
+- `error_rate` and `error_statuses`: the share of requests answered with one
+  of those 5xx statuses instead.
+- `truncate_rate`: the share of responses cut short mid-body.
+"""
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator
+
+PROFILES_PATH = os.getenv(
+    "API_MOCK_FAULT_PROFILES", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fault_profiles.json'))
+
+# Selects the profile of a single request, over the server-wide one.
+PROFILE_HEADER = 'X-Mock-Profile'
+
+DEFAULT_ERROR_STATUSES = (500, 502, 503)
+
+# A streamed response of unknown length is cut after a share of this many
+# bytes, since its full length is not known until it has been sent.
+STREAM_TRUNCATE_BYTES = 64 * 1024
+
+# Set API_MOCK_FAULT_SEED to make a run's faults reproducible.
+_random = random.Random(os.getenv("API_MOCK_FAULT_SEED"))
+
+# One token bucket per (profile, endpoint), shared by every client of this
+# process. Each ASGI worker process keeps its own buckets.
+_BUCKETS: Dict[tuple, 'TokenBucket'] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def load_profiles(path: str = PROFILES_PATH) -> Dict[str, Any]:
+    """Loads the fault profiles, or only the empty `none` profile if the file cannot be read."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.error(f"Could not load fault profiles from {path}: {e}")
+        return {'default_profile': 'none', 'profiles': {'none': {}}}
+
+
+PROFILES = load_profiles()
+
+
+def active_profile_name(header_value: str | None) -> str:
+    """Returns the profile named by the request header, API_MOCK_FAULT_PROFILE, or the file's default."""
+    return header_value or os.getenv("API_MOCK_FAULT_PROFILE") or PROFILES.get('default_profile', 'none')
+
+
+def get_profile(name: str) -> Dict[str, Any] | None:
+    return PROFILES.get('profiles', {}).get(name)
+
+
+def endpoint_settings(profile: Dict[str, Any], endpoint: str) -> Dict[str, Any]:
+    """Returns the faults of one endpoint: its own settings over the profile's `*` settings."""
+    return {**profile.get('*', {}), **profile.get(endpoint, {})}
+
+
+def sample_latency_ms(latency: Dict[str, Any], rng: random.Random = _random) -> float:
+    """
+    Draws a delay in ms from a latency setting. Distributions are `fixed`
+    (`ms`), `uniform` (`min_ms`, `max_ms`), `normal` (`mean_ms`, `stddev_ms`),
+    `lognormal` (`median_ms`, `sigma`) and `exponential` (`mean_ms`); `max_ms`
+    caps the others' long tails.
+    """
+    distribution = latency.get('distribution', 'fixed')
+    if distribution == 'fixed':
+        delay = latency.get('ms', 0)
+    elif distribution == 'uniform':
+        delay = rng.uniform(latency.get('min_ms', 0), latency['max_ms'])
+    elif distribution == 'normal':
+        delay = rng.gauss(latency['mean_ms'], latency.get('stddev_ms', 0))
+    elif distribution == 'lognormal':
+        delay = rng.lognormvariate(math.log(latency['median_ms']), latency.get('sigma', 0))
+    elif distribution == 'exponential':
+        delay = rng.expovariate(1 / latency['mean_ms'])
+    else:
+        raise ValueError(f"Unknown latency distribution '{distribution}'.")
+    if distribution != 'uniform' and 'max_ms' in latency:
+        delay = min(delay, latency['max_ms'])
+    return max(delay, 0)
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled at `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Takes a token and returns 0, or returns the seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+def _bucket(profile_name: str, endpoint: str, rate_limit: Dict[str, Any]) -> TokenBucket:
+    key = (profile_name, endpoint)
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            rate = rate_limit['requests_per_second']
+            bucket = _BUCKETS[key] = TokenBucket(rate, rate_limit.get('burst', rate))
+        return bucket
+
+
+def reset_rate_limits():
+    """Forgets every token bucket, so that the next requests start with full ones."""
+    with _BUCKETS_LOCK:
+        _BUCKETS.clear()
+
+
+def plan_faults(profile_name: str, endpoint: str) -> Dict[str, Any]:
+    """
+    Draws the faults for one request to `endpoint` under a profile. Returns
+    `delay_s`, and at most one of `retry_after_s` (throttled), `status` (a 5xx
+    instead of the response) or `truncate_fraction` (the share of the body to
+    send before the connection is cut). Raises KeyError for an unknown profile.
+    """
+    profile = get_profile(profile_name)
+    if profile is None:
+        raise KeyError(profile_name)
+    settings = endpoint_settings(profile, endpoint)
+    faults: Dict[str, Any] = {'delay_s': 0.0}
+    if 'latency' in settings:
+        faults['delay_s'] = sample_latency_ms(settings['latency']) / 1000
+    if 'rate_limit' in settings:
+        wait = _bucket(profile_name, endpoint, settings['rate_limit']).take()
+        if wait:
+            faults['retry_after_s'] = wait
+            return faults
+    if _random.random() < settings.get('error_rate', 0):
+        faults['status'] = _random.choice(settings.get('error_statuses', DEFAULT_ERROR_STATUSES))
+    elif _random.random() < settings.get('truncate_rate', 0):
+        faults['truncate_fraction'] = _random.random()
+    return faults
+
+
+def injected_response(faults: Dict[str, Any]) -> tuple[int, Dict[str, Any], Dict[str, str]] | None:
+    """
+    Returns the (status, JSON payload, headers) to answer with instead of the
+    endpoint when the faults throttle or fail the request, or None otherwise.
+    """
+    if 'retry_after_s' in faults:
+        headers = {'Retry-After': str(max(math.ceil(faults['retry_after_s']), 1)), 'X-Mock-Fault': 'rate_limit'}
+        return 429, {'error': 'Too many requests.'}, headers
+    if 'status' in faults:
+        return faults['status'], {'error': 'Injected server error.'}, {'X-Mock-Fault': 'error'}
+    return None
+
+
+def truncate_body(body: bytes, fraction: float) -> tuple[bytes, Dict[str, str]]:
+    """
+    Returns the first `fraction` of a body, and the headers that still declare
+    its full length and close the connection after it, so that the client sees
+    the transfer break off mid-response.
+    """
+    headers = {'Content-Length': str(len(body)), 'Connection': 'close', 'X-Mock-Fault': 'truncated'}
+    return body[:int(len(body) * fraction)], headers
+
+
+def truncate_chunks(chunks: Iterable[bytes], limit: int) -> Iterator[bytes]:
+    """
+    Yields the chunks of a streamed body up to `limit` bytes in all, then
+    stops reading them, so that the rest of the body is never produced.
+    """
+    for chunk in chunks:
+        if len(chunk) >= limit:
+            yield chunk[:limit]
+            return
+        limit -= len(chunk)
+        yield chunk
@@ -0,0 +1,86 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+JSON_MIMETYPE = 'application/json'
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+# The binary formats a statement endpoint can answer with, besides its JSON.
+TABLE_MIMETYPES = (ARROW_STREAM_MIMETYPE, PARQUET_MIMETYPE)
+
+
+def negotiate(accept_mimetypes, offered) -> str:
+    """
+    Returns the offered mimetype the client prefers, by its Accept header.
+    The first offered mimetype wins ties and is the default.
+    """
+    return accept_mimetypes.best_match(offered) or offered[0]
+
+
+def serialize_table(table: pa.Table, mimetype: str, metadata: dict | None = None) -> bytes:
+    """
+    Serializes a table as an Arrow IPC stream or a Parquet file. `metadata` is
+    added to the schema metadata, where both formats carry it to the client.
+    """
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    if mimetype == ARROW_STREAM_MIMETYPE:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if mimetype == PARQUET_MIMETYPE:
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        return sink.getvalue()
+    raise ValueError(f"Unsupported table mimetype: {mimetype}")
+
+
+class _ChunkSink:
+    """A write-only file for Arrow's IPC writer that hands out what was written so far."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Returns the table with the columns of `schema`, in its order, with nulls for the ones it lacks."""
+    return pa.table(
+        [table.column(field.name).cast(field.type) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+         for field in schema],
+        schema=schema,
+    )
+
+
+def stream_tables(tables, schema: pa.Schema, metadata: dict | None = None):
+    """
+    Yields an Arrow IPC stream of several tables, one table at a time, so the
+    client can start reading the first before the last is serialized. Every
+    table is conformed to `schema`; `metadata` is added to its metadata.
+    """
+    if metadata:
+        schema = schema.with_metadata({**(schema.metadata or {}), **metadata})
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for table in tables:
+            writer.write_table(conform_table(table, schema))
+            if data := sink.drain():
+                yield data
+    # Closing the writer writes the schema of an empty stream, and the end-of-stream marker.
+    yield sink.drain()
+
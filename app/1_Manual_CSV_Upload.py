@@ -1,9 +1,15 @@
 import streamlit as st
-import pandas as pd
 import sys
 import os
 import logging
-from app_utils import run_analysis_pipeline, display_taktile_interface, display_reset_button
+
+# Ensure the app can find other modules (e.g. the pipelines package), if necessary
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app_utils import run_analysis_pipeline, display_taktile_interface, display_reset_button, DATA_LAKE_ROOT
+from results_view import display_results
+from run_performance import display_run_performance
+from upload_loader import load_new_statement_files
 
 # --- Logging Configuration ---
 logging.basicConfig(
@@ -13,9 +19,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Ensure the app can find other modules, if necessary
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-
 st.set_page_config(layout="wide", page_title="Manual CSV Upload")
 
 st.title("Underwriting Analysis Workflow")
@@ -47,10 +50,16 @@ display_reset_button(st, logger)
 if st.button("Run Analysis on Uploaded CSVs"):
     if uploaded_files:
         logger.info(f"Starting CSV analysis for {len(uploaded_files)} uploaded files.")
-        run_analysis_pipeline(pd.concat([pd.read_csv(file) for file in uploaded_files], ignore_index=True))
+        # Files ingested in an earlier session are recognised by their content
+        # fingerprint and are neither parsed nor written to bronze again.
+        new_statements, reused_request_ids, fingerprint_records = load_new_statement_files(uploaded_files, DATA_LAKE_ROOT)
+        logger.info(f"{len(fingerprint_records)} new file(s), {len(uploaded_files) - len(fingerprint_records)} already ingested.")
+        run_analysis_pipeline(new_statements, reused_request_ids=reused_request_ids, fingerprint_records=fingerprint_records)
     else:
         st.warning("Please upload at least one CSV file.")
         logger.warning("CSV analysis button clicked but no files were uploaded.")
 
-# --- Persisted Metrics Review & Taktile Dispatch ---
+# --- Persisted Results, Metrics Review & Taktile Dispatch ---
+display_results(st, logger, key_prefix="manual")
 display_taktile_interface(st, logger, key_prefix="manual")
+display_run_performance(st, logger)
@@ -0,0 +1,42 @@
+"""
+The Streamlit app. Streamlit runs the page scripts with app/ on sys.path, so
+app modules import each other by their bare names (e.g. `import
+taktile_client`). Tests and benchmarks import them as `app.<module>`.
+
+Importing this package puts app/ on sys.path as well, and makes
+`app.<module>` the very module object imported as `<module>`, so that no app
+module is loaded twice with separate state.
+"""
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+class _BareNameAlias(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Loads `app.<module>` by importing `<module>` from app/ and aliasing it."""
+
+    def find_spec(self, fullname, path, target=None):
+        package, _, name = fullname.partition('.')
+        if package != __name__ or not name or '.' in name:
+            return None
+        if not os.path.exists(os.path.join(APP_DIR, f"{name}.py")):
+            return None
+        return importlib.util.spec_from_loader(fullname, self)
+
+    def create_module(self, spec):
+        return importlib.import_module(spec.name.partition('.')[2])
+
+    def exec_module(self, module):
+        # The module was executed when it was imported by its bare name.
+        pass
+
+
+if not any(isinstance(finder, _BareNameAlias) for finder in sys.meta_path):
+    sys.meta_path.insert(0, _BareNameAlias())
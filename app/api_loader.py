@@ -0,0 +1,157 @@
+import itertools
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+from pipelines.fingerprints import CHUNK_SIZE, fingerprint_chunks
+from upload_loader import STATEMENT_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Formats the Automated API Run page accepts from /api/statements: an Arrow
+# IPC stream of the transactions as a table, one JSON transaction per line,
+# or, from servers that offer neither, a JSON array of transactions.
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MIMETYPE = "application/x-ndjson"
+JSON_MIMETYPE = "application/json"
+STATEMENTS_ACCEPT = f"{ARROW_STREAM_MIMETYPE}, {NDJSON_MIMETYPE};q=0.8, {JSON_MIMETYPE};q=0.5"
+
+# /api/statements is requested this many transactions per page, following the
+# cursor of each page to the next, so the server never builds one huge response.
+STATEMENTS_PAGE_SIZE = 50_000
+
+# NDJSON is parsed into Arrow this many transactions at a time, so at most
+# one block of raw lines is held in memory while a page is read.
+DEFAULT_BATCH_SIZE = 5000
+
+
+def conform_to_statement_schema(data: pa.Table | pa.RecordBatch) -> pa.Table | pa.RecordBatch:
+    """
+    Returns the statement columns of a table or record batch in the declared
+    order and types. Missing columns are filled with nulls and other columns
+    are dropped.
+    """
+    columns = [
+        data.column(field.name).cast(field.type) if field.name in data.schema.names
+        else pa.nulls(data.num_rows, field.type)
+        for field in STATEMENT_SCHEMA
+    ]
+    return type(data).from_arrays(columns, schema=STATEMENT_SCHEMA)
+
+
+def statement_mimetype(response) -> str:
+    """
+    Returns the format of an /api/statements response requested with
+    `STATEMENTS_ACCEPT`, by its Content-Type. Any other Content-Type raises a
+    ValueError, rather than being parsed as the wrong format.
+    """
+    mimetype = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if mimetype not in (ARROW_STREAM_MIMETYPE, NDJSON_MIMETYPE, JSON_MIMETYPE):
+        raise ValueError(f"Unexpected Content-Type '{mimetype}' from the statements API.")
+    return mimetype
+
+
+def spool_statement_pages(session, api_url: str, email: str, spool_dir: str,
+                          page_size: int = STATEMENTS_PAGE_SIZE) -> tuple[list[tuple[str, str]], str]:
+    """
+    Requests every page of /api/statements for an email with `session` (e.g.
+    the requests module), following the X-Next-Cursor header from page to
+    page, and copies each page's body to a file in `spool_dir` in chunks,
+    hashing it on the way.
+
+    Returns the (path, mimetype) of every page, and the SHA-256 fingerprint of
+    the whole payload. Nothing is parsed, so a payload that was already
+    ingested costs a single pass over its bytes.
+    """
+    pages = []
+
+    def chunks():
+        cursor = None
+        while True:
+            params = {"email": email, "limit": page_size, **({"cursor": cursor} if cursor else {})}
+            response = session.get(api_url, params=params, headers={"Accept": STATEMENTS_ACCEPT}, stream=True)
+            response.raise_for_status()  # Raises an exception for bad status codes
+            path = os.path.join(spool_dir, f"page-{len(pages):05d}")
+            pages.append((path, statement_mimetype(response)))
+            # Spool the body as sent, but without any Content-Encoding.
+            response.raw.decode_content = True
+            with open(path, 'wb') as spool:
+                while chunk := response.raw.read(CHUNK_SIZE):
+                    spool.write(chunk)
+                    yield chunk
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return
+
+    fingerprint = fingerprint_chunks(chunks())
+    logger.info(f"Spooled {len(pages)} page(s) of statements for {email}.")
+    return pages, fingerprint
+
+
+def _ndjson_batches(path: str, batch_size: int):
+    """Parses an NDJSON page of transactions into record batches with the statement schema, block by block."""
+    parse_options = pa_json.ParseOptions(explicit_schema=STATEMENT_SCHEMA, unexpected_field_behavior="ignore")
+    with open(path, 'rb') as page:
+        while lines := list(itertools.islice(page, batch_size)):
+            table = pa_json.read_json(pa.BufferReader(b''.join(lines)), parse_options=parse_options)
+            yield from table.select(STATEMENT_SCHEMA.names).to_batches()
+
+
+def _ipc_batches(path: str, batch_size: int):
+    """Reads an Arrow IPC page of transactions one record batch at a time, cast to the statement schema."""
+    with pa.OSFile(path) as page:
+        if page.size() == 0:
+            return
+        for batch in pa.ipc.open_stream(page):
+            yield conform_to_statement_schema(batch)
+
+
+def _json_batches(path: str, batch_size: int):
+    """Reads a JSON page of transactions, an array or a `{"Transactions": [...]}` page, into record batches."""
+    with open(path, 'rb') as page:
+        body = page.read()
+    transactions = json.loads(body) if body.strip() else []
+    if isinstance(transactions, dict):
+        transactions = transactions.get('Transactions', [])
+    yield from conform_to_statement_schema(pa.Table.from_pylist(transactions)).to_batches(batch_size)
+
+
+_PAGE_READERS = {
+    ARROW_STREAM_MIMETYPE: _ipc_batches,
+    NDJSON_MIMETYPE: _ndjson_batches,
+    JSON_MIMETYPE: _json_batches,
+}
+
+
+class StatementBatches:
+    """
+    The transactions of the pages spooled by `spool_statement_pages`, read
+    one record batch at a time, with the number of rows and the request ids
+    of the batches read so far.
+    """
+
+    def __init__(self, pages: list[tuple[str, str]], batch_size: int = DEFAULT_BATCH_SIZE):
+        self.pages = pages
+        self.batch_size = batch_size
+        self.num_rows = 0
+        self.request_ids = set()
+
+    def _batches(self):
+        import pyarrow.compute as pc
+
+        for path, mimetype in self.pages:
+            for batch in _PAGE_READERS[mimetype](path, self.batch_size):
+                self.num_rows += batch.num_rows
+                self.request_ids.update(pc.unique(batch.column('Request ID')).drop_null().to_pylist())
+                yield batch
+
+    def reader(self) -> pa.RecordBatchReader:
+        """
+        Returns a reader over the transactions with the statement schema, for
+        the bronze writer. The pages are parsed as the writer consumes it, so
+        only one batch of them is held in memory at a time.
+        """
+        return pa.RecordBatchReader.from_batches(STATEMENT_SCHEMA, self._batches())
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+DEFAULT_CACHE_PATH = os.path.join(DATA_LAKE_ROOT, "data_lake", "taktile_decision_cache.sqlite")
+
+# Decisions are reused for a day, after which the flow is asked again.
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Beyond this many entries, the least recently used decisions are evicted.
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+def decision_key(data_payload: dict, flow_version: str) -> str:
+    """
+    Returns the cache key of a decision: the SHA-256 of the canonical JSON
+    serialization of the data payload and the flow version. Key order and
+    whitespace therefore do not change the key.
+    """
+    canonical = json.dumps(
+        {"flow_version": flow_version, "data": data_payload},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """
+    Local SQLite cache of Taktile decisions, with a TTL and LRU eviction
+    beyond `max_entries`.
+
+    The cache is shared by the threads of `TaktileClient.decide_many`, so
+    every access goes through a single lock. `hits` and `misses` count the
+    lookups made through this instance.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS decisions_accessed_at ON decisions (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        """Returns the cached decision for `key`, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM decisions WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE decisions SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict):
+        """Stores a decision, then evicts expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO decisions (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now),
+            )
+            self._conn.execute("DELETE FROM decisions WHERE created_at <= ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM decisions WHERE key NOT IN"
+                " (SELECT key FROM decisions ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counters and the number of cached decisions."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def clear(self):
+        """Removes every cached decision."""
+        with self._lock:
+            self._conn.execute("DELETE FROM decisions")
+            self._conn.commit()
@@ -1,8 +1,12 @@
 import streamlit as st
-import pandas as pd
 import requests
 import logging
-from app_utils import run_analysis_pipeline, display_taktile_interface, display_reset_button
+import tempfile
+from api_loader import StatementBatches, spool_statement_pages
+from app_utils import run_analysis_pipeline, display_taktile_interface, display_reset_button, DATA_LAKE_ROOT
+from results_view import display_results
+from run_performance import display_run_performance
+from pipelines.fingerprints import find_known_fingerprints
 
 logger = logging.getLogger(__name__)
 
@@ -22,18 +26,40 @@ if st.button("Ingest from Mock API and Run Analysis"):
         logger.info(f"Starting API analysis for email: {customer_email}")
         try:
             logger.info(f"Fetching data from mock API at {API_URL} for email: {customer_email}")
-            response = requests.get(API_URL, params={"email": customer_email})
-            response.raise_for_status()  # Raises an exception for bad status codes
+            # Transactions are received page by page as Arrow IPC streams (or NDJSON, or
+            # JSON from servers that offer neither). The raw pages are spooled to disk and
+            # hashed before anything is parsed; a payload that was already ingested is
+            # neither parsed nor written to bronze again. A new one is parsed batch by
+            # batch straight into the bronze writer.
+            with tempfile.TemporaryDirectory() as spool_dir:
+                pages, payload_fingerprint = spool_statement_pages(requests, API_URL, customer_email, spool_dir)
+                known = find_known_fingerprints([payload_fingerprint], DATA_LAKE_ROOT)
 
-            source_data = response.json()
-            if not source_data:
+                if payload_fingerprint in known:
+                    logger.info(f"Payload for {customer_email} was already ingested ({payload_fingerprint[:12]}); reusing it.")
+                    run_analysis_pipeline(None, reused_request_ids=known[payload_fingerprint]['request_ids'], email=customer_email)
+                else:
+                    batches = StatementBatches(pages)
+
+                    def fingerprint_records():
+                        logger.info(f"Successfully fetched {batches.num_rows} records from API.")
+                        return [{
+                            'fingerprint': payload_fingerprint,
+                            'source': 'api',
+                            'name': f"{API_URL}?email={customer_email}",
+                            'request_ids': sorted(batches.request_ids),
+                            'num_rows': batches.num_rows,
+                        }]
+
+                    run_analysis_pipeline(batches.reader(), fingerprint_records=fingerprint_records, email=customer_email)
+
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
                 st.warning(f"No data returned from API for {customer_email}.")
                 logger.warning(f"No data returned from API for {customer_email}.")
             else:
-                logger.info(f"Successfully fetched {len(source_data)} records from API.")
-                combined_df = pd.DataFrame(source_data)
-                run_analysis_pipeline(combined_df)
-
+                st.error("The mock API returned an error.")
+                logger.error(f"The mock API at {API_URL} returned an error.", exc_info=True)
         except requests.exceptions.RequestException as e:
             st.error("Failed to connect to the mock API. Is it running?")
             logger.error(f"Failed to connect to mock API at {API_URL}.", exc_info=True)
@@ -44,5 +70,7 @@ if st.button("Ingest from Mock API and Run Analysis"):
         st.warning("Please enter a customer email.")
         logger.warning("API analysis button clicked but no email was provided.")
 
-# --- Persisted Metrics Review & Taktile Dispatch ---
+# --- Persisted Results, Metrics Review & Taktile Dispatch ---
+display_results(st, logger, key_prefix="automated")
 display_taktile_interface(st, logger, key_prefix="automated")
+display_run_performance(st, logger)
@@ -0,0 +1,106 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Customers rendered per page of results. Only the current page is sent to the browser.
+DEFAULT_PAGE_SIZE = 5
+
+# Charts are downsampled to at most this many points per customer. This is
+# plenty for a chart a few hundred pixels wide.
+DEFAULT_MAX_CHART_POINTS = 300
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Selects the indices of the points to keep when downsampling a series with
+    the Largest-Triangle-Three-Buckets algorithm.
+
+    LTTB keeps the first and last points and, for every bucket in between, the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket. Peaks and troughs therefore survive, unlike with
+    plain decimation. `x` must be sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries for the n - 2 interior points.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        # Twice the triangle area; the constant factor does not change the argmax.
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_series(df: pd.DataFrame, x_col: str, y_col: str, max_points: int = DEFAULT_MAX_CHART_POINTS) -> pd.DataFrame:
+    """Returns `df` sorted by `x_col` and downsampled with LTTB on `y_col`."""
+    df = df.sort_values(x_col)
+    if len(df) <= max_points:
+        return df
+    x = df[x_col]
+    if not pd.api.types.is_numeric_dtype(x):
+        x = pd.to_datetime(x).astype('int64')
+    # Days before the first known balance are null; treat them as zero for the triangle areas.
+    y = df[y_col].fillna(0).to_numpy()
+    return df.iloc[lttb_indices(x.to_numpy(), y, max_points)]
+
+
+def display_results(st, logger, key_prefix: str, page_size: int = DEFAULT_PAGE_SIZE, max_chart_points: int = DEFAULT_MAX_CHART_POINTS):
+    """
+    Renders the daily balance results stored in the session, one page of
+    customers at a time. Charts are downsampled and the full-resolution table
+    of a customer is only rendered when requested.
+    """
+    final_df = st.session_state.get("final_df")
+    if final_df is None:
+        return
+
+    st.subheader("Underwriting Analysis Results")
+    st.write("The charts below show the daily revised average balance for each customer over the analysis period.")
+
+    if final_df.empty:
+        st.warning("The analysis completed, but there are no results to display.")
+        return
+
+    request_ids = sorted(final_df['request_id'].unique())
+    num_pages = math.ceil(len(request_ids) / page_size)
+    page = 1
+    if num_pages > 1:
+        page = int(st.number_input(
+            f"Page (1-{num_pages}, {len(request_ids)} customers)",
+            min_value=1, max_value=num_pages, value=1, step=1,
+            key=f"{key_prefix}_results_page",
+        ))
+    page_request_ids = request_ids[(page - 1) * page_size: page * page_size]
+    logger.info(f"Rendering results page {page}/{num_pages} ({len(page_request_ids)} customers).")
+
+    page_df = final_df[final_df['request_id'].isin(page_request_ids)]
+    for request_id, group in page_df.groupby('request_id'):
+        email = group['email'].iloc[0]
+        st.markdown(f"#### Customer: `{email}`")
+
+        chart_df = downsample_series(group[['date', 'revised_average_balance']], 'date', 'revised_average_balance', max_chart_points)
+        if len(chart_df) < len(group):
+            st.caption(f"Chart downsampled to {len(chart_df)} of {len(group)} days.")
+        st.line_chart(chart_df.rename(columns={'date': 'index'}).set_index('index')['revised_average_balance'])
+
+        if st.toggle("Show full-resolution data", key=f"{key_prefix}_full_{request_id}"):
+            full_df = group[['date', 'revised_average_balance']].sort_values('date')
+            st.dataframe(full_df.style.format({"revised_average_balance": "${:,.2f}"}))
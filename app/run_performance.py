@@ -0,0 +1,48 @@
+import os
+import pandas as pd
+
+from pipelines import run_metrics
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+
+# Percentiles of each stage's wall time, CPU and peak RSS shown across runs.
+PANEL_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def latest_run_spans(spans: pd.DataFrame) -> pd.DataFrame:
+    """Returns the spans of the most recently recorded run, sub-steps indented under their stage."""
+    if spans.empty:
+        return spans
+    latest_run_id = spans.loc[spans['recorded_at'].idxmax(), 'run_id']
+    run_spans = spans[spans['run_id'] == latest_run_id].sort_values('span_id')
+
+    depth = {}
+    for span_id, parent_id in zip(run_spans['span_id'], run_spans['parent_id']):
+        depth[span_id] = 0 if pd.isna(parent_id) else depth.get(int(parent_id), 0) + 1
+    run_spans = run_spans.assign(span=["  " * depth[i] + name for i, name in zip(run_spans['span_id'], run_spans['name'])])
+    return run_spans[['span', 'kind', 'status', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb']]
+
+
+def display_run_performance(st, logger, data_lake_root: str = DATA_LAKE_ROOT):
+    """
+    Renders the "Run performance" panel: the stage timings of the latest run
+    and, across every recorded run, the percentiles of each stage and dbt model.
+    """
+    with st.expander("Run performance"):
+        try:
+            spans = run_metrics.load_run_metrics(data_lake_root)
+        except Exception as e:
+            logger.warning(f"Could not load run metrics: {e}")
+            st.warning("Run metrics are not available.")
+            return
+
+        if spans.empty:
+            st.info("No runs have been recorded yet.")
+            return
+
+        st.markdown(f"**Latest run** ({spans['run_id'].nunique()} run(s) recorded)")
+        st.dataframe(latest_run_spans(spans), hide_index=True)
+
+        st.markdown("**Across runs**")
+        st.dataframe(run_metrics.summarize_run_metrics(spans, PANEL_PERCENTILES), hide_index=True)
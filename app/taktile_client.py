@@ -0,0 +1,168 @@
+import os
+import time
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import decision_cache
+from decision_cache import DecisionCache, decision_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://eu-central-1.taktile-demo.decide.taktile.com"
+DECIDE_PATH = "/run/api/v1/flows/underwriting/sandbox/decide"
+
+# At most this many decisions are in flight at once, each on its own pooled
+# keep-alive connection, so a portfolio does not overwhelm the sandbox.
+DEFAULT_MAX_CONCURRENCY = 8
+
+REQUEST_TIMEOUT_SECONDS = 30
+POLL_TIMEOUT_SECONDS = 15
+
+# Asynchronous (202) decisions are polled with exponential backoff until the deadline.
+POLL_DEADLINE_SECONDS = 30
+POLL_INITIAL_INTERVAL_SECONDS = 0.25
+POLL_MAX_INTERVAL_SECONDS = 4
+
+# Part of the decision cache key, so that publishing a new version of the flow
+# invalidates the decisions cached for the previous one.
+DEFAULT_FLOW_VERSION = "sandbox"
+
+
+class TaktileClient:
+    """
+    Client for the Taktile underwriting flow.
+
+    A single keep-alive session is shared by every call, so decisions reuse
+    pooled connections instead of opening a new one each time. The client is
+    thread-safe for the concurrent submissions made by `decide_many`.
+
+    With a `cache`, decisions for a data payload already decided by the same
+    flow version are returned from it instead of calling Taktile again.
+    """
+
+    def __init__(self, base_url: str, api_key: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 poll_deadline: float = POLL_DEADLINE_SECONDS, cache: DecisionCache | None = None,
+                 flow_version: str = DEFAULT_FLOW_VERSION):
+        self.decide_url = f"{base_url}{DECIDE_PATH}"
+        self.max_concurrency = max_concurrency
+        self.poll_deadline = poll_deadline
+        self.cache = cache
+        # Decisions from different environments (e.g. the local emulator) never share cache entries.
+        self.flow_version = f"{self.decide_url}@{flow_version}"
+
+        # requests is only needed once a client is created, so pages that never decide do not import it.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-Api-Key": api_key,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def decide(self, payload: dict) -> dict:
+        """
+        Posts a decision and returns the final decision payload.
+
+        Handles both synchronous (200) and asynchronous (202) responses. For
+        202 responses the decision is polled with exponential backoff, and a
+        TimeoutError is raised if it is not ready by the poll deadline.
+        Only successful decisions are cached.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = decision_key(payload.get("data", {}), self.flow_version)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Decision cache hit for entity {payload.get('metadata', {}).get('entity_id')}.")
+                return cached
+
+        decision = self._request_decision(payload)
+        if cache_key is not None:
+            self.cache.put(cache_key, decision)
+        return decision
+
+    def _request_decision(self, payload: dict) -> dict:
+        """Posts a decision to Taktile, polling it if it was accepted asynchronously."""
+        logger.info(f"Posting payload to Taktile: {self.decide_url}")
+        response = self.session.post(self.decide_url, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
+
+        logger.info(f"Response status: {response.status_code}")
+        if response.status_code not in (200, 202):
+            logger.error(f"Error response body: {response.text}")
+        response.raise_for_status()
+
+        resp_json = response.json()
+        if response.status_code == 202:
+            return self._poll(resp_json["metadata"]["decision_id"])
+        return resp_json
+
+    def _poll(self, decision_id: str) -> dict:
+        """Polls an accepted decision until it is ready or the deadline passes."""
+        status_url = f"{self.decide_url}/{decision_id}"
+        logger.info(f"Decision accepted (202). Polling for result using {status_url} ...")
+
+        deadline = time.monotonic() + self.poll_deadline
+        interval = POLL_INITIAL_INTERVAL_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Taktile decision {decision_id} was not ready after {self.poll_deadline}s.")
+            time.sleep(min(interval, remaining))
+            poll_resp = self.session.get(status_url, timeout=POLL_TIMEOUT_SECONDS)
+            if poll_resp.status_code == 200:
+                return poll_resp.json()
+            if poll_resp.status_code != 202:
+                poll_resp.raise_for_status()
+            interval = min(interval * 2, POLL_MAX_INTERVAL_SECONDS)
+
+    def decide_many(self, payloads: list[dict]) -> list:
+        """
+        Submits several decisions concurrently, at most `max_concurrency` at a time.
+
+        Returns one entry per payload, in order: the decision payload, or the
+        exception raised for it, so that a single failure does not discard the
+        other decisions.
+        """
+        def _decide_or_error(payload):
+            try:
+                return self.decide(payload)
+            except Exception as e:
+                logger.error(f"Taktile decision failed: {e}")
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(_decide_or_error, payloads))
+
+
+@functools.lru_cache(maxsize=1)
+def _decision_cache() -> DecisionCache:
+    return DecisionCache(
+        os.getenv("TAKTILE_DECISION_CACHE_PATH", decision_cache.DEFAULT_CACHE_PATH),
+        ttl_seconds=float(os.getenv("TAKTILE_DECISION_CACHE_TTL_SECONDS", decision_cache.DEFAULT_TTL_SECONDS)),
+        max_entries=int(os.getenv("TAKTILE_DECISION_CACHE_MAX_ENTRIES", decision_cache.DEFAULT_MAX_ENTRIES)),
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _client_for(base_url: str, api_key: str) -> TaktileClient:
+    return TaktileClient(
+        base_url, api_key, cache=_decision_cache(),
+        flow_version=os.getenv("TAKTILE_FLOW_VERSION", DEFAULT_FLOW_VERSION),
+    )
+
+
+def get_client() -> TaktileClient:
+    """
+    Returns the shared client for the configured Taktile environment, so its
+    connection pool survives Streamlit reruns.
+    """
+    api_key = os.getenv("TAKTILE_DEMO_API_KEY")
+    if not api_key:
+        raise EnvironmentError("TAKTILE_DEMO_API_KEY environment variable is not set.")
+    return _client_for(os.getenv("TAKTILE_BASE_URL", DEFAULT_BASE_URL), api_key)
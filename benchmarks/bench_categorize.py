@@ -0,0 +1,80 @@
+"""
+Throughput benchmark of transaction categorization.
+
+Categorizes the descriptions of synthetic statements from
+`benchmarks.synthetic_statements` with `pipelines.categorize`, which matches
+every category in one pass of a combined RE2 automaton over each distinct
+description, and with a per-row baseline: one Python regex per category,
+tried on every row in turn. Descriptions are taken as generated, which repeat
+as real statement descriptions do, and with a unique reference number
+appended to each, so that every description is distinct. Throughput is
+reported in millions of descriptions per second.
+
+Usage:
+    python -m benchmarks.bench_categorize --rows 1000000
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from benchmarks.synthetic_statements import generate_statements
+from pipelines.categorize import UNCATEGORIZED, categorize, load_rules
+
+
+def _per_row(descriptions: pa.Array, rules: list[dict]) -> list:
+    """Categorizes row by row, with one compiled regex per category."""
+    matchers = [
+        (category['name'], re.compile(r'\b(?:' + '|'.join(map(re.escape, category['patterns'])) + r')\b', re.IGNORECASE))
+        for category in rules
+    ]
+    categories = []
+    for description in descriptions.to_pylist():
+        categories.append(next((name for name, matcher in matchers if matcher.search(description or '')), UNCATEGORIZED))
+    return categories
+
+
+def _best_of(repeats: int, function) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(rows: int, repeats: int):
+    rules = load_rules()
+    history_days = 365
+    customers = max(1, rows // (4 * history_days * 2))
+    descriptions = generate_statements(customers, 2, history_days=history_days).column('Description').combine_chunks()
+    descriptions = pc.take(descriptions, np.arange(rows) % len(descriptions))
+    references = pa.array(np.arange(rows).astype(str))
+    inputs = [
+        ('repeating', descriptions),
+        ('distinct', pc.binary_join_element_wise(descriptions, references, ' REF ')),
+    ]
+
+    print(f"{rows} descriptions, {len(rules)} categories; best of {repeats}")
+    print(f"{'descriptions':<13} {'distinct':>9} {'method':<10} {'time [s]':>9} {'M desc/s':>9}")
+    for name, values in inputs:
+        distinct = len(pc.unique(values))
+        combined_s, combined = _best_of(repeats, lambda: categorize(values, rules))
+        # The per-row baseline is slow, so it runs on a sample and is scaled up.
+        sample = values.slice(0, min(rows, 200_000))
+        per_row_s, per_row = _best_of(1, lambda: _per_row(sample, rules))
+        assert per_row == combined.slice(0, len(sample)).to_pylist(), "The two methods disagree."
+        per_row_s *= rows / len(sample)
+        for method, seconds in (('combined', combined_s), ('per-row', per_row_s)):
+            print(f"{name:<13} {distinct:>9} {method:<10} {seconds:>9.3f} {rows / seconds / 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of descriptions to categorize.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions; the best one is reported.")
+    args = parser.parse_args()
+    main(args.rows, args.repeats)
@@ -0,0 +1,178 @@
+"""
+Import-time profile of every entry point.
+
+Each entry point is imported in a fresh interpreter with `python -X importtime`,
+and each CLI is timed end to end. Every import of each entry point, heaviest
+first, is written to `benchmarks/results/importtime/<entry point>.txt`, and a
+summary table to `benchmarks/results/importtime/summary.md`.
+
+With `--baseline <git ref>`, the same entry points are also measured in that
+commit's tree, exported to a temporary directory, and the summary compares
+the two. Entry points that do not exist at the baseline are left blank.
+
+Usage:
+    python -m benchmarks.bench_import_time --repeats 5 --baseline d1b29ec
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results', 'importtime')
+
+# Modules imported by each entry point. App modules are imported the way
+# Streamlit does, with app/ on sys.path and streamlit already loaded.
+ENTRY_POINTS = {
+    'pipelines.ingest_statements': 'import pipelines.ingest_statements',
+    'pipelines.transform_statements': 'import pipelines.transform_statements',
+    'pipelines.run_namespace': 'import pipelines.run_namespace',
+    'pipelines.orchestrator': 'import pipelines.orchestrator',
+    'pipelines.run_metrics': 'import pipelines.run_metrics',
+    'pipelines.fingerprints': 'import pipelines.fingerprints',
+    'api_mock': 'import api_mock',
+    'taktile_mock': 'import taktile_mock',
+    'app.app_utils': 'import streamlit; import app_utils',
+    'app.upload_loader': 'import streamlit; import upload_loader',
+    'app.taktile_client': 'import streamlit; import taktile_client',
+}
+
+# CLI invocations timed end to end, from interpreter start to exit.
+CLI_COMMANDS = {
+    'transform_statements --help': ['-m', 'pipelines.transform_statements', '--help'],
+    'run_namespace cleanup': ['-m', 'pipelines.run_namespace', 'cleanup', '--run-id', 'bench-import-time'],
+    'orchestrator --dry-run': ['-m', 'pipelines.orchestrator', '--dry-run', '--no-docs'],
+}
+
+
+def _env(root_dir: str, data_lake_root: str) -> dict:
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([root_dir, os.path.join(root_dir, 'app'), env.get('PYTHONPATH', '')])
+    env['DATA_LAKE_ROOT'] = data_lake_root
+    return env
+
+
+def export_tree(ref: str, directory: str):
+    """Writes the files of a commit to `directory`, without touching the working tree."""
+    archive = subprocess.run(['git', 'archive', '--format=tar', ref], cwd=ROOT_DIR, capture_output=True, check=True)
+    with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+        tar.extractall(directory, filter='data')
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Parses `-X importtime` output into (module, nesting level, self us, cumulative us) tuples."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level, after a single separator space.
+        level = (len(module) - len(module.lstrip()) - 1) // 2
+        imports.append((module.strip(), level, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def profile_imports(statement: str, env: dict, repeats: int, root_dir: str = ROOT_DIR) -> tuple[float, list]:
+    """Returns the best total import time in ms, and the imports of that run."""
+    best_total, best_imports = None, []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                env=env, cwd=root_dir, capture_output=True, text=True, check=True)
+        imports = parse_importtime(result.stderr)
+        # Modules loaded by the interpreter itself (site, encodings) and by the
+        # harness (streamlit) are not attributed to the entry point.
+        harness = {'site', 'encodings', 'streamlit'}
+        total = sum(cumulative for module, level, _, cumulative in imports
+                    if level == 0 and module not in harness) / 1000
+        if best_total is None or total < best_total:
+            best_total, best_imports = total, imports
+    return best_total, best_imports
+
+
+def time_cli(args: list, env: dict, repeats: int, root_dir: str = ROOT_DIR) -> float:
+    """Returns the best wall time in ms of a CLI invocation."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, cwd=root_dir, capture_output=True, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def write_report(name: str, total_ms: float, imports: list, results_dir: str):
+    # Every import is listed, so that a heavy module pulled in below the top
+    # few entries still shows up in the report.
+    heaviest = sorted(imports, key=lambda i: i[3], reverse=True)
+    with open(os.path.join(results_dir, f"{name}.txt"), 'w') as f:
+        f.write(f"{name}: {total_ms:.1f} ms total import time\n\n")
+        f.write(f"{'cumulative [ms]':>15} {'self [ms]':>10}  module\n")
+        for module, _, self_us, cumulative_us in heaviest:
+            f.write(f"{cumulative_us / 1000:>15.1f} {self_us / 1000:>10.1f}  {module}\n")
+
+
+def measure(root_dir: str, repeats: int, results_dir: str | None = None) -> dict[str, float | None]:
+    """
+    Returns the best time in ms of every entry point and CLI of the tree in
+    `root_dir`, or None for those that fail there. The per-entry-point
+    reports are written to `results_dir` if given.
+    """
+    timings = {}
+    with tempfile.TemporaryDirectory() as data_lake_root:
+        env = _env(root_dir, data_lake_root)
+        for name, statement in ENTRY_POINTS.items():
+            try:
+                total_ms, imports = profile_imports(statement, env, repeats, root_dir)
+            except subprocess.CalledProcessError:
+                timings[f"import {name}"] = None
+                continue
+            if results_dir is not None:
+                write_report(name, total_ms, imports, results_dir)
+            timings[f"import {name}"] = total_ms
+        for name, args in CLI_COMMANDS.items():
+            try:
+                timings[f"python -m pipelines.{name}"] = time_cli(args, env, repeats, root_dir)
+            except subprocess.CalledProcessError:
+                timings[f"python -m pipelines.{name}"] = None
+    return timings
+
+
+def _ms(value: float | None) -> str:
+    return f"{value:.1f}" if value is not None else ""
+
+
+def main(repeats: int, results_dir: str, baseline: str | None = None):
+    os.makedirs(results_dir, exist_ok=True)
+    timings = measure(ROOT_DIR, repeats, results_dir)
+    baseline_timings = {}
+    if baseline is not None:
+        with tempfile.TemporaryDirectory() as baseline_dir:
+            export_tree(baseline, baseline_dir)
+            baseline_timings = measure(baseline_dir, repeats)
+
+    with open(os.path.join(results_dir, 'summary.md'), 'w') as f:
+        if baseline is not None:
+            f.write(f"Best of {repeats} runs, at `{baseline}` and at this commit. Regenerate with\n"
+                    f"`python -m benchmarks.bench_import_time --repeats {repeats} --baseline {baseline}`.\n\n")
+            f.write("| Entry point | Baseline [ms] | Now [ms] |\n|---|---:|---:|\n")
+            for name, ms in timings.items():
+                f.write(f"| `{name}` | {_ms(baseline_timings.get(name))} | {_ms(ms)} |\n")
+        else:
+            f.write(f"| Entry point | Best of {repeats} [ms] |\n|---|---:|\n")
+            for name, ms in timings.items():
+                f.write(f"| `{name}` | {_ms(ms)} |\n")
+    for name, ms in timings.items():
+        before = f"{_ms(baseline_timings.get(name)):>8} ms -> " if baseline is not None else ""
+        print(f"{name:<55} {before}{_ms(ms):>8} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per entry point; the best one is reported.")
+    parser.add_argument("--results", default=RESULTS_DIR, help="Directory the reports are written to.")
+    parser.add_argument("--baseline", help="Git ref to measure as well, e.g. the commit before a change.")
+    args = parser.parse_args()
+    main(args.repeats, args.results, args.baseline)
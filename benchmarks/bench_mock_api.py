@@ -0,0 +1,83 @@
+"""
+Throughput benchmark for the mock API GetStatements endpoint.
+
+Serves synthetic statements from `benchmarks.synthetic_statements` and calls
+GetStatements for every account, round after round, through a Flask test
+client. The first round reads every statement file cold; later rounds show
+what repeated requests for unchanged files cost.
+
+With `--baseline`, the same rounds are run again with the parsed-statement
+cache cleared before every request, so every request parses its CSV again,
+as it did before the cache existed.
+
+Usage:
+    python -m benchmarks.bench_mock_api --customers 50 --rounds 5 --baseline
+"""
+import argparse
+import importlib
+import logging
+import os
+import statistics
+import tempfile
+import time
+from uuid import uuid4
+
+from benchmarks.synthetic_statements import generate_statements, write_mock_api_dataset
+
+
+def run_rounds(client, accounts: list, rounds: int, clear_cache=None) -> list[float]:
+    """Calls GetStatements for every account, round after round, and returns the requests/s of each round."""
+    customer_id, login_id = uuid4(), str(uuid4())
+    throughputs = []
+    for round_number in range(1, rounds + 1):
+        latencies = []
+        start = time.perf_counter()
+        for account in accounts:
+            request_start = time.perf_counter()
+            if clear_cache is not None:
+                clear_cache()
+            response = client.post(f'/v3/{customer_id}/BankingServices/GetStatements',
+                                   json={'LoginId': login_id, 'AccountNumber': account['AccountNumber']})
+            latencies.append(time.perf_counter() - request_start)
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - start
+        throughputs.append(len(accounts) / elapsed)
+        print(f"round {round_number}: {throughputs[-1]:8.1f} requests/s, "
+              f"p50 {statistics.median(latencies) * 1000:7.2f} ms, max {max(latencies) * 1000:7.2f} ms")
+    return throughputs
+
+
+def main(customers: int, accounts_per_customer: int, history_days: int, rounds: int, baseline: bool):
+    logging.disable(logging.INFO)
+    statements = generate_statements(customers, accounts_per_customer, history_days=history_days)
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = write_mock_api_dataset(statements, work_dir)
+        os.environ["API_MOCK_CONFIG"] = config_path
+        os.environ["API_MOCK_DATA_DIR"] = os.path.join(work_dir, 'data')
+
+        from api_mock import create_app
+        from api_mock.services import data_service
+        importlib.reload(data_service)
+
+        client = create_app().test_client()
+        accounts = data_service.get_accounts()
+        print(f"{statements.num_rows} transactions in {len(accounts)} statement files, {rounds} round(s)")
+
+        cached = run_rounds(client, accounts, rounds)
+        if baseline:
+            print("baseline: statement cache cleared before every request")
+            uncached = run_rounds(client, accounts, rounds, clear_cache=data_service.clear_statement_cache)
+            print(f"median round: {statistics.median(cached[1:] or cached):8.1f} requests/s cached (after the first), "
+                  f"{statistics.median(uncached):8.1f} requests/s uncached")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=50, help="Number of customers.")
+    parser.add_argument("--accounts", type=int, default=2, help="Accounts per customer.")
+    parser.add_argument("--days", type=int, default=730, help="Days of history per account.")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds of GetStatements calls over every account.")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Also run the rounds with the statement cache cleared before every request.")
+    args = parser.parse_args()
+    main(args.customers, args.accounts, args.days, args.rounds, args.baseline)
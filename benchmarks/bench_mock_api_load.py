@@ -0,0 +1,147 @@
+"""
+Load test of the mock API under each fault profile.
+
+Serves synthetic statements from `benchmarks.synthetic_statements` on a
+threaded local server, and has `--concurrency` clients call GetStatements
+for every account, round-robin, for `--duration` seconds per profile. The
+profile is selected per request with the X-Mock-Profile header. For each
+profile it reports the client throughput (all requests and successful ones),
+the latency percentiles, and how many requests were throttled (429), failed
+(5xx), or broke off mid-response (truncated).
+
+With `--retries`, clients retry throttled and failed requests with backoff,
+honoring Retry-After, and latency is measured across the retries.
+
+Usage:
+    python -m benchmarks.bench_mock_api_load --duration 10 --concurrency 8
+    python -m benchmarks.bench_mock_api_load --profiles throttled flaky --retries 3
+"""
+import argparse
+import importlib
+import itertools
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from uuid import uuid4
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from werkzeug.serving import make_server
+
+from benchmarks.synthetic_statements import generate_statements, write_mock_api_dataset
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _session(concurrency: int, retries: int) -> requests.Session:
+    retry = Retry(total=retries, status_forcelist=RETRY_STATUSES, allowed_methods=None, backoff_factor=0.1,
+                  respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    return session
+
+
+def _outcome(response: requests.Response) -> str:
+    if response.status_code == 200:
+        return 'ok'
+    if response.status_code == 429:
+        return '429'
+    if response.status_code >= 500:
+        return '5xx'
+    return str(response.status_code)
+
+
+def run_profile(base_url: str, account_numbers: list, profile: str, duration: float,
+                concurrency: int, retries: int) -> dict:
+    """Runs the clients against one profile for `duration` seconds and returns their latencies and outcomes."""
+    session = _session(concurrency, retries)
+    url = f"{base_url}/v3/{uuid4()}/BankingServices/GetStatements"
+    accounts = itertools.cycle(account_numbers)
+    accounts_lock = threading.Lock()
+    latencies, outcomes = [], Counter()
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            with accounts_lock:
+                account_number = next(accounts)
+            start = time.perf_counter()
+            try:
+                response = session.post(url, json={'LoginId': 'load-test', 'AccountNumber': account_number},
+                                        headers={'X-Mock-Profile': profile}, timeout=30)
+                outcome = _outcome(response)
+            except requests.exceptions.ChunkedEncodingError:
+                outcome = 'truncated'
+            except requests.exceptions.RequestException:
+                outcome = 'error'
+            elapsed = time.perf_counter() - start
+            with results_lock:
+                latencies.append(elapsed)
+                outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session.close()
+    return {'elapsed_s': time.perf_counter() - start, 'latencies': latencies, 'outcomes': outcomes}
+
+
+def _percentile(values: list, q: int) -> float:
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+
+def main(profiles: list | None, duration: float, concurrency: int, retries: int, customers: int, history_days: int):
+    logging.disable(logging.INFO)
+    statements = generate_statements(customers, 1, history_days=history_days)
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = write_mock_api_dataset(statements, work_dir)
+        os.environ["API_MOCK_CONFIG"] = config_path
+        os.environ["API_MOCK_DATA_DIR"] = os.path.join(work_dir, 'data')
+
+        from api_mock import create_app
+        from api_mock.services import data_service, fault_service
+        importlib.reload(data_service)
+
+        server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            account_numbers = [account['AccountNumber'] for account in data_service.get_accounts()]
+            profiles = profiles or list(fault_service.PROFILES['profiles'])
+            print(f"{len(account_numbers)} accounts, {concurrency} clients, {duration:g} s per profile, "
+                  f"{retries} retries")
+            print(f"{'profile':<16} {'req/s':>7} {'ok/s':>7} {'p50 [ms]':>9} {'p95 [ms]':>9} {'p99 [ms]':>9} "
+                  f"{'max [ms]':>9}  outcomes")
+            for profile in profiles:
+                fault_service.reset_rate_limits()
+                result = run_profile(base_url, account_numbers, profile, duration, concurrency, retries)
+                latencies_ms = [latency * 1000 for latency in result['latencies']]
+                outcomes = result['outcomes']
+                print(f"{profile:<16} {len(latencies_ms) / result['elapsed_s']:>7.1f} "
+                      f"{outcomes['ok'] / result['elapsed_s']:>7.1f} {_percentile(latencies_ms, 50):>9.1f} "
+                      f"{_percentile(latencies_ms, 95):>9.1f} {_percentile(latencies_ms, 99):>9.1f} "
+                      f"{max(latencies_ms):>9.1f}  {dict(sorted(outcomes.items()))}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="*", default=None, help="Fault profiles to run; all of them by default.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per profile.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients.")
+    parser.add_argument("--retries", type=int, default=0, help="Retries of throttled and failed requests.")
+    parser.add_argument("--customers", type=int, default=20, help="Number of customers, one account each.")
+    parser.add_argument("--days", type=int, default=365, help="Days of history per account.")
+    args = parser.parse_args()
+    main(args.profiles, args.duration, args.concurrency, args.retries, args.customers, args.days)
@@ -0,0 +1,101 @@
+"""
+Concurrency benchmark of the mock API servers.
+
+Serves synthetic statements from `benchmarks.synthetic_statements` with each
+server `run.py` can start, in a subprocess: the Flask dev server (`python
+run.py`, with debug=True) and uvicorn worker processes serving the async
+routes (`python run.py --asgi --workers N`). At each client concurrency,
+clients call GetStatements for every account, round-robin, for `--duration`
+seconds, as in `benchmarks.bench_mock_api_load`, and the requests per second
+and latency percentiles of each server are reported.
+
+Pass `--profile slow` to add the latency of that fault profile, which the
+Flask server waits out on a thread per request and the ASGI server awaits.
+
+Usage:
+    python -m benchmarks.bench_mock_api_servers --concurrency 1 8 32 --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchmarks.bench_mock_api_load import _percentile, run_profile
+from benchmarks.synthetic_statements import generate_statements, write_mock_api_dataset
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args: list, env: dict) -> tuple[subprocess.Popen, str]:
+    """Starts `run.py` with `args` on a free port and waits until it answers."""
+    port = _free_port()
+    # A new session, so that the dev server's reloader and uvicorn's workers are stopped with it.
+    process = subprocess.Popen([sys.executable, 'run.py', '--port', str(port), *args], cwd=ROOT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/api/statements", timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"run.py {' '.join(args)} did not start within {STARTUP_TIMEOUT_SECONDS} s.")
+
+
+def stop_server(process: subprocess.Popen):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def main(concurrency_levels: list, duration: float, workers: int, profile: str, customers: int, history_days: int):
+    statements = generate_statements(customers, 1, history_days=history_days)
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = write_mock_api_dataset(statements, work_dir)
+        env = {**os.environ, 'API_MOCK_CONFIG': config_path, 'API_MOCK_DATA_DIR': os.path.join(work_dir, 'data')}
+        with open(config_path) as f:
+            account_numbers = [account['AccountNumber'] for account in json.load(f)['accounts']]
+
+        servers = [('flask dev', []), (f'asgi x{workers}', ['--asgi', '--workers', str(workers)])]
+        print(f"{len(account_numbers)} accounts, {duration:g} s per run, fault profile '{profile}'")
+        print(f"{'server':<12} {'clients':>7} {'req/s':>8} {'p50 [ms]':>9} {'p99 [ms]':>9} {'failed':>7}")
+        for name, args in servers:
+            process, base_url = start_server(args, env)
+            try:
+                # Parse every statement file once in each worker before timing.
+                run_profile(base_url, account_numbers, profile, min(duration, 2), max(workers, 4), 0)
+                for concurrency in concurrency_levels:
+                    result = run_profile(base_url, account_numbers, profile, duration, concurrency, 0)
+                    latencies_ms = [latency * 1000 for latency in result['latencies']]
+                    failed = sum(count for outcome, count in result['outcomes'].items() if outcome != 'ok')
+                    print(f"{name:<12} {concurrency:>7} {len(latencies_ms) / result['elapsed_s']:>8.1f} "
+                          f"{_percentile(latencies_ms, 50):>9.1f} {_percentile(latencies_ms, 99):>9.1f} {failed:>7}")
+            finally:
+                stop_server(process)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrent clients per run.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per run.")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes.")
+    parser.add_argument("--profile", default="none", help="Fault profile sent with every request.")
+    parser.add_argument("--customers", type=int, default=20, help="Number of customers, one account each.")
+    parser.add_argument("--days", type=int, default=365, help="Days of history per account.")
+    args = parser.parse_args()
+    main(args.concurrency, args.duration, args.workers, args.profile, args.customers, args.days)
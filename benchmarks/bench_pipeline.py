@@ -0,0 +1,274 @@
+"""
+End-to-end benchmark suite for the statement pipeline.
+
+At each scale, synthetic statements from `benchmarks.synthetic_statements` are
+pushed through the same steps as an analysis run, and every step is timed:
+
+- the bronze write and `transform_statements.main`, in this process and as
+  the app runs it, on a warm `orchestrator.transform_pool` worker
+- the dbt models, with per-model timings from run_results.json
+- the on-disk size of the silver tables, and DuckDB reads of them and of the dbt output tables
+- the mock API endpoints, served from the same statements
+
+Results are appended to `benchmarks/results/pipeline.jsonl` and compared with
+the previous result at the same scale, flagging regressions.
+
+Usage:
+    python -m benchmarks.bench_pipeline --scales small medium
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+from deltalake import DeltaTable, write_deltalake
+
+from benchmarks.synthetic_statements import generate_statements, write_mock_api_dataset
+from pipelines import orchestrator, run_namespace, transform_statements
+
+SCALES = {
+    'small': dict(customers=5, accounts_per_customer=2, transactions_per_day=4, history_days=365),
+    'medium': dict(customers=50, accounts_per_customer=2, transactions_per_day=4, history_days=365),
+    'large': dict(customers=250, accounts_per_customer=2, transactions_per_day=6, history_days=730),
+}
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'pipeline.jsonl')
+ANALYTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics')
+RUN_ID = 'bench'
+
+# A timing this much slower than the previous result at the same scale is reported as a regression.
+REGRESSION_THRESHOLD = 0.2
+
+
+def _best_of(repeats: int, func) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_transform(statements, data_lake_root: str, repeats: int) -> dict:
+    """
+    Times the bronze write and transform_statements.main in a run namespace,
+    in this process and on a warm worker of the app's transform pool.
+    """
+    paths = run_namespace.lake_paths(data_lake_root, RUN_ID)
+
+    def write_bronze():
+        write_deltalake(paths['bronze'], statements, mode="overwrite", schema_mode="overwrite")
+
+    def transform():
+        with contextlib.redirect_stdout(io.StringIO()):
+            transform_statements.main("overwrite", data_lake_root, RUN_ID)
+
+    def transform_on_worker():
+        orchestrator._transform("overwrite", RUN_ID, data_lake_root, paths, in_process=False)
+
+    # The first transform on the pool starts its worker; the best of the repeats runs on a warm one.
+    metrics = {
+        'bronze_write_s': _best_of(repeats, write_bronze),
+        'transform_s': _best_of(repeats, transform),
+        'transform_app_worker_s': _best_of(repeats + 1, transform_on_worker),
+        'silver_rows': DeltaTable(paths['silver']).count(),
+    }
+    # On-disk size of the current version of each silver table, in MB.
+    for table, _ in transform_statements.SILVER_TABLES:
+        metrics[f"{table}_mb"] = pc.sum(pa.table(DeltaTable(paths[table]).get_add_actions())['size_bytes']).as_py() / 1e6
+    return metrics
+
+
+def bench_dbt(data_lake_root: str) -> dict:
+    """Times `dbt run` on the run namespace, with per-model timings. Skipped if dbt is not installed."""
+    if shutil.which("dbt") is None:
+        return {'dbt': 'skipped: dbt is not installed'}
+
+    target_path = os.path.abspath(run_namespace.lake_paths(data_lake_root, RUN_ID)['dbt_target'])
+    start = time.perf_counter()
+    subprocess.run(
+        ["dbt", "run", "--full-refresh", "--target-path", target_path],
+        cwd=ANALYTICS_DIR, env=run_namespace.dbt_env(RUN_ID, data_lake_root),
+        check=True, capture_output=True, text=True,
+    )
+    metrics = {'dbt_run_s': time.perf_counter() - start}
+    with open(os.path.join(target_path, "run_results.json")) as f:
+        for result in json.load(f)['results']:
+            metrics[f"dbt_model_{result['unique_id'].split('.')[-1]}_s"] = result['execution_time']
+    return metrics
+
+
+def bench_duckdb(data_lake_root: str, repeats: int) -> dict:
+    """Times DuckDB scans of the silver table and, after dbt, reads of the tables the app loads."""
+    paths = run_namespace.lake_paths(data_lake_root, RUN_ID)
+    metrics = {}
+    with duckdb.connect() as con:
+        con.register('silver', DeltaTable(paths['silver']).to_pyarrow_dataset())
+        metrics['duckdb_silver_daily_totals_s'] = _best_of(repeats, lambda: con.sql(
+            "SELECT email, date, SUM(TRY_CAST(NULLIF(deposits, '') AS DOUBLE)) AS deposits,"
+            " SUM(TRY_CAST(NULLIF(withdrawals, '') AS DOUBLE)) AS withdrawals"
+            " FROM silver GROUP BY ALL"
+        ).fetchall())
+        # Every column of every transaction, with its customer and account joined back on.
+        for table in ('silver_customers', 'silver_accounts'):
+            con.register(table, DeltaTable(paths[table]).to_pyarrow_dataset())
+        metrics['duckdb_silver_scan_all_s'] = _best_of(repeats, lambda: con.sql(
+            "SELECT * FROM silver"
+            " LEFT JOIN silver_customers USING (email, request_id)"
+            " LEFT JOIN silver_accounts USING (email, request_id, account_number)"
+        ).to_arrow_table())
+
+    if os.path.exists(paths['dbt_db']):
+        with duckdb.connect(paths['dbt_db'], read_only=True) as con:
+            for table in ("fct_daily_transactions_by_customer", "fct_credit_metrics_by_customer"):
+                metrics[f"duckdb_read_{table}_s"] = _best_of(repeats, lambda: con.table(table).to_df())
+    return metrics
+
+
+def bench_mock_api(statements, work_dir: str, repeats: int) -> dict:
+    """Times the mock API endpoints, serving the synthetic statements through a test client."""
+    from api_mock import create_app
+    from api_mock.services import data_service
+
+    config_path = write_mock_api_dataset(statements, os.path.join(work_dir, 'api_mock'))
+    previous_env = {key: os.environ.get(key) for key in ("API_MOCK_CONFIG", "API_MOCK_DATA_DIR")}
+    os.environ["API_MOCK_CONFIG"] = config_path
+    os.environ["API_MOCK_DATA_DIR"] = os.path.join(os.path.dirname(config_path), 'data')
+    importlib.reload(data_service)
+    try:
+        client = create_app().test_client()
+        customer_id = uuid4()
+        login_id = str(uuid4())
+        accounts = data_service.get_accounts()
+        emails = sorted({account['Holder']['Email'] for account in accounts})
+
+        def get_statements():
+            for account in accounts:
+                client.post(f'/v3/{customer_id}/BankingServices/GetStatements',
+                            json={'LoginId': login_id, 'AccountNumber': account['AccountNumber']})
+
+        def combined_statements():
+            for email in emails:
+                client.get('/api/statements', query_string={'email': email})
+
+        def download():
+            for email in emails:
+                client.post('/download', data={'email': email})
+
+        metrics = {
+            'api_get_accounts_detail_s': _best_of(repeats, lambda: client.post(
+                f'/v3/{customer_id}/BankingServices/GetAccountsDetail', json={'LoginId': login_id})),
+            'api_get_statements_s': _best_of(repeats, get_statements),
+            'api_combined_statements_s': _best_of(repeats, combined_statements),
+            'api_download_s': _best_of(repeats, download),
+        }
+        metrics['api_get_statements_per_account_ms'] = metrics['api_get_statements_s'] / len(accounts) * 1000
+        return metrics
+    finally:
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        importlib.reload(data_service)
+
+
+def run_scale(scale: str, repeats: int) -> dict:
+    """Runs every benchmark at one scale and returns the result record."""
+    params = SCALES[scale]
+    start = time.perf_counter()
+    statements = generate_statements(**params)
+    metrics = {'generate_s': time.perf_counter() - start}
+
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{scale}_")
+    try:
+        metrics.update(bench_transform(statements, work_dir, repeats))
+        metrics.update(bench_dbt(work_dir))
+        metrics.update(bench_duckdb(work_dir, repeats))
+        metrics.update(bench_mock_api(statements, work_dir, repeats))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'scale': scale,
+        'params': params,
+        'rows': statements.num_rows,
+        'metrics': metrics,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(results_path: str = RESULTS_PATH) -> list[dict]:
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(result: dict, previous: dict | None, threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """
+    Returns one line per timing of `result`, with its change against the
+    previous result at the same scale. Regressions beyond `threshold` are flagged.
+    """
+    lines = []
+    previous_metrics = (previous or {}).get('metrics', {})
+    for name, value in result['metrics'].items():
+        if not name.endswith(('_s', '_ms')):
+            lines.append(f"  {name:<48} {value}")
+            continue
+        line = f"  {name:<48} {value:10.4f}"
+        before = previous_metrics.get(name)
+        if isinstance(before, (int, float)) and before > 0:
+            change = value / before - 1
+            line += f"  {change:+7.1%} vs {previous['git_commit'] or 'previous'}"
+            if change > threshold:
+                line += "  REGRESSION"
+        lines.append(line)
+    return lines
+
+
+def main(scales: list[str], repeats: int, results_path: str, record: bool):
+    logging.disable(logging.INFO)
+    history = load_results(results_path)
+    for scale in scales:
+        result = run_scale(scale, repeats)
+        previous = next((r for r in reversed(history) if r['scale'] == scale and r['params'] == result['params']), None)
+
+        print(f"{scale}: {result['rows']} transactions ({result['params']})")
+        print("\n".join(compare(result, previous)))
+
+        if record:
+            os.makedirs(os.path.dirname(results_path), exist_ok=True)
+            with open(results_path, 'a') as f:
+                f.write(json.dumps(result) + "\n")
+            history.append(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"], help="Scales to run.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions; the best one is reported.")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSON lines file the results are appended to.")
+    parser.add_argument("--no-record", action="store_true", help="Compare without appending the results.")
+    args = parser.parse_args()
+    main(args.scales, args.repeats, args.results, not args.no_record)
@@ -0,0 +1,121 @@
+"""
+Serialization benchmark for the mock API statement endpoints.
+
+Serves synthetic statements from `benchmarks.synthetic_statements` and fetches
+every account from GetStatements and every customer from /api/statements in
+each format the endpoints negotiate. For each format it reports the response
+size, the time the server takes to answer, and the time the client takes to
+decode the response into something the bronze writer accepts: a DataFrame
+for JSON, as the clients used to build, and an Arrow table otherwise.
+
+Usage:
+    python -m benchmarks.bench_serialization --customers 20 --days 730
+"""
+import argparse
+import importlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from uuid import uuid4
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+from benchmarks.synthetic_statements import generate_statements, write_mock_api_dataset
+
+
+def _decode_statements_json(body: bytes):
+    return pd.DataFrame([t for s in json.loads(body)['Statements'] for t in s['Transactions']])
+
+
+def _decode_arrow(body: bytes):
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+
+
+def _decode_ndjson(body: bytes):
+    return pa_json.read_json(pa.BufferReader(body))
+
+
+def _decode_parquet(body: bytes):
+    return pq.read_table(io.BytesIO(body))
+
+
+# (name, Accept header, decoder) per endpoint.
+STATEMENTS_FORMATS = [
+    ('json', 'application/json', _decode_statements_json),
+    ('arrow', 'application/vnd.apache.arrow.stream', _decode_arrow),
+    ('parquet', 'application/vnd.apache.parquet', _decode_parquet),
+]
+COMBINED_FORMATS = [
+    ('json', 'application/json', lambda body: pd.DataFrame(json.loads(body))),
+    ('ndjson', 'application/x-ndjson', _decode_ndjson),
+    ('arrow', 'application/vnd.apache.arrow.stream', _decode_arrow),
+    ('parquet', 'application/vnd.apache.parquet', _decode_parquet),
+]
+
+
+def _measure(requests, decode) -> dict:
+    """Sends every request, then decodes every response body, timing both phases."""
+    start = time.perf_counter()
+    bodies = [send().data for send in requests]
+    server_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for body in bodies:
+        decode(body)
+    decode_s = time.perf_counter() - start
+    return {'bytes': sum(map(len, bodies)), 'server_s': server_s, 'decode_s': decode_s}
+
+
+def main(customers: int, accounts_per_customer: int, history_days: int, repeats: int):
+    logging.disable(logging.INFO)
+    statements = generate_statements(customers, accounts_per_customer, history_days=history_days)
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_path = write_mock_api_dataset(statements, work_dir)
+        os.environ["API_MOCK_CONFIG"] = config_path
+        os.environ["API_MOCK_DATA_DIR"] = os.path.join(work_dir, 'data')
+
+        from api_mock import create_app
+        from api_mock.services import data_service
+        importlib.reload(data_service)
+        client = create_app().test_client()
+        accounts = data_service.get_accounts()
+        emails = sorted({account['Holder']['Email'] for account in accounts})
+        print(f"{statements.num_rows} transactions, {len(accounts)} accounts, {len(emails)} customers; best of {repeats}")
+
+        endpoints = [
+            ('GetStatements', STATEMENTS_FORMATS, lambda accept: [
+                (lambda account=account: client.post(
+                    f'/v3/{uuid4()}/BankingServices/GetStatements',
+                    json={'LoginId': 'bench', 'AccountNumber': account['AccountNumber']}, headers={'Accept': accept}))
+                for account in accounts
+            ]),
+            ('/api/statements', COMBINED_FORMATS, lambda accept: [
+                (lambda email=email: client.get('/api/statements', query_string={'email': email}, headers={'Accept': accept}))
+                for email in emails
+            ]),
+        ]
+        for endpoint, formats, build_requests in endpoints:
+            print(f"\n{endpoint}")
+            print(f"  {'format':<8} {'size [MB]':>10} {'server [s]':>11} {'decode [s]':>11} {'total [s]':>10}")
+            for name, accept, decode in formats:
+                requests = build_requests(accept)
+                _measure(requests, decode)  # Warm the statement store.
+                results = [_measure(requests, decode) for _ in range(repeats)]
+                best = min(results, key=lambda r: r['server_s'] + r['decode_s'])
+                print(f"  {name:<8} {best['bytes'] / 1e6:>10.2f} {best['server_s']:>11.3f} {best['decode_s']:>11.3f} "
+                      f"{best['server_s'] + best['decode_s']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=20, help="Number of customers.")
+    parser.add_argument("--accounts", type=int, default=2, help="Accounts per customer.")
+    parser.add_argument("--days", type=int, default=730, help="Days of history per account.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions; the best one is reported.")
+    args = parser.parse_args()
+    main(args.customers, args.accounts, args.days, args.repeats)
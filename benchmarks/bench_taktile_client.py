@@ -0,0 +1,87 @@
+"""
+Benchmark for Taktile decisions against the local emulator.
+
+Starts `taktile_mock` in-process with a fixed latency and compares deciding a
+portfolio one customer at a time, as the app originally did, with
+`app.taktile_client.TaktileClient.decide_many`, then repeats the portfolio
+against a warm decision cache.
+
+Usage:
+    python -m benchmarks.bench_taktile_client --customers 50 --latency-ms 150
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from app.decision_cache import DecisionCache
+from app.taktile_client import TaktileClient
+from taktile_mock import create_app
+
+
+def make_payload(seed: int) -> dict:
+    """Builds one decision payload with the credit metrics the app sends."""
+    rng = random.Random(seed)
+    annual_revenue = rng.uniform(100_000, 2_000_000)
+    return {
+        "data": {
+            "request_id": f"request-{seed}",
+            "email": f"customer{seed}@example.com",
+            "revenue_recent_90d": annual_revenue / 4 * rng.uniform(0.8, 1.2),
+            "revenue_91_to_180d": annual_revenue / 4,
+            "debits_recent_90d": annual_revenue / 4 * rng.uniform(0.7, 1.3),
+            "most_recent_balance_across_bank_accounts": rng.uniform(5_000, 200_000),
+            "estimated_annual_revenue": annual_revenue,
+            "average_daily_balance": rng.uniform(5_000, 200_000),
+            "smart_revenue": annual_revenue * 0.9,
+            "existing_debt_payments_consideration": rng.uniform(0, annual_revenue / 40),
+            "average_weekly_revenue": annual_revenue / 52,
+        },
+        "metadata": {"entity_id": f"request-{seed}"},
+        "control": {"execution_mode": "sync"},
+    }
+
+
+def main(num_customers: int, latency_ms: int, max_concurrency: int):
+    os.environ["TAKTILE_MOCK_LATENCY_MS"] = str(latency_ms)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        client = TaktileClient(base_url, "local", max_concurrency=max_concurrency)
+        payloads = [make_payload(seed) for seed in range(num_customers)]
+
+        start = time.perf_counter()
+        for payload in payloads:
+            client.decide(payload)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.decide_many(payloads)
+        concurrent = time.perf_counter() - start
+
+        cached_client = TaktileClient(base_url, "local", max_concurrency=max_concurrency, cache=DecisionCache(":memory:"))
+        cached_client.decide_many(payloads)
+        start = time.perf_counter()
+        cached_client.decide_many(payloads)
+        cached = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"{num_customers} decisions, {latency_ms} ms emulated latency, concurrency {max_concurrency}")
+    print(f"sequential decide : {sequential:.2f}s ({num_customers / sequential:.1f} decisions/s)")
+    print(f"decide_many       : {concurrent:.2f}s ({num_customers / concurrent:.1f} decisions/s)")
+    print(f"speedup           : {sequential / concurrent:.1f}x")
+    print(f"decide_many (warm decision cache) : {cached:.3f}s ({num_customers / cached:.0f} decisions/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=50, help="Number of decisions in the portfolio.")
+    parser.add_argument("--latency-ms", type=int, default=150, help="Latency emulated per decision.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum decisions in flight.")
+    args = parser.parse_args()
+    main(args.customers, args.latency_ms, args.concurrency)
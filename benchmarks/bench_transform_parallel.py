@@ -0,0 +1,70 @@
+"""
+Scaling benchmark of the parallel bronze-to-silver transform.
+
+Writes synthetic statements from `benchmarks.synthetic_statements` to bronze
+at a scale of `benchmarks.bench_pipeline`, and times `transform_statements.main`
+serially and with `pipelines.transform_parallel` on each number of worker
+processes: an overwrite, as in a backfill, then a merge of the same bronze,
+in which every row is already in silver. Speed-ups are relative to the serial
+run, and are bounded by the cores of the machine, which are reported.
+
+Bronze is read once by the parent and split into one file per worker, so each
+worker's CPU time should shrink as workers are added. The CPU time of the
+busiest worker is reported for each overwrite, along with the wall time the
+overwrite would take with a core per worker: the measured wall time, less the
+CPU time of every worker but the busiest. On a machine with fewer cores than
+workers, where the workers take turns on the cores, that is the number to
+compare with the serial run.
+
+Usage:
+    python -m benchmarks.bench_transform_parallel --scale large --workers 2 4 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from deltalake import DeltaTable, write_deltalake
+
+from benchmarks.bench_pipeline import SCALES
+from benchmarks.synthetic_statements import generate_statements
+from pipelines import run_namespace, transform_statements
+
+
+def _timed(function) -> tuple[float, object]:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function()
+    return time.perf_counter() - start, result
+
+
+def main(scale: str, worker_counts: list):
+    statements = generate_statements(**SCALES[scale])
+    print(f"scale '{scale}': {statements.num_rows} bronze rows, {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'overwrite [s]':>14} {'speed-up':>9} {'merge [s]':>10} {'speed-up':>9} "
+          f"{'busiest worker CPU [s]':>23} {'core per worker [s]':>20} {'speed-up':>9} {'silver rows':>12}")
+    baseline = None
+    for workers in [1, *worker_counts]:
+        with tempfile.TemporaryDirectory() as data_lake_root:
+            paths = run_namespace.lake_paths(data_lake_root)
+            write_deltalake(paths['bronze'], statements, mode="overwrite")
+            overwrite, worker_cpu = _timed(lambda: transform_statements.main('overwrite', data_lake_root, workers=workers))
+            merge, _ = _timed(lambda: transform_statements.main('merge', data_lake_root, workers=workers))
+            silver_rows = DeltaTable(paths['silver']).count()
+        baseline = baseline or (overwrite, merge)
+        # The serial transform runs in this process and reports no worker times.
+        busiest = max(worker_cpu) if worker_cpu else overwrite
+        core_per_worker = overwrite - sum(worker_cpu) + busiest if worker_cpu else overwrite
+        print(f"{workers:>7} {overwrite:>14.2f} {baseline[0] / overwrite:>8.2f}x "
+              f"{merge:>10.2f} {baseline[1] / merge:>8.2f}x "
+              f"{busiest:>23.2f} {core_per_worker:>20.2f} {baseline[0] / core_per_worker:>8.2f}x {silver_rows:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="medium", choices=list(SCALES), help="Scale of the synthetic statements.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Worker process counts to time.")
+    args = parser.parse_args()
+    main(args.scale, args.workers)
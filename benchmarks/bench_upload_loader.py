@@ -0,0 +1,78 @@
+"""
+Benchmark for parsing uploaded statement CSVs.
+
+Compares the original `pd.concat([pd.read_csv(file) ...])` approach of the
+Manual CSV Upload page with `app.upload_loader.load_statement_files`, on
+dozens of multi-year statements.
+
+Usage:
+    python -m benchmarks.bench_upload_loader --files 36 --years 3
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from app.upload_loader import STATEMENT_COLUMNS, load_statement_files
+
+
+def make_statement(seed: int, years: int, transactions_per_day: int) -> bytes:
+    """Builds one statement CSV in memory with the mock API column layout."""
+    rng = random.Random(seed)
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(STATEMENT_COLUMNS)
+    start = date(2024, 1, 1) - timedelta(days=365 * years)
+    balance = 5000.0
+    for day in range(365 * years):
+        current = (start + timedelta(days=day)).isoformat()
+        for _ in range(transactions_per_day):
+            amount = round(rng.uniform(5, 2000), 2)
+            is_deposit = rng.random() < 0.4
+            balance += amount if is_deposit else -amount
+            writer.writerow([
+                "Customer", f"customer{seed}@example.com", "1 MAIN ST", "Simplii", "",
+                f"login-{seed}", f"request-{seed}", "2024-01-01 00:00:00", "Get Statements Completed", "",
+                "tag=value", "No Fee Chequing Account", f"010-30800-{seed:010d}", "Operation", f"{balance:.2f}",
+                current, "EFT CREDIT STRIPE" if is_deposit else "MISCELLANEOUS PAYMENTS",
+                "credit" if is_deposit else "debit", "",
+                "" if is_deposit else f"{amount:.2f}", f"{amount:.2f}" if is_deposit else "", f"{balance:.2f}",
+            ])
+    return output.getvalue().encode('utf-8')
+
+
+def _best_of(repeats: int, func) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(num_files: int, years: int, transactions_per_day: int, repeats: int):
+    statements = [make_statement(seed, years, transactions_per_day) for seed in range(num_files)]
+    total_mb = sum(len(s) for s in statements) / 1e6
+
+    baseline = _best_of(repeats, lambda: pd.concat([pd.read_csv(io.BytesIO(s)) for s in statements], ignore_index=True))
+    loader = _best_of(repeats, lambda: load_statement_files([io.BytesIO(s) for s in statements]))
+    rows = load_statement_files([io.BytesIO(s) for s in statements]).num_rows
+
+    print(f"{num_files} statements, {rows} rows, {total_mb:.1f} MB")
+    print(f"pandas read_csv + concat : {baseline:.3f}s ({total_mb / baseline:.1f} MB/s)")
+    print(f"upload_loader (pyarrow)  : {loader:.3f}s ({total_mb / loader:.1f} MB/s)")
+    print(f"speedup                  : {baseline / loader:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=36, help="Number of statement files.")
+    parser.add_argument("--years", type=int, default=3, help="Years of history per statement.")
+    parser.add_argument("--transactions-per-day", type=int, default=4, help="Transactions per day per statement.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions; the best one is reported.")
+    args = parser.parse_args()
+    main(args.files, args.years, args.transactions_per_day, args.repeats)
@@ -0,0 +1,194 @@
+"""
+Deterministic generator of synthetic bank statements.
+
+Statements have the same column layout as `api_mock/data/mock_statement_*.csv`,
+with a configurable number of customers, accounts per customer, transactions
+per day and days of history. The same arguments and seed always produce the
+same statements, so benchmark results are comparable across runs.
+
+Usage:
+    python -m benchmarks.synthetic_statements --customers 50 --accounts 2 --days 365 --out /tmp/statements
+"""
+import argparse
+import json
+import os
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+from app.upload_loader import STATEMENT_COLUMNS, STATEMENT_SCHEMA
+
+DEFAULT_END_DATE = date(2024, 2, 9)
+
+# (description, relative frequency, median amount), modelled on the mock statements.
+DEPOSITS = [
+    ("EFT CREDIT STRIPE", 6, 900),
+    ("EFT CREDIT SHOPIFY", 4, 650),
+    ("EFT CREDIT AIRBNB PAYMENTS", 3, 1200),
+    ("INTERAC E-TRANSFER RECEIVE", 5, 400),
+    ("CURRENT CREDIT ADJUSTMENT EFT REVERSAL PAYPAL", 1, 250),
+    ("TRANSFER IN", 2, 1500),
+    ("INTEREST", 1, 3),
+]
+WITHDRAWALS = [
+    ("POS MERCHANDISE SOBEYS", 6, 60),
+    ("POS MERCHANDISE TIM HORTONS", 5, 12),
+    ("POS MERCHANDISE COSTCO GAS W", 4, 80),
+    ("MISCELLANEOUS PAYMENTS PAYPAL", 3, 90),
+    ("MISCELLANEOUS PAYMENTS INTUIT QBOOKS ONL", 1, 45),
+    ("INTERNET BILL PAYMENT VISA, TD/BANQUE TD", 2, 1200),
+    ("INTERNET BILL PAYMENT MASTERCARD, CIBC/BANQUE C", 2, 900),
+    ("INTERNET BILL PAYMENT CRA REVENUE - TAX AMNT", 1, 1500),
+    ("MORTGAGE BNS MTGE DEPARTMENT", 2, 1800),
+    ("LOANS RBC LOAN PYMT", 2, 700),
+    ("INTERAC E-TRANSFER SEND", 4, 300),
+    ("UTILITY BILL PAYMENT ENBRIDGE", 1, 120),
+    ("ABM INTERAC WITHDRAWAL", 1, 100),
+    ("TRANSFER OUT", 2, 1500),
+    ("NSF FEE NSF S/C", 1, 45),
+]
+INSTITUTIONS = ["Simplii", "RBC", "TD", "Scotiabank", "CIBC", "BMO"]
+
+# Share of transactions that are deposits. Debits are more frequent but
+# smaller, so balances drift slowly rather than exploding.
+DEPOSIT_PROBABILITY = 0.4
+
+
+def _deterministic_uuid(rng: np.random.Generator) -> str:
+    return str(uuid.UUID(bytes=rng.bytes(16))).upper()
+
+
+def _pick(rng: np.random.Generator, vocabulary, size: int):
+    """Draws descriptions and log-normally distributed amounts from a vocabulary."""
+    weights = np.array([weight for _, weight, _ in vocabulary], dtype=np.float64)
+    choices = rng.choice(len(vocabulary), size=size, p=weights / weights.sum())
+    medians = np.array([median for _, _, median in vocabulary], dtype=np.float64)[choices]
+    amounts = np.round(medians * rng.lognormal(0.0, 0.5, size=size), 2)
+    descriptions = np.array([description for description, _, _ in vocabulary], dtype=object)[choices]
+    return descriptions, amounts
+
+
+def _account_statement(rng: np.random.Generator, customer: dict, account_number: str,
+                       transactions_per_day: float, history_days: int, end_date: date) -> pa.Table:
+    """Builds the transactions of one account, oldest first, with a running balance."""
+    per_day = rng.poisson(transactions_per_day, size=history_days)
+    day_offsets = np.repeat(np.arange(history_days - 1, -1, -1), per_day)
+    num_rows = len(day_offsets)
+
+    is_deposit = rng.random(num_rows) < DEPOSIT_PROBABILITY
+    descriptions = np.empty(num_rows, dtype=object)
+    amounts = np.empty(num_rows, dtype=np.float64)
+    descriptions[is_deposit], amounts[is_deposit] = _pick(rng, DEPOSITS, int(is_deposit.sum()))
+    descriptions[~is_deposit], amounts[~is_deposit] = _pick(rng, WITHDRAWALS, int((~is_deposit).sum()))
+
+    opening_balance = round(float(rng.uniform(1_000, 20_000)), 2)
+    balances = np.round(opening_balance + np.cumsum(np.where(is_deposit, amounts, -amounts)), 2)
+    dates = np.datetime64(end_date, 'D') - day_offsets.astype('timedelta64[D]')
+
+    formatted_amounts = pa.array(np.char.mod('%.2f', amounts), pa.string())
+    empty = pa.array([""] * num_rows, pa.string())
+    columns = {
+        **{name: pa.array([value] * num_rows, pa.string()) for name, value in customer.items()},
+        'Account Name': pa.array(["No Fee Chequing Account"] * num_rows, pa.string()),
+        'Account Number': pa.array([account_number] * num_rows, pa.string()),
+        'Account Type': pa.array(["Operation"] * num_rows, pa.string()),
+        'Account Balance': pa.array([f"{balances[-1]:.2f}" if num_rows else ""] * num_rows, pa.string()),
+        'Date': pc.cast(pa.array(dates), pa.string()),
+        'Description': pa.array(descriptions, pa.string()),
+        'Category': pa.array(np.where(is_deposit, "credit", "debit"), pa.string()),
+        'Subcategory': empty,
+        'Withdrawals': pc.if_else(pa.array(is_deposit), empty, formatted_amounts),
+        'Deposits': pc.if_else(pa.array(is_deposit), formatted_amounts, empty),
+        'Balance': pa.array(np.char.mod('%.2f', balances), pa.string()),
+    }
+    return pa.table([columns[name] for name in STATEMENT_COLUMNS], schema=STATEMENT_SCHEMA)
+
+
+def generate_statements(customers: int = 10, accounts_per_customer: int = 2, transactions_per_day: float = 4.0,
+                        history_days: int = 365, seed: int = 0, end_date: date = DEFAULT_END_DATE) -> pa.Table:
+    """
+    Generates the statements of `customers` customers, each with
+    `accounts_per_customer` accounts and `history_days` days of history ending
+    on `end_date`. Daily transaction counts are Poisson distributed around
+    `transactions_per_day`. Every column is a string, as in the uploaded CSVs.
+    """
+    rng = np.random.default_rng(seed)
+    request_datetime = f"{end_date + timedelta(days=2)} 19:26:39"
+    tables = []
+    for index in range(customers):
+        customer = {
+            'Username': f"Customer {index:05d}",
+            'Email': f"CUSTOMER{index:05d}@EXAMPLE.COM",
+            'Address': f"{index + 1} MAIN ST, HAMILTON, ON, L9K1P1",
+            'Financial Institution': INSTITUTIONS[index % len(INSTITUTIONS)],
+            'Employer Name': "",
+            'Login ID': _deterministic_uuid(rng).lower(),
+            'Request ID': _deterministic_uuid(rng),
+            'Request Date/Time': request_datetime,
+            'Request Status': "Get Statements Completed",
+            'Days Detected': "",
+            'Tag': f"email=customer{index:05d}@example.com,reconnect=false",
+        }
+        for account in range(accounts_per_customer):
+            account_number = f"010-{30800 + account:05d}-{index:010d}"
+            tables.append(_account_statement(rng, customer, account_number, transactions_per_day, history_days, end_date))
+    return pa.concat_tables(tables) if tables else STATEMENT_SCHEMA.empty_table()
+
+
+def write_statement_csvs(statements: pa.Table, out_dir: str) -> dict:
+    """
+    Writes one CSV per account, like the mock API statement files.
+    Returns a mapping of account number to file name.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    account_numbers = statements.column('Account Number')
+    for account_number in pc.unique(account_numbers).to_pylist():
+        file_name = f"statement_{account_number}.csv"
+        pv.write_csv(statements.filter(pc.equal(account_numbers, account_number)), os.path.join(out_dir, file_name))
+        files[account_number] = file_name
+    return files
+
+
+def write_mock_api_dataset(statements: pa.Table, out_dir: str) -> str:
+    """
+    Writes the statements as a mock API dataset: one CSV per account under
+    `out_dir/data` and a `config.json` describing the accounts. Returns the
+    config path, to be used as API_MOCK_CONFIG with API_MOCK_DATA_DIR.
+    """
+    files = write_statement_csvs(statements, os.path.join(out_dir, 'data'))
+    accounts = []
+    for index, (account_number, file_name) in enumerate(files.items()):
+        rows = statements.filter(pc.equal(statements.column('Account Number'), account_number)).slice(0, 1).to_pylist()[0]
+        accounts.append({
+            'Id': f"{index:06d}_{account_number}",
+            'AccountNumber': account_number,
+            'Type': rows['Account Type'],
+            'Balance': {'Current': float(rows['Account Balance'] or 0)},
+            'Holder': {'Name': rows['Username'], 'Email': rows['Email'].lower()},
+            'Institution': rows['Financial Institution'],
+            'statementFile': file_name,
+        })
+    config_path = os.path.join(out_dir, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump({'accounts': accounts}, f, indent=2)
+    return config_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=10, help="Number of customers.")
+    parser.add_argument("--accounts", type=int, default=2, help="Accounts per customer.")
+    parser.add_argument("--transactions-per-day", type=float, default=4.0, help="Mean transactions per day per account.")
+    parser.add_argument("--days", type=int, default=365, help="Days of history per account.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--out", required=True, help="Output directory for the mock API dataset.")
+    args = parser.parse_args()
+
+    statements = generate_statements(args.customers, args.accounts, args.transactions_per_day, args.days, args.seed)
+    config_path = write_mock_api_dataset(statements, args.out)
+    print(f"Wrote {statements.num_rows} transactions for {args.customers} customer(s) to {args.out} ({config_path}).")
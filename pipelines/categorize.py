@@ -0,0 +1,94 @@
+import os
+import json
+import argparse
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# The categories and their merchant and keyword patterns, in order of precedence.
+CATEGORY_RULES_PATH = os.getenv(
+    "CATEGORY_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_rules.json'))
+
+# Silver column holding the category of each transaction, '' when no rule matches.
+CATEGORY_COLUMN = 'transaction_category'
+UNCATEGORIZED = ''
+
+# Characters with a meaning in RE2 syntax, escaped so that patterns match literally.
+_REGEX_SPECIAL_CHARACTERS = set('\\.^$|?*+()[]{}')
+
+
+def load_rules(path: str = CATEGORY_RULES_PATH) -> list[dict]:
+    """Returns the categories of the rule set, each with its `name` and `patterns`."""
+    with open(path, 'r') as f:
+        return json.load(f)['categories']
+
+
+def _escape(pattern: str) -> str:
+    return ''.join('\\' + c if c in _REGEX_SPECIAL_CHARACTERS else c for c in pattern)
+
+
+def _alternation(patterns) -> str:
+    # Longer patterns first, so that a pattern is never cut short by one of its prefixes.
+    return '|'.join(_escape(p) for p in sorted(patterns, key=len, reverse=True))
+
+
+def build_filter(rules: list[dict]) -> str:
+    """Compiles a rule set into a single RE2 expression that matches descriptions of any category."""
+    return '(?is)\\b(?:' + _alternation(p for category in rules for p in category['patterns']) + ')\\b'
+
+
+def build_matcher(rules: list[dict]) -> str:
+    """
+    Compiles a rule set into a single RE2 expression with one named group per
+    category. Patterns match case-insensitively, as whole words, anywhere in
+    the description. The expression is anchored and each category is an
+    alternative of its own, so when several categories match, the first one
+    in the rule set wins, whatever their position in the description.
+    """
+    alternatives = []
+    for category in rules:
+        if not category['name'].isidentifier():
+            raise ValueError(f"Category name '{category['name']}' must be a valid identifier.")
+        alternatives.append(f".*?\\b(?P<{category['name']}>{_alternation(category['patterns'])})\\b")
+    return '(?is)^(?:' + '|'.join(alternatives) + ')'
+
+
+def categorize(descriptions: pa.Array | pa.ChunkedArray, rules: list[dict] | None = None) -> pa.Array:
+    """
+    Returns the category of every description, or UNCATEGORIZED.
+
+    All categories are matched by one combined RE2 automaton over the Arrow
+    string array, rather than a regex per row and category.
+    Descriptions repeat heavily, so each distinct description is matched only
+    once and the categories are taken back out to every row.
+    """
+    rules = load_rules() if rules is None else rules
+    if isinstance(descriptions, pa.ChunkedArray):
+        descriptions = descriptions.combine_chunks()
+    if not pa.types.is_dictionary(descriptions.type):
+        descriptions = pc.dictionary_encode(descriptions)
+    distinct = descriptions.dictionary.cast(pa.string())
+    if not rules or len(distinct) == 0:
+        return pa.array([UNCATEGORIZED] * len(descriptions), pa.string())
+
+    # A first pass without capture groups runs on RE2's DFA and rules out most
+    # descriptions; the groups are only extracted from the ones that match.
+    is_candidate = pc.match_substring_regex(distinct, pattern=build_filter(rules))
+    matches = pc.extract_regex(distinct.filter(is_candidate), pattern=build_matcher(rules))
+    candidate_categories = pa.array([UNCATEGORIZED] * len(matches), pa.string())
+    # Non-matching groups extract '', so a group that extracted text names the category.
+    for category in reversed(rules):
+        matched = pc.fill_null(pc.not_equal(pc.struct_field(matches, category['name']), ''), False)
+        candidate_categories = pc.if_else(matched, category['name'], candidate_categories)
+    categories = pa.array([UNCATEGORIZED] * len(distinct), pa.string())
+    categories = pc.replace_with_mask(categories, is_candidate, candidate_categories)
+    return pc.fill_null(pc.take(categories, descriptions.indices), UNCATEGORIZED)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prints the category of each description.")
+    parser.add_argument("descriptions", nargs="+")
+    parser.add_argument("--rules", default=CATEGORY_RULES_PATH, help="Path of the category rule set.")
+    args = parser.parse_args()
+    for description, category in zip(args.descriptions, categorize(pa.array(args.descriptions), load_rules(args.rules)).to_pylist()):
+        print(f"{category or '-':<20} {description}")
@@ -0,0 +1,98 @@
+import os
+import hashlib
+from datetime import datetime, timezone
+
+from pipelines.run_namespace import lake_paths, merge_with_retry
+
+# pyarrow and deltalake are imported by the functions that use them: the app
+# imports this module on every page load, but only a run reads or writes the table.
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DEFAULT_DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+
+# Statement files and API payloads are hashed in chunks, so a file never has to
+# be held in memory twice just to fingerprint it.
+CHUNK_SIZE = 1024 * 1024
+
+FINGERPRINTS_MERGE_PREDICATE = "target.fingerprint = source.fingerprint"
+
+
+def fingerprints_schema():
+    """Returns the Arrow schema of the ingested-fingerprints table."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('fingerprint', pa.string()),
+        ('source', pa.string()),        # 'upload' or 'api'
+        ('name', pa.string()),          # File name or API request description
+        ('request_ids', pa.list_(pa.string())),
+        ('num_rows', pa.int64()),
+        ('run_id', pa.string()),
+        ('ingested_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def fingerprint_chunks(chunks) -> str:
+    """Returns the SHA-256 content fingerprint of an iterable of byte chunks."""
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def fingerprint_file(file, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    Returns the content fingerprint of a path or binary file object, such as a
+    Streamlit UploadedFile, reading it in chunks. File objects are rewound
+    afterwards so they can still be parsed.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return fingerprint_file(f, chunk_size)
+    file.seek(0)
+    fingerprint = fingerprint_chunks(iter(lambda: file.read(chunk_size), b''))
+    file.seek(0)
+    return fingerprint
+
+
+def find_known_fingerprints(fingerprints, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT) -> dict:
+    """
+    Looks up fingerprints in the ingested-fingerprints lake table.
+    Returns a mapping of each already-ingested fingerprint to its record.
+    """
+    import pyarrow.compute as pc
+    from deltalake import DeltaTable
+
+    fingerprints = list(set(fingerprints))
+    table_path = lake_paths(data_lake_root)['fingerprints']
+    if not fingerprints or not DeltaTable.is_deltatable(table_path):
+        return {}
+
+    known = (
+        DeltaTable(table_path)
+        .to_pyarrow_dataset()
+        .to_table(filter=pc.field('fingerprint').isin(fingerprints))
+    )
+    return {record['fingerprint']: record for record in known.to_pylist()}
+
+
+def record_fingerprints(records, run_id: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+    """
+    Records the fingerprints of files or payloads ingested by a run.
+
+    Each record needs `fingerprint`, `source`, `name`, `request_ids` and
+    `num_rows`. This should only be called once the run has been published,
+    so that every recorded fingerprint has its rows in the shared lake.
+    """
+    import pyarrow as pa
+
+    records = list(records)
+    if not records:
+        return
+    ingested_at = datetime.now(timezone.utc)
+    rows = pa.Table.from_pylist(
+        [{**record, 'run_id': run_id, 'ingested_at': ingested_at} for record in records],
+        schema=fingerprints_schema(),
+    )
+    print(f"Recording {rows.num_rows} ingested fingerprint(s) for run {run_id}...")
+    merge_with_retry(lake_paths(data_lake_root)['fingerprints'], rows, FINGERPRINTS_MERGE_PREDICATE, "fingerprints")
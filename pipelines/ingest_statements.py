@@ -1,9 +1,125 @@
 import os
 import json
-import requests
-import pandas as pd
+import itertools
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from deltalake.writer import write_deltalake
+
+# requests, pyarrow and deltalake are imported by the functions that use them,
+# so that importing this module, e.g. for its helpers, stays fast.
+
+# GetStatements answers with an Arrow IPC stream when asked to, and with JSON otherwise.
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+# The columns of a statement, as served by GetStatements before its computed
+# Amount and Type. They are written to bronze in snake case, as strings.
+STATEMENT_COLUMNS = [
+    "Username", "Email", "Address", "Financial Institution", "Employer Name",
+    "Login ID", "Request ID", "Request Date/Time", "Request Status", "Days Detected",
+    "Tag", "Account Name", "Account Number", "Account Type", "Account Balance",
+    "Date", "Description", "Category", "Subcategory", "Withdrawals", "Deposits", "Balance",
+]
+
+def bronze_column(column):
+    """Returns the bronze name of a statement column, e.g. 'Request Date/Time' -> 'request_date_time'."""
+    return column.replace(' ', '_').replace('/', '_').lower()
+
+def bronze_schema():
+    """Returns the Arrow schema of the bronze table: every fetched batch is cast to it before it is written."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [(bronze_column(column), pa.string()) for column in STATEMENT_COLUMNS]
+        + [('amount', pa.float64()), ('type', pa.string()), ('account_id', pa.string())]
+    )
+
+def conform_to_bronze_schema(batch, schema):
+    """
+    Returns a record batch of fetched transactions, with snake-case column
+    names, in the columns and types of `schema`. Missing columns are filled
+    with nulls and other columns are dropped.
+    """
+    import pyarrow as pa
+
+    columns = {bronze_column(name): column for name, column in zip(batch.schema.names, batch.columns)}
+    return pa.RecordBatch.from_arrays(
+        [columns[field.name].cast(field.type) if field.name in columns else pa.nulls(batch.num_rows, field.type)
+         for field in schema],
+        schema=schema,
+    )
+
+def load_etag_cache(cache_path):
+    """Returns the ETag of the last ingested statement of each account id, or an empty cache if there is none."""
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_etag_cache(cache_path, cache):
+    """Writes the ETag cache atomically, so an interrupted write never leaves a partial file behind."""
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+def high_water_marks_schema():
+    """Returns the Arrow schema of the high-water mark table."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('account_id', pa.string()),
+        ('last_date', pa.string()),     # ISO date of the newest transaction ingested
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+def load_high_water_marks(table_path):
+    """Returns the date of the newest ingested transaction of each account id, or no marks if there is no table yet."""
+    from deltalake import DeltaTable
+
+    if not DeltaTable.is_deltatable(table_path):
+        return {}
+    marks = DeltaTable(table_path).to_pyarrow_table(columns=['account_id', 'last_date'])
+    return dict(zip(marks.column('account_id').to_pylist(), marks.column('last_date').to_pylist()))
+
+def record_high_water_marks(table_path, marks):
+    """Upserts the newest ingested transaction date of each account id into the high-water mark table."""
+    import pyarrow as pa
+    from deltalake import DeltaTable, write_deltalake
+
+    rows = pa.Table.from_pylist(
+        [{'account_id': account_id, 'last_date': last_date, 'updated_at': datetime.now(timezone.utc)}
+         for account_id, last_date in marks.items()],
+        schema=high_water_marks_schema(),
+    )
+    if not DeltaTable.is_deltatable(table_path):
+        write_deltalake(table_path, rows, mode='overwrite')
+        return
+    (
+        DeltaTable(table_path)
+        .merge(source=rows, predicate="target.account_id = source.account_id",
+               source_alias="source", target_alias="target")
+        .when_matched_update_all()
+        .when_not_matched_insert_all()
+        .execute()
+    )
+
+def write_bronze(table_path, data, mode='append'):
+    """Writes fetched transactions, a table or a record batch reader, to the bronze Delta table."""
+    from deltalake import write_deltalake
+
+    write_deltalake(table_path, data, mode=mode)
+
+def _open_arrow_stream(response):
+    """Returns a record batch reader over a streamed Arrow IPC response, read from the socket as it is consumed."""
+    import pyarrow as pa
+
+    # Arrow reads the raw body, so any Content-Encoding is decoded first.
+    response.raw.decode_content = True
+    return pa.ipc.open_stream(response.raw)
+
+def _next_day(iso_date):
+    return (date.fromisoformat(iso_date) + timedelta(days=1)).isoformat()
 
 def fetch_data_from_api(customer_id, login_id, account_number, api_url_template="http://127.0.0.1:5000/v3/{customer_id}/BankingServices/GetStatements"):
     """
@@ -18,6 +134,8 @@ def fetch_data_from_api(customer_id, login_id, account_number, api_url_template=
     Returns:
         dict: The JSON response from the API, or None if the request fails.
     """
+    import requests
+
     api_url = api_url_template.format(customer_id=customer_id)
     payload = {
         "LoginId": login_id,
@@ -34,11 +152,169 @@ def fetch_data_from_api(customer_id, login_id, account_number, api_url_template=
         print(f"Error fetching data from API: {e}")
         return None
 
+def fetch_statements_batches(customer_id, login_id, account_number, api_url_template="http://127.0.0.1:5000/v3/{customer_id}/BankingServices/GetStatements", etag=None, from_date=None):
+    """
+    Fetches the transactions of an account from the GetStatements API as a
+    stream of Arrow record batches.
+
+    The transactions are requested as an Arrow IPC stream and read from the
+    response as they arrive, so they reach the bronze writer without any JSON
+    decoding and without the whole body being held in memory. A server that
+    only answers with JSON is supported too.
+
+    With the `etag` of the statement ingested last time, the request is
+    conditional: if the statement has not changed, the server answers 304
+    without a body. With `from_date` (YYYY-MM-DD), only the transactions
+    dated that day or later are requested.
+
+    Returns:
+        tuple: The transactions as a pa.RecordBatchReader, or None if the
+        request fails or the statement has not changed; and the statement's
+        ETag, or None if the request fails or the server sent none.
+    """
+    import requests
+    import pyarrow as pa
+
+    api_url = api_url_template.format(customer_id=customer_id)
+    payload = {
+        "LoginId": login_id,
+        "AccountNumber": account_number
+    }
+    if from_date:
+        payload["FromDate"] = from_date
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": f"{ARROW_STREAM_MIMETYPE}, application/json;q=0.5"
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+    try:
+        response = requests.post(api_url, json=payload, headers=headers, stream=True)
+        response.raise_for_status()  # Raises an exception for 4XX or 5XX status codes
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching data from API: {e}")
+        return None, None
+
+    if response.status_code == 304:
+        return None, etag
+
+    if response.headers.get("Content-Type", "").startswith(ARROW_STREAM_MIMETYPE):
+        reader = _open_arrow_stream(response)
+    else:
+        transactions = [
+            transaction
+            for statement in response.json().get('Statements', [])
+            for transaction in statement.get('Transactions', [])
+        ]
+        reader = pa.Table.from_pylist(transactions).to_reader()
+    return reader, response.headers.get("ETag")
+
+def fetch_bulk_statements(customer_id, login_id, account_numbers, etags=None, from_dates=None, api_url_template="http://127.0.0.1:5000/v3/{customer_id}/BankingServices/GetStatementsBulk"):
+    """
+    Fetches the transactions of several accounts in one GetStatementsBulk request.
+
+    `etags` and `from_dates` map account numbers to the ETag and FromDate
+    that fetch_statements_batches would send for them; accounts whose
+    statement has not changed have no transactions in the response.
+
+    Returns:
+        tuple: The transactions of every account as a pa.RecordBatchReader,
+        streamed from the response like fetch_statements_batches does, with an
+        `AccountNumber` column; and the ETag of each account number. None if
+        the request fails, for instance because the server has no bulk endpoint.
+    """
+    import requests
+    import pyarrow as pa
+
+    etags, from_dates = etags or {}, from_dates or {}
+    api_url = api_url_template.format(customer_id=customer_id)
+    payload = {
+        "LoginId": login_id,
+        "AccountNumbers": list(account_numbers),
+        "ETags": {number: etag for number, etag in etags.items() if etag},
+        "FromDates": {number: from_date for number, from_date in from_dates.items() if from_date},
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": f"{ARROW_STREAM_MIMETYPE}, application/json;q=0.5"
+    }
+    try:
+        response = requests.post(api_url, json=payload, headers=headers, stream=True)
+        response.raise_for_status()  # Raises an exception for 4XX or 5XX status codes
+    except requests.exceptions.RequestException as e:
+        print(f"Bulk statements unavailable, fetching accounts one at a time: {e}")
+        return None
+
+    # Accounts left out of the response have not changed.
+    account_etags = {number: etags.get(number) for number in account_numbers}
+    if response.headers.get("Content-Type", "").startswith(ARROW_STREAM_MIMETYPE):
+        # The ETags are in the schema metadata, which is read before any transaction.
+        reader = _open_arrow_stream(response)
+        metadata = reader.schema.metadata or {}
+        new_etags = json.loads(metadata.get(b'ETags', b'{}'))
+        not_modified = set(json.loads(metadata.get(b'NotModified', b'[]')))
+        account_etags.update({number: new_etags.get(number) for number in account_numbers if number not in not_modified})
+    else:
+        statements = response.json().get('Statements', [])
+        tables = []
+        for statement in statements:
+            rows = pa.Table.from_pylist(statement.get('Transactions', []))
+            tables.append(rows.append_column('AccountNumber', pa.array([statement.get('AccountNumber')] * rows.num_rows, pa.string())))
+            account_etags[statement.get('AccountNumber')] = statement.get('ETag')
+        reader = (pa.concat_tables(tables, promote_options='permissive') if tables else pa.table({'AccountNumber': pa.array([], pa.string())})).to_reader()
+    return reader, account_etags
+
+def _bronze_batches(streams, account_ids, high_water_marks, new_high_water_marks, fetched_accounts):
+    """
+    Yields the fetched transactions as bronze record batches, one batch at a time.
+
+    `streams` are (reader, account number) pairs; a reader without an account
+    number is a bulk response, split by its `AccountNumber` column. Rows on or
+    before an account's high-water mark are dropped, the newest date written
+    for each account is recorded in `new_high_water_marks`, and every account
+    number with transactions in a response is added to `fetched_accounts`.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = bronze_schema()
+    for reader, account_number in streams:
+        for batch in reader:
+            if account_number is None:
+                numbers = pc.unique(batch.column('AccountNumber')).to_pylist()
+                parts = [(number, batch.filter(pc.equal(batch.column('AccountNumber'), number)).drop_columns(['AccountNumber']))
+                         for number in numbers]
+            else:
+                parts = [(account_number, batch)]
+            for number, rows in parts:
+                account_id = account_ids.get(number)
+                if account_id is None or not rows.num_rows:
+                    continue
+                fetched_accounts.add(number)
+                if 'Date' in rows.schema.names:
+                    last_date = high_water_marks.get(account_id)
+                    if last_date:
+                        # A server that ignores FromDate still never gets a day appended twice.
+                        rows = rows.filter(pc.greater(rows.column('Date'), last_date))
+                    if not rows.num_rows:
+                        continue
+                    newest = pc.max(rows.column('Date')).as_py()
+                    new_high_water_marks[account_id] = max(newest, new_high_water_marks.get(account_id, newest))
+                # Add account_id to each transaction for tracking
+                rows = rows.append_column('account_id', pa.array([account_id] * rows.num_rows, pa.string()))
+                yield conform_to_bronze_schema(rows, schema)
+
 def main():
     """Main function to run the bronze ingestion pipeline."""
+    import pyarrow as pa
+
     # Define the data lake path at the project root
     BRONZE_PATH = 'data_lake/bronze'
     CONFIG_PATH = 'config.json'
+    # The ETag of each account's last ingested statement, so unchanged statements are neither downloaded nor appended again.
+    ETAG_CACHE_PATH = 'data_lake/ingest_etags.json'
+    # The date of each account's newest ingested transaction, so that only later days are fetched and appended.
+    HIGH_WATER_MARKS_PATH = 'data_lake/ingest_high_water_marks'
 
     # Load account information from config.json
     try:
@@ -52,41 +328,70 @@ def main():
     customer_id = "123e4567-e89b-12d3-a456-426614174000"
     login_id = "abc-123"
 
-    all_transactions = []
+    etags = load_etag_cache(ETAG_CACHE_PATH)
+    high_water_marks = load_high_water_marks(HIGH_WATER_MARKS_PATH)
+    new_etags, new_high_water_marks = {}, {}
 
+    accounts = []
     for account in accounts_to_process:
         account_id = account.get("Id")
         account_number = account.get("AccountNumber")
         if not all([account_id, account_number]):
             print(f"Skipping account due to missing 'Id' or 'AccountNumber': {account}")
             continue
+        accounts.append((account_id, account_number))
+
+    # Each account is requested from the day after its newest ingested transaction.
+    from_dates = {
+        account_number: _next_day(high_water_marks[account_id])
+        for account_id, account_number in accounts if high_water_marks.get(account_id)
+    }
+    account_etags = {account_number: etags.get(account_id) for account_id, account_number in accounts}
 
-        print(f"Fetching data for account number: {account_number} (Id: {account_id})")
-        api_data = fetch_data_from_api(customer_id, login_id, account_number)
-
-        if api_data and 'Statements' in api_data:
-            statements = api_data.get('Statements', [])
-            for statement in statements:
-                transactions = statement.get('Transactions', [])
-                if transactions:
-                    df = pd.DataFrame(transactions)
-                    # Add account_id to each transaction for tracking
-                    df['account_id'] = account_id
-                    all_transactions.append(df)
-
-    if all_transactions:
-        # Combine all transactions into a single DataFrame
-        final_df = pd.concat(all_transactions, ignore_index=True)
-
-        # Standardize column names
-        final_df.columns = [col.replace(' ', '_').replace('/', '_').lower() for col in final_df.columns]
-
-        # Write to a single bronze Delta table, appending new data
-        print(f"Writing {len(final_df)} transactions to bronze Delta table at {BRONZE_PATH}...")
-        write_deltalake(BRONZE_PATH, final_df, mode='append')
+    # One bulk request for every account when the server has the endpoint, one request per account otherwise.
+    print(f"Fetching data for {len(accounts)} account(s)...")
+    bulk = fetch_bulk_statements(customer_id, login_id, [account_number for _, account_number in accounts],
+                                 etags=account_etags, from_dates=from_dates) if accounts else None
+    streams, result_etags = [], {}
+    if bulk is not None:
+        reader, result_etags = bulk
+        streams.append((reader, None))
+    else:
+        for account_id, account_number in accounts:
+            print(f"Fetching data for account number: {account_number} (Id: {account_id})"
+                  + (f" from {from_dates[account_number]}" if account_number in from_dates else ""))
+            reader, result_etags[account_number] = fetch_statements_batches(customer_id, login_id, account_number,
+                                                                            etag=account_etags[account_number],
+                                                                            from_date=from_dates.get(account_number))
+            if reader is not None:
+                streams.append((reader, account_number))
+
+    # The fetched transactions are streamed into bronze batch by batch, cast to the
+    # bronze schema, rather than concatenated into one table first.
+    fetched_accounts = set()
+    batches = _bronze_batches(streams, {number: account_id for account_id, number in accounts},
+                              high_water_marks, new_high_water_marks, fetched_accounts)
+    first_batch = next(batches, None)
+    if first_batch is not None:
+        print(f"Writing transactions to bronze Delta table at {BRONZE_PATH}...")
+        write_bronze(BRONZE_PATH, pa.RecordBatchReader.from_batches(bronze_schema(), itertools.chain([first_batch], batches)),
+                     mode='append')
         print("Bronze ingestion complete.")
     else:
         print("No transactions were fetched to ingest.")
 
+    for account_id, account_number in accounts:
+        etag = result_etags.get(account_number)
+        if etag is not None:
+            new_etags[account_id] = etag
+            if etag == etags.get(account_id) and account_number not in fetched_accounts:
+                print(f"Statement for account number {account_number} has not changed; skipping.")
+
+    # Only recorded once the new statements are in bronze, so a failed write is fetched again next time.
+    if new_high_water_marks:
+        record_high_water_marks(HIGH_WATER_MARKS_PATH, new_high_water_marks)
+    if new_etags:
+        save_etag_cache(ETAG_CACHE_PATH, {**etags, **new_etags})
+
 if __name__ == "__main__":
     main()
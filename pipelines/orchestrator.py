@@ -0,0 +1,307 @@
+import os
+import json
+import glob
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+from pipelines import profile_dbt, run_metrics, run_namespace
+from pipelines.run_namespace import lake_paths
+from pipelines.transform_statements import SILVER_TABLES
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DEFAULT_DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+
+# dbt runs from the analytics project directory; the model hash covers every
+# file that can change what the models produce.
+ANALYTICS_DIR = "analytics"
+MODEL_FILE_PATTERNS = ("models/**/*", "macros/**/*", "dbt_project.yml", "profiles.yml")
+
+
+def delta_version(table_path: str) -> int | None:
+    """Returns the current version of a Delta table, or None if it does not exist."""
+    from deltalake import DeltaTable
+
+    if not DeltaTable.is_deltatable(table_path):
+        return None
+    return DeltaTable(table_path).version()
+
+
+def silver_versions(paths: dict, prefix: str = '') -> dict:
+    """Returns the Delta version of each silver table of a namespace, keyed by its lake_paths key."""
+    return {f"{prefix}{table}": delta_version(paths[table]) for table, _ in SILVER_TABLES}
+
+
+def file_signature(path: str) -> str | None:
+    """Returns the size and modification time of a file, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def models_hash(analytics_dir: str = ANALYTICS_DIR) -> str:
+    """Returns the SHA-256 of the dbt project files, by relative path and content."""
+    hasher = hashlib.sha256()
+    paths = sorted({
+        path for pattern in MODEL_FILE_PATTERNS
+        for path in glob.glob(os.path.join(analytics_dir, pattern), recursive=True)
+        if os.path.isfile(path)
+    })
+    for path in paths:
+        hasher.update(os.path.relpath(path, analytics_dir).encode('utf-8'))
+        with open(path, 'rb') as f:
+            hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def _run_dbt(args: list, run_id: str | None, data_lake_root: str):
+    # Run through run_metrics so that dbt's CPU time is counted towards the stage's span.
+    dbt_process = run_metrics.run_subprocess(
+        ["dbt", *args],
+        cwd=ANALYTICS_DIR,
+        env=run_namespace.dbt_env(run_id, data_lake_root),
+    )
+    print(dbt_process.stdout)
+
+
+# The app's transforms run on this many warm worker processes (see `transform_pool`).
+TRANSFORM_POOL_WORKERS = int(os.getenv("TRANSFORM_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+_transform_pool = None
+_transform_pool_lock = threading.Lock()
+
+
+def _warm_transform_worker():
+    # Loaded once when a worker starts, instead of by every transform it runs.
+    import pandas  # noqa: F401
+    import deltalake  # noqa: F401
+    from pipelines import categorize, transform_statements  # noqa: F401
+
+
+def transform_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool that runs transforms out of process, starting it
+    on first use. Its workers outlive the transforms they run, so only the
+    first transform on each worker pays for starting the interpreter and
+    importing pandas and deltalake.
+    """
+    global _transform_pool
+    with _transform_pool_lock:
+        if _transform_pool is None:
+            _transform_pool = ProcessPoolExecutor(max_workers=TRANSFORM_POOL_WORKERS,
+                                                  mp_context=multiprocessing.get_context('spawn'),
+                                                  initializer=_warm_transform_worker)
+        return _transform_pool
+
+
+def _transform_in_worker(write_mode: str, data_lake_root: str, run_id: str | None, workers: int) -> float:
+    """Runs the transform in a pool worker, and returns the CPU time it used."""
+    from pipelines import transform_statements
+
+    # A worker runs one transform at a time, so all of its CPU time is this transform's.
+    cpu_start = run_metrics.process_cpu_seconds()
+    transform_statements.main(write_mode, data_lake_root, run_id, workers)
+    return run_metrics.process_cpu_seconds() - cpu_start
+
+
+def _transform(write_mode: str, run_id: str | None, data_lake_root: str, paths: dict, workers: int = 1,
+               in_process: bool = True):
+    global _transform_pool
+    if in_process:
+        # Imported when the stage runs, so that planning a run (e.g. --dry-run) does not load pandas.
+        from pipelines import transform_statements
+
+        transform_statements.main(write_mode, data_lake_root, run_id, workers)
+    else:
+        pool = transform_pool()
+        try:
+            cpu_seconds = pool.submit(_transform_in_worker, write_mode, os.path.abspath(data_lake_root), run_id, workers).result()
+        except BrokenProcessPool:
+            # A worker died; the next transform starts a new pool.
+            with _transform_pool_lock:
+                if _transform_pool is pool:
+                    _transform_pool = None
+            raise
+        run_metrics.add_subprocess_cpu(cpu_seconds)
+    # main() reports bad input by printing and returning, so check that it wrote the silver table.
+    if delta_version(paths['silver']) is None:
+        raise RuntimeError(f"transform_statements did not write the silver table at {paths['silver']}.")
+
+
+def build_stages(data_lake_root: str = DEFAULT_DATA_LAKE_ROOT, run_id: str | None = None,
+                 write_mode: str = "merge", reused_request_ids=(), docs: bool = True,
+                 profile: bool = False, workers: int = 1, in_process: bool = True) -> list[dict]:
+    """
+    Returns the pipeline stages for a lake namespace, in dependency order.
+
+    Each stage has a `name`, the stages it `depends_on`, an `inputs` and an
+    `outputs` function returning the Delta versions, model hash and file
+    signatures the stage reads and writes, and a `run` function.
+
+    `reused_request_ids` adds a stage that seeds the namespace with those
+    requests from the shared lake, after the transform so that an overwrite
+    cannot remove the seeded rows. `profile` adds a stage that profiles each
+    dbt model with DuckDB and writes a report to the dbt target directory.
+    `workers` runs the transform on that many processes (see
+    `transform_parallel`). With `in_process=False` the transform runs on a
+    warm worker of `transform_pool`, so that concurrent callers in one
+    process (the app's analyses) do not share a GIL for it.
+    """
+    paths = lake_paths(data_lake_root, run_id)
+    shared_paths = lake_paths(data_lake_root)
+    dbt_target_path = os.path.abspath(paths['dbt_target'])
+    reused_request_ids = sorted(set(reused_request_ids))
+
+    stages = [{
+        'name': 'transform',
+        'depends_on': [],
+        'inputs': lambda: {'bronze': delta_version(paths['bronze']), 'write_mode': write_mode},
+        # The silver table is written after its dimensions, so it stands for all of them here.
+        'outputs': lambda: {'silver': delta_version(paths['silver']), 'ledger': delta_version(paths['ledger'])},
+        'run': lambda: _transform(write_mode, run_id, data_lake_root, paths, workers, in_process),
+        'requires': 'bronze',
+    }]
+    if reused_request_ids:
+        stages.append({
+            'name': 'seed_reused',
+            'depends_on': ['transform'],
+            'inputs': lambda: {**silver_versions(shared_paths, prefix='shared_'), 'request_ids': reused_request_ids},
+            'outputs': lambda: {'silver': delta_version(paths['silver'])},
+            'run': lambda: run_namespace.seed_run_from_shared(run_id, reused_request_ids, data_lake_root),
+        })
+    stages.append({
+        'name': 'dbt_run',
+        'depends_on': [stage['name'] for stage in stages],
+        'inputs': lambda: {**silver_versions(paths), 'models': models_hash()},
+        'outputs': lambda: {'dbt_db': file_signature(paths['dbt_db'])},
+        'run': lambda: _run_dbt(["run", "--full-refresh", "--target-path", dbt_target_path], run_id, data_lake_root),
+    })
+    if profile:
+        stages.append({
+            'name': 'dbt_profile',
+            'depends_on': ['dbt_run'],
+            'inputs': lambda: {'dbt_db': file_signature(paths['dbt_db']), 'models': models_hash()},
+            'outputs': lambda: {'report': file_signature(os.path.join(dbt_target_path, profile_dbt.REPORT_FILE))},
+            'run': lambda: profile_dbt.profile_dbt_run(dbt_target_path, os.path.abspath(paths['dbt_db']), data_lake_root, run_id),
+        })
+    if docs:
+        stages.append({
+            'name': 'dbt_docs',
+            'depends_on': ['dbt_run'],
+            'inputs': lambda: {'dbt_db': file_signature(paths['dbt_db']), 'models': models_hash()},
+            'outputs': lambda: {'catalog': file_signature(os.path.join(dbt_target_path, 'catalog.json'))},
+            'run': lambda: _run_dbt(["docs", "generate", "--target-path", dbt_target_path], run_id, data_lake_root),
+        })
+    return stages
+
+
+def load_state(state_path: str) -> dict:
+    """Returns the inputs and outputs recorded for each stage's last successful run."""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def _save_state(state_path: str, state: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _decide(stage: dict, state: dict, will_run: set, force) -> tuple[str, str]:
+    """Returns the action ('run' or 'skip') for a stage, and why."""
+    if stage['name'] in force:
+        return 'run', 'forced'
+    if stage.get('requires') and stage['inputs']().get(stage['requires']) is None:
+        return 'skip', f"no {stage['requires']} table"
+    upstream = [name for name in stage['depends_on'] if name in will_run]
+    if upstream:
+        return 'run', f"upstream {', '.join(upstream)} will run"
+    previous = state.get(stage['name'])
+    if previous is None:
+        return 'run', 'never run'
+    if previous['inputs'] != stage['inputs']():
+        return 'run', 'inputs changed'
+    if any(value is None for value in stage['outputs']().values()):
+        return 'run', 'outputs missing'
+    return 'skip', 'unchanged'
+
+
+def plan(stages: list[dict], state: dict, force=()) -> list[dict]:
+    """
+    Returns what a run would do, one entry per stage, without running anything.
+    A stage runs when it was forced, never ran, its inputs changed since its
+    last successful run, its outputs are missing, or an upstream stage runs.
+    """
+    entries, will_run = [], set()
+    for stage in stages:
+        action, reason = _decide(stage, state, will_run, force)
+        if action == 'run':
+            will_run.add(stage['name'])
+        entries.append({'stage': stage['name'], 'action': action, 'reason': reason})
+    return entries
+
+
+def run_pipeline(stages: list[dict], state_path: str | None, dry_run: bool = False, force=(), metrics=None) -> list[dict]:
+    """
+    Runs the stages that need to, in order, in this process, and returns the
+    plan that was executed. Each stage's inputs and outputs are recorded after
+    it succeeds, so an interrupted pipeline resumes from the failed stage.
+
+    Skipping only pays off for a namespace that outlives a run, like the
+    shared lake. Without a `state_path` nothing is recorded and every stage
+    runs, as for a run namespace that is removed once it is published.
+
+    With `metrics` (a run_metrics.RunMetrics), every executed stage is timed.
+    """
+    state = load_state(state_path) if state_path else {}
+    entries = plan(stages, state, force)
+    for entry in entries:
+        print(f"[{entry['action']:>4}] {entry['stage']}: {entry['reason']}")
+    if dry_run:
+        return entries
+
+    for stage, entry in zip(stages, entries):
+        # Decide again on the actual inputs, now that upstream stages have run.
+        action, reason = _decide(stage, state, set(), force)
+        entry.update(action=action, reason=reason)
+        if action == 'skip':
+            continue
+        inputs = stage['inputs']()
+        if metrics is not None:
+            with metrics.span(stage['name']):
+                stage['run']()
+        else:
+            stage['run']()
+        state[stage['name']] = {
+            'inputs': inputs,
+            'outputs': stage['outputs'](),
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+        }
+        if state_path:
+            _save_state(state_path, state)
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--write-mode", type=str, default="merge", choices=['merge', 'overwrite'], help="The write mode for the transform stage.")
+    parser.add_argument("--run-id", type=str, default=None, help="Run the pipeline on the isolated lake namespace of this analysis run.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without running any stage.")
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to run even if their inputs are unchanged.")
+    parser.add_argument("--no-docs", action="store_true", help="Skip dbt docs generation.")
+    parser.add_argument("--profile", action="store_true", help="Profile each dbt model with DuckDB and write a report.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the transform stage; 0 uses every core.")
+    args = parser.parse_args()
+
+    stages = build_stages(run_id=args.run_id, write_mode=args.write_mode, docs=not args.no_docs, profile=args.profile,
+                          workers=args.workers or os.cpu_count() or 1)
+    state_path = lake_paths(DEFAULT_DATA_LAKE_ROOT, args.run_id)['orchestrator_state']
+    run_pipeline(stages, state_path, dry_run=args.dry_run, force=args.force)
@@ -0,0 +1,280 @@
+import os
+import glob
+import json
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+from pipelines.run_namespace import lake_paths
+
+# duckdb is imported when the models are profiled, so that the orchestrator can
+# plan a profiling stage without loading it.
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DEFAULT_DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+
+# Under the dbt target directory: one DuckDB JSON profile per model, and the report.
+PROFILES_DIR = 'profiles'
+REPORT_FILE = 'profile_report.md'
+
+# The temporary table each model is rebuilt into while it is profiled.
+PROFILE_TABLE = '__dbt_profile'
+
+# Operators listed in the report, slowest first, across every model.
+DEFAULT_TOP_OPERATORS = 20
+
+# A model or operator this much slower than in the previous profile is flagged.
+REGRESSION_THRESHOLD = 0.2
+
+# Characters of an operator's details (table, projections, join condition) shown in the report.
+DETAIL_WIDTH = 60
+
+
+def load_run_results(target_path: str) -> list[dict]:
+    """Returns the results of the models of the last dbt run in a target directory, in the order they ran."""
+    with open(os.path.join(target_path, 'run_results.json')) as f:
+        results = json.load(f)['results']
+    return [result for result in results if result['unique_id'].startswith('model.')]
+
+
+def compiled_sql(target_path: str, result: dict) -> str | None:
+    """Returns the compiled SELECT of a model, from run_results.json or from the target's compiled directory."""
+    if result.get('compiled_code'):
+        return result['compiled_code']
+    name = result['unique_id'].split('.')[-1]
+    paths = glob.glob(os.path.join(target_path, 'compiled', '**', f'{name}.sql'), recursive=True)
+    if not paths:
+        return None
+    with open(paths[0]) as f:
+        return f.read()
+
+
+def flatten_operators(node: dict, path: str = '') -> list[dict]:
+    """
+    Returns the operators of a DuckDB JSON profile tree, depth first. Each is
+    identified by its path in the plan (e.g. '0.1.0'), which stays the same
+    across runs of the same SQL, so that operators can be compared.
+    """
+    operators = []
+    for index, child in enumerate(node.get('children', [])):
+        child_path = f"{path}.{index}" if path else str(index)
+        extra_info = child.get('extra_info') or {}
+        detail = next((extra_info[key] for key in ('Table', 'Function', 'Conditions', 'Groups', 'Projections') if extra_info.get(key)), '')
+        operators.append({
+            'path': child_path,
+            'operator': child.get('operator_name'),
+            'seconds': child.get('operator_timing', 0.0),
+            'rows': child.get('operator_cardinality', 0),
+            'rows_scanned': child.get('operator_rows_scanned', 0),
+            'detail': detail if isinstance(detail, str) else ', '.join(map(str, detail)),
+        })
+        operators.extend(flatten_operators(child, child_path))
+    return operators
+
+
+def _profile_model(con, name: str, sql: str, profile_path: str) -> dict:
+    """Rebuilds one model into a temporary table under the JSON profiler and returns its metrics."""
+    con.execute("SET enable_profiling = 'json'")
+    con.execute("SET profiling_mode = 'detailed'")
+    con.execute(f"SET profiling_output = '{profile_path}'")
+    try:
+        # dbt-duckdb materializes a table model with CREATE TABLE ... AS, so it is profiled the same way.
+        con.execute(f"CREATE OR REPLACE TEMP TABLE {PROFILE_TABLE} AS {sql}")
+    finally:
+        con.execute("PRAGMA disable_profiling")
+    rows = con.execute(f"SELECT count(*) FROM {PROFILE_TABLE}").fetchone()[0]
+    con.execute(f"DROP TABLE {PROFILE_TABLE}")
+
+    with open(profile_path) as f:
+        profile = json.load(f)
+    operators = flatten_operators(profile)
+    return {
+        'model': name,
+        'status': 'success',
+        'seconds': profile.get('latency', 0.0),
+        'cpu_seconds': profile.get('cpu_time', 0.0),
+        'rows': rows,
+        'rows_scanned': profile.get('cumulative_rows_scanned', 0),
+        'bytes_read': profile.get('total_bytes_read', 0),
+        # Allocated by this query; the peak buffer memory is a high-water mark of the whole connection.
+        'allocated_bytes': profile.get('total_memory_allocated', 0),
+        # The CREATE TABLE AS at the root of the plan writes the model's rows; it is not part of the model's query.
+        'operators': [operator for operator in operators if operator['operator'] != 'CREATE_TABLE_AS'],
+    }
+
+
+def profile_models(target_path: str, dbt_db_path: str) -> list[dict]:
+    """
+    Profiles every model of the last dbt run with DuckDB's JSON profiler.
+
+    Each model's compiled SQL is rebuilt, in the order dbt ran it, into a
+    temporary table of a read-only connection to the dbt database, whose
+    tables are the inputs the model read during the run. dbt-duckdb renames
+    tables after each model's query, so profiles written during the run
+    itself would only hold the rename. The JSON profiles are kept in the
+    target's `profiles` directory.
+    """
+    import duckdb
+
+    profiles_dir = os.path.join(target_path, PROFILES_DIR)
+    os.makedirs(profiles_dir, exist_ok=True)
+    models = []
+    # DuckDB loads the delta extension, installed by dbt-duckdb, on the first delta_scan.
+    with duckdb.connect(dbt_db_path, read_only=True) as con:
+        for result in load_run_results(target_path):
+            name = result['unique_id'].split('.')[-1]
+            entry = {'model': name, 'status': result.get('status'), 'dbt_seconds': result.get('execution_time')}
+            if result.get('status') != 'success':
+                models.append(entry)
+                continue
+            sql = compiled_sql(target_path, result)
+            if sql is None:
+                models.append({**entry, 'status': 'no compiled SQL'})
+                continue
+            try:
+                models.append({**_profile_model(con, name, sql, os.path.join(profiles_dir, f'{name}.json')), **entry})
+            except duckdb.Error as e:
+                models.append({**entry, 'status': 'error', 'error': str(e)})
+    return models
+
+
+def profile_dbt_run(target_path: str, dbt_db_path: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT,
+                    run_id: str | None = None, record: bool = True, top: int = DEFAULT_TOP_OPERATORS) -> dict:
+    """
+    Profiles the models of the last dbt run, writes the report next to the
+    profiles, and returns the profile. The report compares it with the last
+    profile recorded in the shared lake, and `record` appends it there.
+    """
+    from pipelines.orchestrator import models_hash
+
+    profile = {
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        'run_id': run_id,
+        'git_commit': _git_commit(),
+        'models_hash': models_hash(),
+        'models': profile_models(target_path, dbt_db_path),
+    }
+    history = load_profiles(data_lake_root)
+    report_path = os.path.join(target_path, REPORT_FILE)
+    with open(report_path, 'w') as f:
+        f.write(render_report(profile, history[-1] if history else None, top))
+    print(f"Wrote the dbt profile report to {report_path}.")
+    if record:
+        record_profile(profile, data_lake_root)
+    return profile
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record_profile(profile: dict, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+    """Appends a profile to the shared history, which every run's report is compared with."""
+    history_path = lake_paths(data_lake_root)['dbt_profiles']
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, 'a') as f:
+        f.write(json.dumps(profile) + "\n")
+
+
+def load_profiles(data_lake_root: str = DEFAULT_DATA_LAKE_ROOT) -> list[dict]:
+    """Returns every recorded profile, oldest first."""
+    history_path = lake_paths(data_lake_root)['dbt_profiles']
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _change(value: float, before: float | None) -> str:
+    if not before:
+        return ''
+    change = value / before - 1
+    return f"{change:+.0%}" + (" **regression**" if change > REGRESSION_THRESHOLD else "")
+
+
+def render_report(profile: dict, previous: dict | None = None, top: int = DEFAULT_TOP_OPERATORS) -> str:
+    """
+    Renders a profile as markdown: the models, slowest first, and the slowest
+    operators across every model. Timings are compared with `previous`, by
+    model name and by operator path within the model.
+    """
+    previous_models = {model['model']: model for model in (previous or {}).get('models', [])}
+    previous_operators = {
+        (model['model'], operator['path']): operator
+        for model in previous_models.values() for operator in model.get('operators', [])
+    }
+    profiled = sorted((m for m in profile['models'] if m['status'] == 'success' and 'seconds' in m),
+                      key=lambda m: m['seconds'], reverse=True)
+
+    lines = [
+        "# dbt Model Profile",
+        "",
+        f"- Recorded at: {profile['recorded_at']}" + (f" (run {profile['run_id']})" if profile.get('run_id') else ""),
+        f"- Commit: {profile.get('git_commit') or 'unknown'}, models hash: {profile['models_hash'][:12]}",
+    ]
+    if previous:
+        same_models = "same models" if previous['models_hash'] == profile['models_hash'] else "models changed since"
+        lines.append(f"- Compared with: {previous['recorded_at']} ({previous.get('git_commit') or 'unknown'}, {same_models})")
+    lines += [
+        "",
+        "## Models",
+        "",
+        "| # | Model | Time [s] | Change | dbt [s] | CPU [s] | Rows | Rows scanned | Read [MB] | Allocated [MB] |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for rank, model in enumerate(profiled, 1):
+        before = previous_models.get(model['model'], {}).get('seconds')
+        dbt_seconds = f"{model['dbt_seconds']:.3f}" if model.get('dbt_seconds') is not None else ''
+        lines.append(
+            f"| {rank} | {model['model']} | {model['seconds']:.3f} | {_change(model['seconds'], before)} | {dbt_seconds} "
+            f"| {model['cpu_seconds']:.3f} | {model['rows']:,} | {model['rows_scanned']:,} "
+            f"| {model['bytes_read'] / 1e6:.1f} | {model['allocated_bytes'] / 1e6:.1f} |"
+        )
+    not_profiled = [model for model in profile['models'] if model not in profiled]
+    if not_profiled:
+        lines += ["", "Not profiled:", ""]
+        lines += [f"- {model['model']}: {model['status']}" + (f" ({model['error'].splitlines()[0]})" if model.get('error') else '')
+                  for model in not_profiled]
+
+    operators = sorted(
+        ({**operator, 'model': model['model'], 'model_seconds': model['seconds']}
+         for model in profiled for operator in model['operators']),
+        key=lambda operator: operator['seconds'], reverse=True,
+    )[:top]
+    lines += [
+        "",
+        f"## Slowest Operators (top {top})",
+        "",
+        "| # | Model | Operator | Plan path | Time [s] | Share of model | Change | Rows | Rows scanned | Detail |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for rank, operator in enumerate(operators, 1):
+        before = previous_operators.get((operator['model'], operator['path']), {})
+        # An operator is only compared with the one at the same plan path if it is the same kind of operator.
+        before_seconds = before.get('seconds') if before.get('operator') == operator['operator'] else None
+        share = operator['seconds'] / operator['model_seconds'] if operator['model_seconds'] else 0
+        detail = operator['detail'].replace('|', '\\|').replace('\n', ' ')
+        if len(detail) > DETAIL_WIDTH:
+            detail = detail[:DETAIL_WIDTH - 3] + '...'
+        lines.append(
+            f"| {rank} | {operator['model']} | {operator['operator']} | {operator['path']} | {operator['seconds']:.3f} "
+            f"| {share:.0%} | {_change(operator['seconds'], before_seconds)} | {operator['rows']:,} "
+            f"| {operator['rows_scanned']:,} | {detail} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profiles the models of the last dbt run with DuckDB's JSON profiler.")
+    parser.add_argument("--run-id", type=str, default=None, help="Profile the dbt run of this analysis run's namespace.")
+    parser.add_argument("--target-path", type=str, default=None, help="dbt target directory of the run (default: the namespace's).")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_OPERATORS, help="Number of operators in the report.")
+    parser.add_argument("--no-record", action="store_true", help="Compare with the history without appending this profile.")
+    args = parser.parse_args()
+
+    paths = lake_paths(DEFAULT_DATA_LAKE_ROOT, args.run_id)
+    profile_dbt_run(args.target_path or paths['dbt_target'], paths['dbt_db'], DEFAULT_DATA_LAKE_ROOT,
+                    args.run_id, record=not args.no_record, top=args.top)
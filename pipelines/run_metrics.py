@@ -0,0 +1,277 @@
+import os
+import glob
+import json
+import time
+import resource
+import subprocess
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from pipelines.run_namespace import lake_paths
+
+# pandas and pyarrow are imported by the functions that use them: the app
+# imports this module on every page load, while spans only need the standard library.
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DEFAULT_DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.99)
+
+# How often the resident memory of a span is sampled.
+RSS_SAMPLE_INTERVAL_SECONDS = 0.05
+_PAGE_SIZE_MB = os.sysconf('SC_PAGE_SIZE') / 2**20 if hasattr(os, 'sysconf') else 0
+
+
+def run_metrics_schema():
+    """Returns the Arrow schema of the run-metrics table."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('run_id', pa.string()),
+        ('span_id', pa.int32()),
+        ('parent_id', pa.int32()),           # Null for top-level stages
+        ('name', pa.string()),
+        ('kind', pa.string()),               # 'stage', 'step' or 'dbt_model'
+        ('status', pa.string()),             # 'success' or 'error' ('skipped' etc. for dbt models)
+        ('started_at', pa.timestamp('us', tz='UTC')),
+        ('wall_seconds', pa.float64()),
+        ('cpu_seconds', pa.float64()),       # The span's thread and the subprocesses it ran
+        ('peak_rss_mb', pa.float64()),       # Peak RSS of this process and its subprocesses during the span
+        ('recorded_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+# CPU time of the subprocesses each thread ran through run_subprocess, and of
+# the work it handed to worker processes (see add_subprocess_cpu).
+_subprocess_cpu = threading.local()
+
+
+def _cpu_seconds() -> float:
+    """
+    CPU time used so far by the calling thread and by the subprocesses it ran
+    with `run_subprocess`. Other threads, such as the sessions of other
+    analyses, and their subprocesses are left out; so are the thread pools of
+    Arrow and DuckDB.
+    """
+    return time.thread_time() + getattr(_subprocess_cpu, 'seconds', 0.0)
+
+
+def process_cpu_seconds() -> float:
+    """CPU time used so far by every thread of this process and by the subprocesses it has reaped."""
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def add_subprocess_cpu(seconds: float):
+    """Counts CPU time spent on behalf of the calling thread in another process towards its open spans."""
+    _subprocess_cpu.seconds = getattr(_subprocess_cpu, 'seconds', 0.0) + seconds
+
+
+def run_subprocess(args: list, **kwargs) -> subprocess.CompletedProcess:
+    """
+    Runs a command like `subprocess.run(args, check=True, capture_output=True,
+    text=True, **kwargs)`, and counts its CPU time, including that of the
+    processes it waited for, towards the calling thread's open spans.
+
+    The subprocess is reaped with os.wait4, which reports the usage of that
+    process alone, rather than read from RUSAGE_CHILDREN, which also counts
+    the subprocesses other threads reap meanwhile.
+    """
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kwargs)
+    # Both pipes are drained at once, so the subprocess never blocks on a full one.
+    stderr = []
+    stderr_reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+    stdout = process.stdout.read()
+    stderr_reader.join()
+    process.stdout.close()
+    process.stderr.close()
+
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    add_subprocess_cpu(usage.ru_utime + usage.ru_stime)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr[0])
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr[0])
+
+
+def _rss_mb(pid: str | int = 'self') -> float:
+    """Current resident set size of a process, in MB, or 0 if it is gone."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE_MB
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def _tree_rss_mb() -> float | None:
+    """
+    Current resident set size, in MB, of this process plus its direct
+    subprocesses (e.g. dbt), read from /proc. None where /proc is unavailable.
+    """
+    if not os.path.exists('/proc/self/statm'):
+        return None
+    children = []
+    for path in glob.glob('/proc/self/task/*/children'):
+        try:
+            with open(path) as f:
+                children.extend(f.read().split())
+        except OSError:
+            continue
+    return _rss_mb() + sum(_rss_mb(pid) for pid in children)
+
+
+class _RssSampler:
+    """Samples `_tree_rss_mb` on a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.peak = _tree_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _sample(self):
+        rss = _tree_rss_mb()
+        if rss is not None:
+            self.peak = max(self.peak or 0.0, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        self._sample()
+
+
+class RunMetrics:
+    """
+    Collects timing and memory spans for one analysis run.
+
+    Spans opened while another span is open are recorded as its sub-steps.
+    Each span reports the CPU time of the thread that runs it plus that of the
+    subprocesses it ran with `run_subprocess`, and the peak RSS of the process and its
+    subprocesses, sampled from /proc while the span is open. Spans of
+    concurrent analyses in the same process share the RSS figure.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.spans = []
+        self._open = []
+
+    @contextmanager
+    def span(self, name: str, kind: str | None = None):
+        """
+        Times the enclosed block. Spans default to kind 'stage' at the top level
+        and 'step' when nested. Failures are recorded with status 'error' and re-raised.
+        """
+        record = {
+            'span_id': len(self.spans),
+            'parent_id': self._open[-1]['span_id'] if self._open else None,
+            'name': name,
+            'kind': kind or ('step' if self._open else 'stage'),
+            'status': 'success',
+            'started_at': datetime.now(timezone.utc),
+        }
+        self.spans.append(record)
+        self._open.append(record)
+        wall_start, cpu_start = time.perf_counter(), _cpu_seconds()
+        sampler = _RssSampler()
+        try:
+            with sampler:
+                yield record
+        except BaseException:
+            record['status'] = 'error'
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = _cpu_seconds() - cpu_start
+            record['peak_rss_mb'] = sampler.peak
+            self._open.pop()
+
+    def add_dbt_models(self, run_results_path: str, parent_name: str = 'dbt_run'):
+        """
+        Adds one span per dbt node from a run_results.json artifact, under the
+        most recent span called `parent_name`. dbt reports wall time only.
+        """
+        if not os.path.exists(run_results_path):
+            return
+        import pandas as pd
+
+        with open(run_results_path) as f:
+            run_results = json.load(f)
+        parent = next((s for s in reversed(self.spans) if s['name'] == parent_name), None)
+
+        for result in run_results.get('results', []):
+            started_at = next(
+                (t.get('started_at') for t in result.get('timing', []) if t.get('name') == 'execute'), None
+            )
+            self.spans.append({
+                'span_id': len(self.spans),
+                'parent_id': parent['span_id'] if parent else None,
+                'name': result['unique_id'],
+                'kind': 'dbt_model',
+                'status': result.get('status'),
+                'started_at': pd.Timestamp(started_at).to_pydatetime() if started_at else None,
+                'wall_seconds': result.get('execution_time'),
+                'cpu_seconds': None,
+                'peak_rss_mb': None,
+            })
+
+    def to_table(self):
+        import pyarrow as pa
+
+        recorded_at = datetime.now(timezone.utc)
+        rows = [{**span, 'run_id': self.run_id, 'recorded_at': recorded_at} for span in self.spans]
+        return pa.Table.from_pylist(rows, schema=run_metrics_schema())
+
+
+def record_run_metrics(metrics: RunMetrics, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+    """Appends the spans of a run to the shared run-metrics table."""
+    if not metrics.spans:
+        return
+    from deltalake import write_deltalake
+
+    table_path = lake_paths(data_lake_root)['run_metrics']
+    print(f"Recording {len(metrics.spans)} run metric span(s) for run {metrics.run_id}...")
+    # Runs only ever append their own rows, so concurrent runs do not conflict.
+    write_deltalake(table_path, metrics.to_table(), mode="append")
+
+
+def load_run_metrics(data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+    """Returns every recorded span, or an empty DataFrame if no run was recorded yet."""
+    from deltalake import DeltaTable
+
+    table_path = lake_paths(data_lake_root)['run_metrics']
+    if not DeltaTable.is_deltatable(table_path):
+        return run_metrics_schema().empty_table().to_pandas()
+    return DeltaTable(table_path).to_pandas()
+
+
+def summarize_run_metrics(spans, percentiles=DEFAULT_PERCENTILES):
+    """
+    Summarizes spans across runs: the number of runs and the wall time, CPU and
+    peak RSS percentiles of each span name, slowest median first.
+    """
+    import pandas as pd
+
+    columns = ['wall_seconds', 'cpu_seconds', 'peak_rss_mb']
+    if spans.empty:
+        return pd.DataFrame()
+
+    grouped = spans.groupby(['kind', 'name'])
+    summary = grouped['run_id'].nunique().rename('runs').to_frame()
+    for column in columns:
+        quantiles = grouped[column].quantile(list(percentiles)).unstack()
+        quantiles.columns = [f"{column}_p{round(q * 100)}" for q in quantiles.columns]
+        summary = summary.join(quantiles)
+    return summary.sort_values(f"wall_seconds_p{round(percentiles[0] * 100)}", ascending=False).reset_index()
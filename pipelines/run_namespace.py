@@ -0,0 +1,202 @@
+import os
+import time
+import shutil
+import uuid
+import argparse
+
+# deltalake and pyarrow are imported by the functions that use them: every
+# entry point imports this module for lake_paths, and most never read a table through it.
+
+# Use an environment variable to determine the root path, defaulting to a relative path for local execution.
+DEFAULT_DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
+
+# Every analysis run gets its own copy of the lake tables under this directory,
+# so that concurrent runs never overwrite each other's bronze and silver data.
+RUNS_DIR = 'data_lake/runs'
+
+# Publishing merges into tables shared by every run. Two runs finishing at the
+# same time can race on the Delta commit, so conflicting commits are retried.
+PUBLISH_MAX_ATTEMPTS = 5
+PUBLISH_RETRY_DELAY_SECONDS = 0.5
+
+# The dbt docs site is served from the dbt project's shared target directory
+# (see the dbt_docs service), so each run's generated docs are copied there.
+DBT_DOCS_DIR = os.getenv(
+    "DBT_DOCS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics', 'target'))
+DBT_DOCS_FILES = ('index.html', 'manifest.json', 'catalog.json')
+
+
+def new_run_id() -> str:
+    """Returns a new, unique identifier for an analysis run."""
+    return uuid.uuid4().hex
+
+
+def lake_paths(data_lake_root: str = DEFAULT_DATA_LAKE_ROOT, run_id: str | None = None) -> dict:
+    """
+    Returns the table locations for a lake namespace.
+
+    Without a run_id this is the shared lake at `data_lake/`. With a run_id the
+    paths point at the isolated namespace `data_lake/runs/<run_id>/`, which has
+    the same layout plus its own dbt database and dbt target directory.
+    """
+    if run_id is None:
+        namespace_root = os.path.join(data_lake_root, 'data_lake')
+    else:
+        namespace_root = os.path.join(data_lake_root, RUNS_DIR, run_id)
+
+    return {
+        'root': namespace_root,
+        'bronze': os.path.join(namespace_root, 'bronze'),
+        'silver': os.path.join(namespace_root, 'silver'),
+        'silver_customers': os.path.join(namespace_root, 'silver_customers'),
+        'silver_accounts': os.path.join(namespace_root, 'silver_accounts'),
+        'ledger': os.path.join(namespace_root, 'application_status_ledger'),
+        'dbt_db': os.path.join(namespace_root, 'dbt.duckdb'),
+        'dbt_target': os.path.join(namespace_root, 'dbt_target'),
+        'dbt_profiles': os.path.join(namespace_root, 'dbt_profiles.jsonl'),
+        'fingerprints': os.path.join(namespace_root, 'ingested_fingerprints'),
+        'run_metrics': os.path.join(namespace_root, 'run_metrics'),
+        'orchestrator_state': os.path.join(namespace_root, 'orchestrator_state.json'),
+    }
+
+
+def dbt_env(run_id: str | None, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT) -> dict:
+    """
+    Returns the environment for a dbt subprocess scoped to a run namespace,
+    or to the shared lake when run_id is None.
+
+    dbt runs from the `analytics` directory, so every path is made absolute.
+    """
+    paths = lake_paths(data_lake_root, run_id)
+    env = os.environ.copy()
+    env['DATA_LAKE_ROOT'] = os.path.abspath(data_lake_root)
+    env['SILVER_TABLE_PATH'] = os.path.abspath(paths['silver'])
+    env['SILVER_CUSTOMERS_TABLE_PATH'] = os.path.abspath(paths['silver_customers'])
+    env['SILVER_ACCOUNTS_TABLE_PATH'] = os.path.abspath(paths['silver_accounts'])
+    env['DBT_DUCKDB_PATH'] = os.path.abspath(paths['dbt_db'])
+    return env
+
+
+def merge_with_retry(table_path: str, source, predicate: str, label: str, writer_properties=None):
+    """Merges into a shared table, retrying when another run commits first."""
+    # Imported here because transform_statements itself resolves its paths through this module.
+    from pipelines.transform_statements import merge_into_table
+    from deltalake.exceptions import CommitFailedError
+
+    for attempt in range(1, PUBLISH_MAX_ATTEMPTS + 1):
+        try:
+            merge_into_table(table_path, source, predicate, label, writer_properties)
+            return
+        except CommitFailedError:
+            if attempt == PUBLISH_MAX_ATTEMPTS:
+                raise
+            print(f"Concurrent commit on {label}, retrying ({attempt}/{PUBLISH_MAX_ATTEMPTS})...")
+            time.sleep(PUBLISH_RETRY_DELAY_SECONDS * attempt)
+
+
+def publish_run(run_id: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+    """
+    Publishes the results of a run into the shared lake tables.
+
+    The run's silver and ledger tables are merged into the shared ones with the
+    same predicates used by `transform_statements`, so publishing is idempotent
+    and never removes rows written by other runs.
+    """
+    from pipelines.transform_statements import SILVER_TABLES, LEDGER_MERGE_PREDICATE, silver_writer_properties
+    from deltalake import DeltaTable
+
+    run_paths = lake_paths(data_lake_root, run_id)
+    shared_paths = lake_paths(data_lake_root)
+
+    for table, predicate in (*SILVER_TABLES, ('ledger', LEDGER_MERGE_PREDICATE)):
+        if not DeltaTable.is_deltatable(run_paths[table]):
+            print(f"Run {run_id} has no {table} table, nothing to publish.")
+            continue
+        rows = DeltaTable(run_paths[table]).to_pyarrow_table()
+        print(f"Publishing {rows.num_rows} {table} rows from run {run_id}...")
+        merge_with_retry(shared_paths[table], rows, predicate, table,
+                         silver_writer_properties() if table != 'ledger' else None)
+    print("Publish complete.")
+
+
+def publish_docs(run_id: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT, docs_dir: str = DBT_DOCS_DIR) -> bool:
+    """
+    Copies the dbt docs generated by a run into the shared docs directory, so
+    that they outlive the run namespace. Each file is written next to its
+    destination and then renamed over it, so the docs site never serves a
+    partly copied file. Returns False if the run generated no docs.
+    """
+    run_target = lake_paths(data_lake_root, run_id)['dbt_target']
+    if not all(os.path.exists(os.path.join(run_target, name)) for name in DBT_DOCS_FILES):
+        print(f"Run {run_id} has no dbt docs, nothing to publish.")
+        return False
+    os.makedirs(docs_dir, exist_ok=True)
+    for name in DBT_DOCS_FILES:
+        staged = os.path.join(docs_dir, f".{name}.{run_id}")
+        shutil.copyfile(os.path.join(run_target, name), staged)
+        os.replace(staged, os.path.join(docs_dir, name))
+    print(f"Published the dbt docs of run {run_id} to {docs_dir}.")
+    return True
+
+
+def seed_run_from_shared(run_id: str, request_ids, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT) -> int:
+    """
+    Copies the shared silver and ledger rows of the given requests into a run namespace.
+
+    Statements that were ingested by an earlier run are already in the shared
+    tables, so a new run can pick them up from there instead of parsing and
+    re-writing them to bronze. Returns the number of silver rows seeded.
+
+    Shared silver rows written before normalization are split as they are
+    seeded (see `transform_statements.split_wide_silver`), so the run's silver
+    table never gets the customer and account columns back.
+    """
+    from pipelines.transform_statements import (SILVER_TABLES, LEDGER_MERGE_PREDICATE, merge_into_table,
+                                                silver_writer_properties, split_wide_silver)
+    from deltalake import DeltaTable
+    import pyarrow.compute as pc
+
+    request_ids = sorted(set(request_ids))
+    run_paths = lake_paths(data_lake_root, run_id)
+    shared_paths = lake_paths(data_lake_root)
+
+    seeded_rows = 0
+    for table, predicate in (*SILVER_TABLES, ('ledger', LEDGER_MERGE_PREDICATE)):
+        if not request_ids or not DeltaTable.is_deltatable(shared_paths[table]):
+            continue
+        rows = (
+            DeltaTable(shared_paths[table])
+            .to_pyarrow_dataset()
+            .to_table(filter=pc.field('request_id').isin(request_ids))
+        )
+        if table == 'silver':
+            split = split_wide_silver(rows)
+            for dimension, dimension_predicate in SILVER_TABLES:
+                if dimension != 'silver' and dimension in split and split[dimension].num_rows:
+                    merge_into_table(run_paths[dimension], split[dimension], dimension_predicate,
+                                     f"Run {dimension}", silver_writer_properties())
+            rows = split['silver']
+        print(f"Seeding {rows.num_rows} {table} rows into run {run_id} from the shared lake...")
+        if rows.num_rows:
+            merge_into_table(run_paths[table], rows, predicate, f"Run {table}",
+                             silver_writer_properties() if table != 'ledger' else None)
+        if table == 'silver':
+            seeded_rows = rows.num_rows
+    return seeded_rows
+
+
+def cleanup_run(run_id: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+    """Removes a run namespace and everything written to it."""
+    shutil.rmtree(lake_paths(data_lake_root, run_id)['root'], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=['publish', 'cleanup'], help="The action to perform on the run namespace.")
+    parser.add_argument("--run-id", type=str, required=True, help="The run namespace to act on.")
+    args = parser.parse_args()
+    if args.command == 'publish':
+        publish_run(args.run_id)
+        publish_docs(args.run_id)
+    else:
+        cleanup_run(args.run_id)
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import zlib
+import argparse
+import tempfile
+import multiprocessing
+from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor
+
+from pipelines.run_namespace import lake_paths
+from pipelines.transform_statements import (
+    DEFAULT_DATA_LAKE_ROOT, LEDGER_MERGE_PREDICATE, LOW_CARDINALITY_COLUMNS, SILVER_TABLES, SILVER_TABLE_KEYS,
+    clean, merge_into_table, normalize, normalized_columns, standardize_column,
+)
+
+# pandas, pyarrow and deltalake are imported on first use, as in transform_statements.
+
+def _partition(request_id) -> int:
+    return zlib.crc32(str('' if request_id is None else request_id).encode())
+
+
+def write_partitions(dataset, request_id_column: str, partitions: int, directory: str) -> tuple[list[str], dict, int]:
+    """
+    Reads bronze once, batch by batch, and writes each row to the Arrow IPC
+    file of its partition in `directory`, by a hash of its request_id, so
+    that all the rows of a request, and hence every silver row keyed by it,
+    belong to exactly one partition. Each worker then maps just its own file,
+    rather than decoding the whole of bronze to filter out its requests.
+
+    Returns the paths of the partition files, leaving out empty partitions but
+    always at least one file, the null count of every bronze column, and the
+    number of distinct request_ids.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    paths = [os.path.join(directory, f"partition-{partition:05d}.arrow") for partition in range(partitions)]
+    null_counts = dict.fromkeys(dataset.schema.names, 0)
+    request_partitions = {}
+    writers = {}
+    try:
+        for batch in dataset.to_batches():
+            for name, column in zip(batch.schema.names, batch.columns):
+                null_counts[name] += column.null_count
+            request_ids = batch.column(request_id_column)
+            distinct = pc.unique(request_ids)
+            batch_partitions = [request_partitions.setdefault(request_id, _partition(request_id) % partitions)
+                                for request_id in distinct.to_pylist()]
+            row_partitions = pc.take(pa.array(batch_partitions, pa.int32()), pc.index_in(request_ids, value_set=distinct))
+            # One take groups the batch by partition; each partition's rows are then a slice of it.
+            batch = batch.take(pc.sort_indices(row_partitions))
+            counts = pc.value_counts(row_partitions)
+            offset = 0
+            for partition, count in sorted(zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist())):
+                if partition not in writers:
+                    writers[partition] = pa.ipc.new_file(paths[partition], dataset.schema)
+                writers[partition].write_batch(batch.slice(offset, count))
+                offset += count
+        if not writers:
+            writers[0] = pa.ipc.new_file(paths[0], dataset.schema)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return [paths[partition] for partition in sorted(writers)], null_counts, len(request_partitions)
+
+
+def _silver_type(arrow_type, has_nulls: bool):
+    """Returns the silver type of a bronze column, as it comes out of `clean` on pandas."""
+    import pyarrow as pa
+
+    if pa.types.is_null(arrow_type) or pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type) \
+            or pa.types.is_string_view(arrow_type):
+        return pa.string()
+    if pa.types.is_integer(arrow_type):
+        # pandas holds an integer column with missing values as floats.
+        return pa.float64() if has_nulls else pa.int64()
+    if pa.types.is_floating(arrow_type):
+        return pa.float64()
+    if pa.types.is_timestamp(arrow_type):
+        return pa.timestamp('us', arrow_type.tz)
+    return arrow_type
+
+
+def silver_schemas(bronze_schema, null_counts: dict, table_paths: dict, write_mode: str) -> dict:
+    """
+    Returns the Arrow schema of each silver table, by lake_paths key, for
+    bronze with the given schema and null count of each column, so that every
+    worker writes its partition with the same types. In merge mode, the
+    columns a table already has keep their types.
+    """
+    import pyarrow as pa
+    from deltalake import DeltaTable
+    from pipelines.categorize import CATEGORY_COLUMN
+
+    types = {}
+    for field in bronze_schema:
+        types[standardize_column(field.name)] = _silver_type(field.type, null_counts.get(field.name, 0) > 0)
+    types[CATEGORY_COLUMN] = pa.string()
+
+    schemas = {}
+    for table, columns in normalized_columns(list(types)).items():
+        existing = {}
+        if write_mode != 'overwrite' and DeltaTable.is_deltatable(table_paths[table]):
+            existing = {field.name: field.type for field in pa.schema(DeltaTable(table_paths[table]).schema().to_arrow())}
+        schemas[table] = pa.schema([(column, _silver_type(existing.get(column, types[column]), False)) for column in columns])
+    return schemas
+
+
+def _file_statistics(table) -> str:
+    """
+    Returns the Delta statistics of a data file, as deltalake writes them: its
+    row count, and the bounds and null count of every column. Readers skip a
+    file on a column with a null count but no bounds, so every column has both.
+    """
+    import pyarrow.compute as pc
+
+    statistics = {'numRecords': table.num_rows, 'minValues': {}, 'maxValues': {}, 'nullCount': {}}
+    for column in table.column_names:
+        values = table.column(column)
+        statistics['nullCount'][column] = values.null_count
+        if values.null_count == len(values):
+            continue
+        bounds = pc.min_max(values)
+        for stat, bound in (('minValues', bounds['min'].as_py()), ('maxValues', bounds['max'].as_py())):
+            statistics[stat][column] = bound if isinstance(bound, (str, int, float)) else str(bound)
+    return json.dumps(statistics)
+
+
+def transform_partition(partition_path: str, request_id_column: str, table_paths: dict,
+                        schemas: dict, write_mode: str) -> dict:
+    """
+    Cleans and normalizes the bronze rows of one partition, written by
+    `write_partitions`, and writes each silver table's rows to one new Parquet
+    file in the table directory. The files are not part of the tables until
+    the caller commits them.
+
+    In merge mode, rows whose key is already in a table are left out, as the
+    serial MERGE does. Only this partition's request_ids can hold those keys,
+    so the check reads just their rows.
+
+    Returns the `files` written, as (path, size, statistics) by table, the
+    distinct `ledger` pairs, the `rows` read and `categorized`, and the
+    `cpu_seconds` the worker spent on the partition.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from deltalake import DeltaTable
+    from pipelines.categorize import CATEGORY_COLUMN, UNCATEGORIZED
+
+    cpu_start = time.process_time()
+    with pa.memory_map(partition_path) as source:
+        bronze = pa.ipc.open_file(source).read_all()
+    request_ids = pc.unique(bronze.column(request_id_column)).to_pylist()
+    df = clean(bronze.to_pandas())
+    del bronze
+    silver_tables = normalize(df)
+
+    files = {}
+    for table, schema in schemas.items():
+        rows = pa.Table.from_pandas(silver_tables[table], schema=schema, preserve_index=False)
+        key = SILVER_TABLE_KEYS[table]
+        if write_mode != 'overwrite' and DeltaTable.is_deltatable(table_paths[table]):
+            existing = (DeltaTable(table_paths[table]).to_pyarrow_dataset()
+                        .to_table(columns=key, filter=pc.field('request_id').isin(request_ids))
+                        .cast(rows.select(key).schema))
+            if existing.num_rows:
+                rows = rows.join(existing, keys=key, join_type='left anti')
+        if not rows.num_rows:
+            continue
+        os.makedirs(table_paths[table], exist_ok=True)
+        path = f"part-00000-{uuid4()}-c000.zstd.parquet"
+        pq.write_table(rows, os.path.join(table_paths[table], path), compression='zstd',
+                       use_dictionary=[column for column in rows.column_names if column in LOW_CARDINALITY_COLUMNS],
+                       coerce_timestamps='us', allow_truncated_timestamps=True)
+        files[table] = (path, os.path.getsize(os.path.join(table_paths[table], path)), _file_statistics(rows))
+
+    ledger = pa.Table.from_pandas(df[['email', 'request_id']].drop_duplicates(), preserve_index=False)
+    return {
+        'files': files,
+        'ledger': ledger.cast(pa.schema([schemas['silver'].field('email'), schemas['silver'].field('request_id')])),
+        'rows': len(df),
+        'categorized': int((df[CATEGORY_COLUMN] != UNCATEGORIZED).sum()),
+        'cpu_seconds': time.process_time() - cpu_start,
+    }
+
+
+def commit_files(table_path: str, schema, files: list, write_mode: str):
+    """
+    Commits data files written by `transform_partition` to the Delta table at
+    `table_path` in one transaction: appended in merge mode, replacing the
+    table's files and schema in overwrite mode. The table is created if it does
+    not exist, and in merge mode, columns it does not have yet are added first.
+    """
+    import pyarrow as pa
+    import deltalake
+    from deltalake import DeltaTable
+    from deltalake.transaction import AddAction, create_table_with_add_actions
+
+    modification_time = int(time.time() * 1000)
+    actions = [AddAction(path, size, {}, modification_time, True, statistics) for path, size, statistics in files]
+    if not DeltaTable.is_deltatable(table_path):
+        create_table_with_add_actions(table_path, deltalake.Schema.from_arrow(schema), actions, mode='error')
+        return
+    table = DeltaTable(table_path)
+    if write_mode == 'overwrite':
+        table.create_write_transaction(actions, mode='overwrite', schema=schema)
+        return
+    columns = set(pa.schema(table.schema().to_arrow()).names)
+    new_fields = [field for field in schema if field.name not in columns]
+    if new_fields:
+        # An append commit does not evolve the schema, so the new columns would not be read.
+        table.alter.add_columns([deltalake.Field.from_arrow(field) for field in new_fields])
+    if actions:
+        table.create_write_transaction(actions, mode='append', schema=pa.schema(table.schema().to_arrow()))
+
+
+def main(write_mode: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT, run_id: str | None = None, workers: int = 2):
+    """
+    Runs `transform_statements.main` on a pool of worker processes, for
+    backfills too large for one core.
+
+    Bronze is read once, here, and split by a hash of request_id into one Arrow
+    IPC file per worker (see `write_partitions`). Each worker cleans,
+    categorizes and normalizes one partition and writes it to new data files in
+    every silver table. Partitions share no request, so their files never hold
+    the same key and need no MERGE against each other: once every worker is
+    done, each silver table commits all the files in one transaction, and the
+    ledger is written in one batch.
+
+    If a worker fails, nothing is committed, but its files and those of the
+    other workers are left in the table directories, outside any table
+    version, until a VACUUM removes them. Like the serial MERGE, the run
+    assumes no other writer adds the same requests in the meantime.
+
+    Returns the CPU seconds each worker spent on its partition.
+    """
+    import pyarrow as pa
+    from deltalake import DeltaTable, write_deltalake
+
+    paths = lake_paths(data_lake_root, run_id)
+    try:
+        bronze = DeltaTable(paths['bronze'])
+    except Exception as e:
+        print(f"Error reading bronze Delta table at {paths['bronze']}: {e}")
+        return
+
+    raw_columns = {standardize_column(name): name for name in pa.schema(bronze.schema().to_arrow()).names}
+    if 'email' not in raw_columns or 'request_id' not in raw_columns:
+        print("Error: 'email' or 'request_id' not found in bronze data.")
+        return
+    request_id_column = raw_columns['request_id']
+    dataset = bronze.to_pyarrow_dataset()
+
+    # The partition files only live for the duration of the transform.
+    with tempfile.TemporaryDirectory() as partitions_dir:
+        partitions, null_counts, requests = write_partitions(dataset, request_id_column, max(1, workers), partitions_dir)
+        schemas = silver_schemas(dataset.schema, null_counts, paths, write_mode)
+
+        print(f"Transforming {requests} requests from the bronze layer in {len(partitions)} partitions...")
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(partitions), mp_context=context) as pool:
+            futures = [
+                pool.submit(transform_partition, partition, request_id_column, paths, schemas, write_mode)
+                for partition in partitions
+            ]
+            results = [future.result() for future in futures]
+
+    rows = sum(result['rows'] for result in results)
+    print(f"Read {rows} rows from the bronze layer.")
+    print(f"Categorized {sum(result['categorized'] for result in results)} of {rows} transactions.")
+
+    print(f"Committing {rows} cleaned rows to the silver layer with mode: {write_mode}...")
+    written = {}
+    for table, _ in SILVER_TABLES:
+        if table not in schemas:
+            continue
+        files = [result['files'][table] for result in results if table in result['files']]
+        commit_files(paths[table], schemas[table], files, write_mode)
+        written[table] = sum(json.loads(statistics)['numRecords'] for _, _, statistics in files)
+    print("Silver layer write complete: " + ", ".join(f"{count} {table} rows" for table, count in written.items()) + ".")
+
+    status = pa.concat_tables([result['ledger'] for result in results])
+    status = status.append_column('status', pa.array(['PENDING'] * status.num_rows, pa.string()))
+    print(f"Writing {status.num_rows} records to scoring status ledger with mode: {write_mode}...")
+    if write_mode == 'overwrite':
+        write_deltalake(paths['ledger'], status, mode="overwrite", schema_mode="overwrite") # type: ignore
+    else: # Default to merge for safety
+        merge_into_table(paths['ledger'], status, LEDGER_MERGE_PREDICATE, "Ledger")
+    print("Ledger write complete.")
+    return [result['cpu_seconds'] for result in results]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transforms bronze into silver on a pool of worker processes.")
+    parser.add_argument("--write-mode", type=str, default="merge", choices=['merge', 'overwrite'],
+                        help="The write mode for the pipeline (merge or overwrite).")
+    parser.add_argument("--run-id", type=str, default=None,
+                        help="Process the isolated lake namespace of this analysis run instead of the shared lake.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    args = parser.parse_args()
+    main(write_mode=args.write_mode, run_id=args.run_id, workers=args.workers)
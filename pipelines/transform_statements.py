@@ -1,21 +1,240 @@
-import pandas as pd
-from deltalake import DeltaTable, write_deltalake
 from pathlib import Path
+import functools
 import os
 import argparse
+from pipelines.run_namespace import lake_paths
+
+# pandas and deltalake are imported on first use, so that importing this module
+# for its merge predicates, or running it with --help, stays fast.
 
 # Use an environment variable to determine the root path, defaulting to a relative path for local execution.
 DEFAULT_DATA_LAKE_ROOT = os.getenv("DATA_LAKE_ROOT", ".")
 
-def main(write_mode: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
+def _merge_predicate(key: list[str]) -> str:
+    return " AND ".join(f"target.{column} = source.{column}" for column in key)
+
+# The columns that identify a row of each table; rows are only inserted if no row with the same key exists.
+SILVER_KEY = ['email', 'request_id', 'date', 'description']
+LEDGER_KEY = ['email', 'request_id']
+SILVER_MERGE_PREDICATE = _merge_predicate(SILVER_KEY)
+LEDGER_MERGE_PREDICATE = _merge_predicate(LEDGER_KEY)
+
+# Silver is normalized: the statement columns that repeat on every transaction
+# of a request or of an account are written once per request or account to
+# these dimension tables, keyed by the columns they share with the silver table.
+CUSTOMER_KEY = ['email', 'request_id']
+CUSTOMER_COLUMNS = ['username', 'address', 'financial_institution', 'employer_name', 'login_id',
+                    'request_date_time', 'request_status', 'days_detected', 'tag']
+ACCOUNT_KEY = ['email', 'request_id', 'account_number']
+ACCOUNT_COLUMNS = ['account_id', 'account_name', 'account_type', 'account_balance']
+CUSTOMER_MERGE_PREDICATE = _merge_predicate(CUSTOMER_KEY)
+ACCOUNT_MERGE_PREDICATE = _merge_predicate(ACCOUNT_KEY)
+SILVER_TABLE_KEYS = {'silver': SILVER_KEY, 'silver_customers': CUSTOMER_KEY, 'silver_accounts': ACCOUNT_KEY}
+
+# The silver tables, by lake_paths key, with the predicate each one is merged on.
+# They are written in this order, so that every transaction in silver has its
+# customer and account by the time it can be read.
+SILVER_TABLES = (
+    ('silver_customers', CUSTOMER_MERGE_PREDICATE),
+    ('silver_accounts', ACCOUNT_MERGE_PREDICATE),
+    ('silver', SILVER_MERGE_PREDICATE),
+)
+
+# Columns with few distinct values, which Parquet stores as a dictionary plus
+# indices. The amounts and balances are nearly all distinct, so a dictionary
+# would only be abandoned part way through each column chunk.
+LOW_CARDINALITY_COLUMNS = ACCOUNT_KEY + CUSTOMER_COLUMNS + ACCOUNT_COLUMNS + [
+    'date', 'description', 'category', 'subcategory', 'type', 'transaction_category']
+
+def silver_writer_properties():
+    """Returns the Parquet settings of the silver tables: ZSTD, with dictionaries for the low-cardinality columns."""
+    from deltalake import ColumnProperties, WriterProperties
+
+    return WriterProperties(
+        compression='ZSTD',
+        default_column_properties=ColumnProperties(dictionary_enabled=False),
+        column_properties={column: ColumnProperties(dictionary_enabled=True) for column in LOW_CARDINALITY_COLUMNS},
+    )
+
+def standardize_column(name: str) -> str:
+    """Standardizes a statement header the same way the ingestion pipeline does, e.g. 'Request ID' to 'request_id'."""
+    return name.replace(' ', '_').replace('/', '_').lower()
+
+def clean(df):
+    """
+    Standardizes the column names of bronze rows, fills missing values (0 for
+    numbers, '' for text), and tags each transaction with its category.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    from pipelines.categorize import CATEGORY_COLUMN, UNCATEGORIZED, categorize
+
+    df.columns = [standardize_column(col) for col in df.columns]
+
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].fillna(0)
+        elif pd.api.types.is_object_dtype(df[col]):
+            df[col] = df[col].fillna('')
+
+    # Tag each transaction by its description (see pipelines/category_rules.json),
+    # for the credit card and debt payment metrics computed by dbt.
+    if 'description' in df.columns:
+        df[CATEGORY_COLUMN] = categorize(pa.array(df['description'], pa.string())).to_pandas()
+    else:
+        df[CATEGORY_COLUMN] = UNCATEGORIZED
+    return df
+
+def normalized_columns(columns: list[str]) -> dict:
+    """
+    Returns the columns of each silver table, by lake_paths key, for cleaned
+    transactions with the given columns. A dimension is left out when the
+    transactions do not have its key columns.
+    """
+    tables = {}
+    fact_columns = list(columns)
+    for table, key, attributes in (('silver_customers', CUSTOMER_KEY, CUSTOMER_COLUMNS),
+                                   ('silver_accounts', ACCOUNT_KEY, ACCOUNT_COLUMNS)):
+        if not all(column in columns for column in key):
+            continue
+        attributes = [column for column in attributes if column in columns]
+        tables[table] = key + attributes
+        fact_columns = [column for column in fact_columns if column not in attributes]
+    tables['silver'] = fact_columns
+    return tables
+
+def normalize(df) -> dict:
+    """
+    Splits cleaned transactions into the silver tables, by lake_paths key:
+    `silver`, one row per transaction, `silver_customers`, one row per request,
+    and `silver_accounts`, one row per account of a request.
+    """
+    tables = {}
+    for table, columns in normalized_columns(list(df.columns)).items():
+        key = SILVER_TABLE_KEYS[table]
+        tables[table] = df[columns] if table == 'silver' else df[columns].drop_duplicates(subset=key).reset_index(drop=True)
+    return tables
+
+def split_wide_silver(rows) -> dict:
+    """
+    Splits Arrow silver rows written before normalization, which still carry
+    the customer and account columns, into the silver tables, by lake_paths key,
+    as `normalize` does for cleaned transactions. Only rows with a customer or
+    account value add a dimension row, so the NULLs of rows written since
+    normalization never stand in for their real dimension rows.
+    """
+    import pyarrow.compute as pc
+
+    tables = {}
+    for table, columns in normalized_columns(rows.column_names).items():
+        key = SILVER_TABLE_KEYS[table]
+        attributes = [column for column in columns if column not in key]
+        if table == 'silver':
+            tables[table] = rows.select(columns)
+            continue
+        if not attributes:
+            continue
+        has_values = functools.reduce(pc.or_, [pc.is_valid(rows.column(column)) for column in attributes])
+        dimension = (
+            rows.filter(has_values)
+            .group_by(key, use_threads=False)
+            .aggregate([(column, 'first') for column in attributes])
+        )
+        tables[table] = dimension.rename_columns(
+            [column.removesuffix('_first') for column in dimension.column_names]
+        ).select(columns)
+    return tables
+
+def migrate_wide_silver(data_lake_root: str = DEFAULT_DATA_LAKE_ROOT, run_id: str | None = None) -> bool:
+    """
+    Splits a silver table written before normalization into the normalized
+    silver tables in place: the customer and account columns of its rows are
+    merged into the dimension tables, and silver is rewritten from its own
+    rows without them. Nothing is read from bronze, so rows that only reached
+    silver through a published run are kept.
+
+    Returns whether silver had to be migrated. It should be run while no
+    analysis is publishing to the same lake.
+    """
+    from deltalake import DeltaTable, write_deltalake
+
+    paths = lake_paths(data_lake_root, run_id)
+    if not DeltaTable.is_deltatable(paths['silver']):
+        print(f"No silver table at {paths['silver']}, nothing to migrate.")
+        return False
+    dataset = DeltaTable(paths['silver']).to_pyarrow_dataset()
+    columns = dataset.schema.names
+    wide_columns = [column for column in CUSTOMER_COLUMNS + ACCOUNT_COLUMNS if column in columns]
+    if not wide_columns:
+        print("Silver is already normalized, nothing to migrate.")
+        return False
+
+    # Only the keys and the dimension columns are read to build the dimensions.
+    key_columns = [column for column in ACCOUNT_KEY if column in columns]
+    silver_tables = split_wide_silver(dataset.to_table(columns=key_columns + wide_columns))
+    writer_properties = silver_writer_properties()
+    for table, predicate in SILVER_TABLES:
+        if table != 'silver' and table in silver_tables:
+            print(f"Merging {silver_tables[table].num_rows} {table} rows from the wide silver table...")
+            merge_into_table(paths[table], silver_tables[table], predicate, f"Silver table {table}", writer_properties)
+
+    # Silver is rewritten batch by batch from the version read above; its old files
+    # stay in place until a VACUUM, so the rewrite can stream from them.
+    fact_columns = normalized_columns(columns)['silver']
+    print(f"Rewriting silver without the columns {wide_columns}...")
+    write_deltalake(paths['silver'], dataset.scanner(columns=fact_columns).to_reader(),
+                    mode="overwrite", schema_mode="overwrite", writer_properties=writer_properties)
+    print("Silver migration complete.")
+    return True
+
+def merge_into_table(table_path: str, source, predicate: str, label: str, writer_properties=None):
+    """
+    Inserts the rows of `source` that are not yet in the Delta table at
+    `table_path`, creating the table if it does not exist. Columns of the
+    source that the table does not have yet are added to it.
+    """
+    from deltalake import DeltaTable, write_deltalake
+
+    if not DeltaTable.is_deltatable(table_path):
+        print(f"{label} not found, creating new one.")
+        write_deltalake(table_path, source, mode="overwrite", schema_mode="overwrite", writer_properties=writer_properties) # type: ignore
+        return
+    (
+        DeltaTable(table_path)
+        .merge(
+            source=source, # type: ignore
+            predicate=predicate,
+            source_alias="source",
+            target_alias="target",
+            # Without it, source columns missing from the table would be silently dropped.
+            merge_schema=True,
+            writer_properties=writer_properties
+        )
+        .when_not_matched_insert_all()
+        .execute()
+    )
+
+def main(write_mode: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT, run_id: str | None = None, workers: int = 1):
     """
     Reads new data from the bronze layer, cleans it, and writes it to the
-    silver layer and the scoring_status ledger. This pipeline is fully
-    idempotent and scalable.
+    normalized silver tables (see `normalize`) and the scoring_status ledger.
+    This pipeline is fully idempotent and scalable.
+
+    When a run_id is given, every table is read from and written to that run's
+    isolated namespace under `data_lake/runs/<run_id>` instead of the shared lake.
+    With more than one worker, the requests are split across a process pool
+    (see `transform_parallel`).
     """
-    BRONZE_PATH = os.path.join(data_lake_root, 'data_lake/bronze')
-    SILVER_PATH = os.path.join(data_lake_root, 'data_lake/silver')
-    STATUS_LEDGER_PATH = os.path.join(data_lake_root, 'data_lake/application_status_ledger')
+    from deltalake import DeltaTable, write_deltalake
+    from pipelines.categorize import CATEGORY_COLUMN, UNCATEGORIZED
+
+    if workers > 1:
+        from pipelines import transform_parallel
+        return transform_parallel.main(write_mode, data_lake_root, run_id, workers)
+
+    paths = lake_paths(data_lake_root, run_id)
+    BRONZE_PATH = paths['bronze']
+    STATUS_LEDGER_PATH = paths['ledger']
 
     # Read the entire bronze table.
     try:
@@ -26,37 +245,25 @@ def main(write_mode: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
 
     print(f"Read {len(df)} rows from the bronze layer.")
 
-    # --- Data Cleaning ---
-    for col in df.columns:
-        if pd.api.types.is_numeric_dtype(df[col]):
-            df[col] = df[col].fillna(0)
-        elif pd.api.types.is_object_dtype(df[col]):
-            df[col] = df[col].fillna('')
+    # --- Data Cleaning and Categorization ---
+    df = clean(df)
 
     if 'email' not in df.columns or 'request_id' not in df.columns:
         print("Error: 'email' or 'request_id' not found in bronze data.")
         return
+    print(f"Categorized {(df[CATEGORY_COLUMN] != UNCATEGORIZED).sum()} of {len(df)} transactions.")
 
     print(f"Writing {len(df)} cleaned rows to the silver layer with mode: {write_mode}...")
-    if write_mode == 'overwrite':
-        write_deltalake(SILVER_PATH, df, mode="overwrite", schema_mode="overwrite") # type: ignore
-    else: # Default to merge for safety
-        try:
-            (
-                DeltaTable(SILVER_PATH)
-                .merge(
-                    source=df, # type: ignore
-                    predicate="target.email = source.email AND target.request_id = source.request_id AND target.date = source.date AND target.description = source.description",
-                    source_alias="source",
-                    target_alias="target"
-                )
-                .when_not_matched_insert_all()
-                .execute()
-            )
-        except Exception:
-            print("Silver table not found, creating new one.")
-            write_deltalake(SILVER_PATH, df, mode="overwrite", schema_mode="overwrite") # type: ignore
-    print("Silver layer write complete.")
+    silver_tables = normalize(df)
+    writer_properties = silver_writer_properties()
+    for table, predicate in SILVER_TABLES:
+        if table not in silver_tables:
+            continue
+        if write_mode == 'overwrite':
+            write_deltalake(paths[table], silver_tables[table], mode="overwrite", schema_mode="overwrite", writer_properties=writer_properties) # type: ignore
+        else: # Default to merge for safety
+            merge_into_table(paths[table], silver_tables[table], predicate, f"Silver table {table}", writer_properties)
+    print("Silver layer write complete: " + ", ".join(f"{len(rows)} {table} rows" for table, rows in silver_tables.items()) + ".")
 
     # --- Update the Scoring Status Ledger ---
     status_df = df[['email', 'request_id']].drop_duplicates().copy()
@@ -66,21 +273,7 @@ def main(write_mode: str, data_lake_root: str = DEFAULT_DATA_LAKE_ROOT):
     if write_mode == 'overwrite':
         write_deltalake(STATUS_LEDGER_PATH, status_df, mode="overwrite", schema_mode="overwrite") # type: ignore
     else: # Default to merge for safety
-        try:
-            (
-                DeltaTable(STATUS_LEDGER_PATH)
-                .merge(
-                    source=status_df, # type: ignore
-                    predicate="target.email = source.email AND target.request_id = source.request_id",
-                    source_alias="source",
-                    target_alias="target"
-                )
-                .when_not_matched_insert_all()
-                .execute()
-            )
-        except Exception:
-            print("Ledger not found, creating new one.")
-            write_deltalake(STATUS_LEDGER_PATH, status_df, mode="overwrite", schema_mode="overwrite") # type: ignore
+        merge_into_table(STATUS_LEDGER_PATH, status_df, LEDGER_MERGE_PREDICATE, "Ledger")
     print("Ledger write complete.")
 
 
@@ -93,5 +286,25 @@ if __name__ == "__main__":
         choices=['merge', 'overwrite'],
         help="The write mode for the pipeline (merge or overwrite)."
     )
+    parser.add_argument(
+        "--run-id",
+        type=str,
+        default=None,
+        help="Process the isolated lake namespace of this analysis run instead of the shared lake."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes to clean and write the requests in parallel; 0 uses every core."
+    )
+    parser.add_argument(
+        "--migrate-wide-silver",
+        action="store_true",
+        help="Split a silver table written before normalization into the dimension tables in place, instead of transforming bronze."
+    )
     args = parser.parse_args()
-    main(write_mode=args.write_mode)
+    if args.migrate_wide_silver:
+        migrate_wide_silver(run_id=args.run_id)
+    else:
+        main(write_mode=args.write_mode, run_id=args.run_id, workers=args.workers or os.cpu_count() or 1)
@@ -1,7 +1,21 @@
+import argparse
+
 from api_mock import create_app
 
 app = create_app()
 
 if __name__ == '__main__':
-    print("Mock Flinks API server running on http://0.0.0.0:5000")
-    app.run(debug=True, port=5000, host='0.0.0.0')
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=5000, help="Port to listen on.")
+    parser.add_argument("--asgi", action="store_true", help="Serve the async routes of api_mock.asgi with uvicorn instead of the Flask dev server.")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes, with --asgi.")
+    args = parser.parse_args()
+
+    if args.asgi:
+        import uvicorn
+
+        print(f"Mock Flinks API server running on http://0.0.0.0:{args.port} with {args.workers} ASGI worker(s)")
+        uvicorn.run("api_mock.asgi:app", host='0.0.0.0', port=args.port, workers=args.workers, log_level="warning")
+    else:
+        print(f"Mock Flinks API server running on http://0.0.0.0:{args.port}")
+        app.run(debug=True, port=args.port, host='0.0.0.0')
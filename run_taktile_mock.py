@@ -0,0 +1,7 @@
+from taktile_mock import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    print("Taktile decision emulator running on http://0.0.0.0:5001")
+    app.run(debug=True, port=5001, host='0.0.0.0')
@@ -0,0 +1,21 @@
+import logging
+from flask import Flask
+from .api.routes import taktile_bp
+
+def create_app():
+    """Create and configure an instance of the Taktile emulator application."""
+    app = Flask(__name__)
+
+    # Register the blueprint
+    app.register_blueprint(taktile_bp)
+
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    app.logger.info("Taktile emulator app created and configured.")
+
+    return app
@@ -0,0 +1,115 @@
+import os
+import math
+import time
+import random
+import threading
+from uuid import uuid4
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, request, current_app
+from taktile_mock.services import decision_service
+
+taktile_bp = Blueprint('taktile', __name__)
+
+DECIDE_PATH = '/run/api/v1/flows/underwriting/sandbox/decide'
+
+# Simulated network and processing latency. Benchmarks can override it for the
+# whole server with TAKTILE_MOCK_LATENCY_MS, or per request with the
+# X-Mock-Latency-Ms header.
+LATENCY_CONFIG = decision_service.CONFIG.get('latency', {})
+ASYNC_CONFIG = decision_service.CONFIG.get('async', {})
+
+# Decisions accepted asynchronously (202), keyed by decision id. Decisions that
+# are never polled are dropped once they have been ready for `async.ttl_seconds`.
+_pending_decisions = {}
+_pending_lock = threading.Lock()
+
+
+def _latency_seconds() -> float:
+    """
+    Returns the latency to simulate for the current request.
+    Raises ValueError if the latency override is not a finite number.
+    """
+    override = request.headers.get('X-Mock-Latency-Ms', os.getenv('TAKTILE_MOCK_LATENCY_MS'))
+    if override is not None:
+        override_ms = float(override)
+        if not math.isfinite(override_ms):
+            raise ValueError(f"Latency override must be finite, got {override!r}.")
+        return max(override_ms, 0) / 1000
+    mean_ms = LATENCY_CONFIG.get('mean_ms', 0)
+    jitter_ms = LATENCY_CONFIG.get('jitter_ms', 0)
+    return max(random.uniform(mean_ms - jitter_ms, mean_ms + jitter_ms), 0) / 1000
+
+
+def _expire_pending_decisions(now: float):
+    """Drops the pending decisions that have been ready for longer than the TTL. Call with _pending_lock held."""
+    expired_before = now - ASYNC_CONFIG.get('ttl_seconds', 600)
+    for decision_id in [decision_id for decision_id, (ready_at, _) in _pending_decisions.items() if ready_at < expired_before]:
+        del _pending_decisions[decision_id]
+
+
+def _decision_response(decision_id: str, entity_id: str, data: dict) -> dict:
+    return {
+        'data': data,
+        'metadata': {
+            'decision_id': decision_id,
+            'entity_id': entity_id,
+            'version': decision_service.CONFIG.get('flow_version'),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        },
+        'control': {'execution_mode': 'sync'},
+    }
+
+
+@taktile_bp.route(DECIDE_PATH, methods=['POST'])
+def decide():
+    """
+    Emulates the Taktile underwriting flow.
+    Returns the decision directly (200), or accepts it for polling (202) when
+    the payload asks for `control.execution_mode` "async".
+    """
+    if not request.headers.get('X-Api-Key'):
+        current_app.logger.error("Decision request received without an API key.")
+        return jsonify({'detail': 'Missing X-Api-Key header.'}), 401
+
+    payload = request.get_json(silent=True) or {}
+    data = payload.get('data')
+    if not isinstance(data, dict):
+        return jsonify({'detail': "Payload must contain a 'data' object."}), 422
+
+    metadata = payload.get('metadata') or {}
+    entity_id = metadata.get('entity_id', '')
+    decision_id = str(uuid4())
+    try:
+        time.sleep(_latency_seconds())
+    except ValueError:
+        return jsonify({'detail': 'X-Mock-Latency-Ms must be a number of milliseconds.'}), 400
+
+    decision = _decision_response(decision_id, entity_id, decision_service.decide(data))
+    if (payload.get('control') or {}).get('execution_mode') == 'async':
+        now = time.monotonic()
+        ready_at = now + ASYNC_CONFIG.get('processing_ms', 0) / 1000
+        with _pending_lock:
+            _expire_pending_decisions(now)
+            _pending_decisions[decision_id] = (ready_at, decision)
+        current_app.logger.info(f"Accepted decision {decision_id} for entity {entity_id}.")
+        return jsonify({'metadata': decision['metadata'], 'control': {'execution_mode': 'async'}}), 202
+
+    current_app.logger.info(f"Decided {decision_id} for entity {entity_id}: {decision['data']['risk_tier']}.")
+    return jsonify(decision), 200
+
+
+@taktile_bp.route(f'{DECIDE_PATH}/<decision_id>', methods=['GET'])
+def get_decision(decision_id):
+    """Returns an accepted decision once processed, or 202 while it is still pending."""
+    with _pending_lock:
+        pending = _pending_decisions.get(decision_id)
+    if pending is None:
+        return jsonify({'detail': f"Decision '{decision_id}' not found."}), 404
+
+    ready_at, decision = pending
+    if time.monotonic() < ready_at:
+        return jsonify({'metadata': decision['metadata'], 'control': {'execution_mode': 'async'}}), 202
+
+    with _pending_lock:
+        _pending_decisions.pop(decision_id, None)
+    return jsonify(decision), 200
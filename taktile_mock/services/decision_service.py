@@ -0,0 +1,135 @@
+import os
+import json
+import math
+import logging
+from typing import Any, Dict
+
+CONFIG_PATH = os.getenv(
+    "TAKTILE_MOCK_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.json'),
+)
+
+def _load_config() -> Dict[str, Any]:
+    """Loads the decision rules from config.json."""
+    if not os.path.exists(CONFIG_PATH):
+        logging.error(f"Config file not found at {CONFIG_PATH}")
+        return {}
+    try:
+        with open(CONFIG_PATH, 'r') as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        logging.error(f"Error decoding JSON from {CONFIG_PATH}: {e}")
+        return {}
+
+CONFIG = _load_config()
+
+def _number(data: Dict[str, Any], key: str) -> float:
+    """Reads a numeric input, treating missing or null values as 0."""
+    value = data.get(key)
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 0.0
+
+def _round_down(amount: float, step: int) -> float:
+    """Spreadsheet-style ROUNDDOWN to a multiple of `step`."""
+    return float(math.floor(max(amount, 0) / step) * step) if step else amount
+
+def score_factor(value: float | None, rule: Dict[str, Any]) -> int:
+    """
+    Scores a risk factor from 1 (low risk) to 3 (high risk) against two
+    thresholds. Missing values (e.g. an infinite runway) score as low risk.
+    """
+    if value is None:
+        return 1
+    low, high = rule['thresholds']
+    if rule.get('higher_is_better', True):
+        return 1 if value >= high else 2 if value >= low else 3
+    return 1 if value <= low else 2 if value <= high else 3
+
+def assign_tier(average_risk_score: float, tiers: list) -> Dict[str, Any]:
+    """Returns the first tier whose max_score covers the average risk score."""
+    for tier in tiers:
+        if average_risk_score <= tier['max_score']:
+            return tier
+    return tiers[-1]
+
+def decide(data: Dict[str, Any], config: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    Computes an underwriting decision from the credit metrics sent by the app.
+
+    Returns the input data together with the risk factors, risk tier, line
+    assignment and approval amounts, under the same field names as the
+    Taktile underwriting flow.
+    """
+    config = config or CONFIG
+
+    estimated_monthly_revenue = _number(data, 'estimated_annual_revenue') / 12
+    average_daily_balance = _number(data, 'average_daily_balance')
+    most_recent_balance = _number(data, 'most_recent_balance_across_bank_accounts')
+    monthly_debt_payments = _number(data, 'existing_debt_payments_consideration')
+    monthly_revenue_90d = _number(data, 'revenue_recent_90d') / 3
+    monthly_debits_90d = _number(data, 'debits_recent_90d') / 3
+
+    # --- Risk factors ---
+    monthly_burn = max(monthly_debits_90d - monthly_revenue_90d, 0.0)
+    factors = {
+        'average_daily_balance_to_estimated_monthly_revenue': _ratio(average_daily_balance, estimated_monthly_revenue),
+        'debt_revenue_ratio': _ratio(monthly_debt_payments, estimated_monthly_revenue),
+        'change_in_estimated_bank_revenue_qoq': _ratio(
+            _number(data, 'revenue_recent_90d') - _number(data, 'revenue_91_to_180d'),
+            _number(data, 'revenue_91_to_180d'),
+        ),
+        'current_balance_to_avg_balance_in_last_6_months': _ratio(most_recent_balance, average_daily_balance),
+        'runway_months': _ratio(most_recent_balance, monthly_burn) if monthly_burn > 0 else None,
+    }
+
+    # --- Risk scoring & tiering ---
+    scores = [score_factor(factors[name], rule) for name, rule in config['risk_factors'].items()]
+    average_risk_score = round(sum(scores) / len(scores), 2)
+    tier = assign_tier(average_risk_score, config['risk_tiers'])
+
+    # --- Credit line assignment ---
+    debt_maximum_capacity = _number(data, 'smart_revenue') * tier['debt_capacity_pct']
+    debt_used = monthly_debt_payments * 12
+    debt_remaining_capacity = max(debt_maximum_capacity - debt_used, 0.0)
+    credit_limit = min(debt_remaining_capacity, tier['guardrail'])
+
+    # --- Card's MCA ---
+    card = config['card']
+    average_weekly_revenue = _number(data, 'average_weekly_revenue')
+    average_calculated_daily_revenue = average_weekly_revenue / 7
+    daily_withdrawal = average_calculated_daily_revenue * card['daily_withdrawal_pct']
+    card_max_approval_amount = daily_withdrawal * card['term_days']
+
+    # --- Capital MCA ---
+    capital = config['capital']
+    capital_max_approval_amount = average_weekly_revenue * capital['weekly_revenue_pct'] * tier['length_multiplier_in_weeks']
+    capital_mca_approval_amount = _round_down(min(capital_max_approval_amount, credit_limit), capital['rounding'])
+
+    return {
+        **data,
+        **factors,
+        'monthly_burn': monthly_burn,
+        'average_risk_score': average_risk_score,
+        'risk_tier': tier['name'],
+        'debt_maximum_capacity': debt_maximum_capacity,
+        'debt_used': debt_used,
+        'debt_remaining_capacity': debt_remaining_capacity,
+        'debt_guardrail': tier['guardrail'],
+        'credit_limit': credit_limit,
+        'credit_approval_amount': _round_down(credit_limit, config['credit_rounding']),
+        'average_weekly_revenue': average_weekly_revenue,
+        'average_calculated_daily_revenue': average_calculated_daily_revenue,
+        'daily_withdrawal': daily_withdrawal,
+        'card_max_approval_amount': card_max_approval_amount,
+        'card_approval_amount': _round_down(min(card_max_approval_amount, credit_limit), card['rounding']),
+        'length_multiplier_in_weeks': tier['length_multiplier_in_weeks'],
+        'repayment_frequency': tier['repayment_frequency'],
+        'capital_max_approval_amount': capital_max_approval_amount,
+        'capital_mca_approval_amount': capital_mca_approval_amount,
+        'capital_approval_amount': _round_down(capital_mca_approval_amount * capital['capital_plus_multiplier'], capital['rounding']),
+    }
@@ -1,3 +1,6 @@
+import io
+import os
+import zipfile
 import pytest
 import json
 from uuid import uuid4
@@ -42,7 +45,7 @@ def test_get_statements_endpoint_success(client, monkeypatch):
     # We can mock the service layer to isolate the API test
     monkeypatch.setattr(
         'api_mock.services.data_service.load_transactions',
-        lambda x: [{'Amount': 100}]
+        lambda x, from_date=None: [{'Amount': 100}]
     )
 
     customer_id = uuid4()
@@ -132,6 +135,37 @@ def test_download_statement_missing_email(client):
     data = json.loads(response.data)
     assert 'Email is required' in data['error']
 
+def test_download_statements_zip(client):
+    """Test that the zip download contains the original statement files, byte for byte."""
+    response = client.post('/download/zip', data={'email': 'joelschaubel@gmail.com'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert 'statements_joelschaubel_gmail_com.zip' in response.headers['Content-Disposition']
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.testzip() is None
+        for account in data_service.get_accounts():
+            with open(data_service.get_statement_path(account['Id']), 'rb') as f:
+                assert archive.read(f"statement_{account['AccountNumber']}.csv") == f.read()
+
+def test_stream_zip_yields_chunks_as_it_reads(tmp_path):
+    """Test that statement files are zipped chunk by chunk rather than as one body."""
+    from api_mock.api.routes import _stream_zip
+    content = os.urandom(256 * 1024)  # Incompressible, so the deflated output is as large as the input.
+    (tmp_path / "large.csv").write_bytes(content)
+
+    chunks = list(_stream_zip([("large.csv", tmp_path / "large.csv")], chunk_size=16 * 1024))
+    assert len(chunks) > 4
+    assert max(len(chunk) for chunk in chunks) < 128 * 1024
+    assert zipfile.ZipFile(io.BytesIO(b''.join(chunks))).read("large.csv") == content
+
+def test_download_statements_zip_errors(client):
+    """Test the zip download for a missing and an unknown email."""
+    assert client.post('/download/zip').status_code == 400
+    response = client.post('/download/zip', data={'email': 'nonexistent@email.com'})
+    assert response.status_code == 404
+    assert 'not found' in json.loads(response.data)['error']
+
 def test_get_combined_statements_by_email_success(client):
     """Test get_combined_statements_by_email for a successful case."""
     response = client.get('/api/statements?email=joelschaubel@gmail.com')
@@ -153,3 +187,188 @@ def test_get_combined_statements_missing_email(client):
     assert response.status_code == 400
     data = json.loads(response.data)
     assert 'Email query parameter is required' in data['error']
+
+def test_get_combined_statements_pages_match_the_full_list(client):
+    """Test that following NextCursor returns every transaction of the unpaginated list, once."""
+    expected = json.loads(client.get('/api/statements?email=joelschaubel@gmail.com').data)
+
+    transactions, cursor = [], '0'
+    while cursor is not None:
+        response = client.get(f'/api/statements?email=joelschaubel@gmail.com&limit=250&cursor={cursor}')
+        page = json.loads(response.data)
+        assert len(page['Transactions']) <= 250
+        assert response.headers.get('X-Next-Cursor') == page['NextCursor']
+        transactions.extend(page['Transactions'])
+        cursor = page['NextCursor']
+    assert transactions == expected
+
+def test_get_combined_statements_ndjson_stream(client):
+    """Test that the NDJSON mode streams the same transactions, one per line, with the next cursor in a header."""
+    expected = json.loads(client.get('/api/statements?email=joelschaubel@gmail.com').data)
+
+    response = client.get('/api/statements?email=joelschaubel@gmail.com', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'X-Next-Cursor' not in response.headers
+    assert [json.loads(line) for line in response.data.splitlines()] == expected
+
+    response = client.get('/api/statements?email=joelschaubel@gmail.com&limit=10', headers={'Accept': 'application/x-ndjson'})
+    assert len(response.data.splitlines()) == 10
+    assert response.headers['X-Next-Cursor'] == '10'
+
+def test_get_combined_statements_invalid_pagination(client):
+    """Test that a bad limit or cursor is rejected."""
+    assert client.get('/api/statements?email=joelschaubel@gmail.com&limit=0').status_code == 400
+    assert client.get('/api/statements?email=joelschaubel@gmail.com&cursor=abc').status_code == 400
+
+@pytest.mark.parametrize('mimetype', ['application/vnd.apache.arrow.stream', 'application/vnd.apache.parquet'])
+def test_statement_endpoints_negotiate_table_formats(client, mimetype):
+    """Test that both statement endpoints answer with Arrow IPC or Parquet, holding the same transactions as the JSON."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def read_table(response):
+        assert response.mimetype == mimetype
+        if mimetype == 'application/vnd.apache.parquet':
+            return pq.read_table(io.BytesIO(response.data))
+        return pa.ipc.open_stream(response.data).read_all()
+
+    url = '/api/statements?email=joelschaubel@gmail.com&limit=300&cursor=20'
+    expected = json.loads(client.get(url).data)
+    response = client.get(url, headers={'Accept': mimetype})
+    assert read_table(response).to_pylist() == expected['Transactions']
+    assert response.headers['X-Next-Cursor'] == expected['NextCursor']
+
+    account_number = data_service.ACCOUNTS[0]['AccountNumber']
+    body = {'LoginId': 'login-1', 'AccountNumber': account_number}
+    expected = json.loads(client.post(f'/v3/{uuid4()}/BankingServices/GetStatements', json=body).data)
+    table = read_table(client.post(f'/v3/{uuid4()}/BankingServices/GetStatements', json=body, headers={'Accept': mimetype}))
+    assert table.to_pylist() == expected['Statements'][0]['Transactions']
+    assert table.schema.metadata[b'AccountId'] == data_service.ACCOUNTS[0]['Id'].encode()
+    assert table.schema.metadata[b'LoginId'] == b'login-1'
+
+def test_get_statements_from_date(client):
+    """Test that FromDate returns only the transactions of that day or later, in every format."""
+    import pyarrow as pa
+
+    url = f'/v3/{uuid4()}/BankingServices/GetStatements'
+    body = {'LoginId': 'login-1', 'AccountNumber': data_service.ACCOUNTS[0]['AccountNumber']}
+    dates = sorted({t['Date'] for t in client.post(url, json=body).get_json()['Statements'][0]['Transactions']})
+    from_date = dates[len(dates) // 2]
+
+    transactions = client.post(url, json={**body, 'FromDate': from_date}).get_json()['Statements'][0]['Transactions']
+    assert transactions and all(t['Date'] >= from_date for t in transactions)
+    assert {t['Date'] for t in transactions} == {d for d in dates if d >= from_date}
+    arrow = client.post(url, json={**body, 'FromDate': from_date}, headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    assert pa.ipc.open_stream(arrow.data).read_all().to_pylist() == transactions
+
+    assert client.post(url, json={**body, 'FromDate': '2024-13-01'}).status_code == 400
+
+def test_get_statements_bulk(client):
+    """Test that the bulk endpoint returns every account's statement as GetStatements does, skipping unchanged ones."""
+    import pyarrow as pa
+
+    url = f'/v3/{uuid4()}/BankingServices'
+    numbers = [account['AccountNumber'] for account in data_service.ACCOUNTS]
+    bulk = client.post(f'{url}/GetStatementsBulk', json={'LoginId': 'login-1'}).get_json()
+    assert [statement['AccountNumber'] for statement in bulk['Statements']] == numbers
+    for number, statement in zip(numbers, bulk['Statements']):
+        single = client.post(f'{url}/GetStatements', json={'LoginId': 'login-1', 'AccountNumber': number})
+        assert statement['Transactions'] == single.get_json()['Statements'][0]['Transactions']
+        assert statement['ETag'] == single.headers['ETag']
+
+    body = {'LoginId': 'login-1', 'AccountNumbers': numbers, 'ETags': {numbers[0]: bulk['Statements'][0]['ETag']}}
+    assert client.post(f'{url}/GetStatementsBulk', json=body).get_json()['NotModified'] == [numbers[0]]
+
+    arrow = client.post(f'{url}/GetStatementsBulk', json={'LoginId': 'login-1', 'FromDates': {numbers[1]: '2024-02-01'}},
+                        headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    table = pa.ipc.open_stream(arrow.data).read_all()
+    second = table.filter(pa.compute.equal(table.column('AccountNumber'), numbers[1]))
+    assert table.num_rows == len(bulk['Statements'][0]['Transactions']) + second.num_rows
+    assert 0 < second.num_rows < len(bulk['Statements'][1]['Transactions'])
+    assert set(json.loads(table.schema.metadata[b'ETags'])) == set(numbers)
+
+    assert client.post(f'{url}/GetStatementsBulk', json={'LoginId': 'x', 'AccountNumbers': ['missing']}).status_code == 404
+    assert client.post(f'{url}/GetStatementsBulk', json={'LoginId': 'x', 'AccountNumbers': 'all'}).status_code == 400
+
+def test_statement_endpoints_revalidate_with_etag(client):
+    """Test that both statement endpoints send an ETag per format and answer a matching If-None-Match with a 304."""
+    url = f'/v3/{uuid4()}/BankingServices/GetStatements'
+    body = {'LoginId': 'login-1', 'AccountNumber': data_service.ACCOUNTS[0]['AccountNumber']}
+    response = client.post(url, json=body)
+    etag = response.headers['ETag']
+    assert etag.startswith('"')
+
+    not_modified = client.post(url, json=body, headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+    assert not_modified.headers['ETag'] == etag
+    arrow = client.post(url, json=body, headers={'If-None-Match': etag, 'Accept': 'application/vnd.apache.arrow.stream'})
+    assert arrow.status_code == 200 and arrow.headers['ETag'] != etag
+    assert client.post(url, json=body, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+    url = '/api/statements?email=joelschaubel@gmail.com'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': f'"stale", {etag}'}).status_code == 304
+    assert client.get(f'{url}&limit=10', headers={'If-None-Match': etag}).status_code == 200
+
+@pytest.fixture
+def fault_profiles(monkeypatch):
+    """Replaces the fault profiles with ones that always inject their fault."""
+    from api_mock.services import fault_service
+    monkeypatch.setattr(fault_service, 'PROFILES', {'default_profile': 'none', 'profiles': {
+        'none': {},
+        'throttled': {'authorize': {'rate_limit': {'requests_per_second': 0.5, 'burst': 1}}},
+        'failing': {'*': {'error_rate': 1, 'error_statuses': [503]}},
+        'truncated': {'get_accounts_detail': {'truncate_rate': 1},
+                      'get_combined_statements_by_email': {'truncate_rate': 1}},
+    }})
+    fault_service.reset_rate_limits()
+    yield
+    fault_service.reset_rate_limits()
+
+def test_fault_profile_rate_limits_with_retry_after(client, fault_profiles):
+    headers = {'X-Mock-Profile': 'throttled'}
+    assert client.post(f'/v3/{uuid4()}/BankingServices/Authorize', headers=headers).status_code == 200
+    response = client.post(f'/v3/{uuid4()}/BankingServices/Authorize', headers=headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert response.headers['X-Mock-Fault'] == 'rate_limit'
+    # Other profiles and endpoints are not throttled.
+    assert client.post(f'/v3/{uuid4()}/BankingServices/Authorize').status_code == 200
+
+def test_fault_profile_injects_server_errors(client, fault_profiles, monkeypatch):
+    monkeypatch.setenv('API_MOCK_FAULT_PROFILE', 'failing')
+    response = client.post(f'/v3/{uuid4()}/BankingServices/Authorize')
+    assert response.status_code == 503
+    assert response.headers['X-Mock-Fault'] == 'error'
+    # The request header takes precedence over the server-wide profile.
+    assert client.post(f'/v3/{uuid4()}/BankingServices/Authorize', headers={'X-Mock-Profile': 'none'}).status_code == 200
+
+def test_fault_profile_truncates_responses(client, fault_profiles):
+    full = client.post(f'/v3/{uuid4()}/BankingServices/GetAccountsDetail', json={'LoginId': 'x'})
+    response = client.post(f'/v3/{uuid4()}/BankingServices/GetAccountsDetail', json={'LoginId': 'x'},
+                           headers={'X-Mock-Profile': 'truncated'})
+    assert response.status_code == 200
+    assert response.headers['X-Mock-Fault'] == 'truncated'
+    assert response.headers['Connection'] == 'close'
+    assert len(response.data) < int(response.headers['Content-Length']) == len(full.data)
+
+def test_fault_profile_truncates_streamed_responses(client, fault_profiles, monkeypatch):
+    """Test that a streamed response is cut short as it is sent, after a share of STREAM_TRUNCATE_BYTES."""
+    from api_mock.services import fault_service
+    monkeypatch.setattr(fault_service, 'STREAM_TRUNCATE_BYTES', 1000)
+    url = '/api/statements?email=joelschaubel@gmail.com'
+    headers = {'Accept': 'application/x-ndjson'}
+    full = client.get(url, headers=headers).data
+
+    response = client.get(url, headers={**headers, 'X-Mock-Profile': 'truncated'}, buffered=False)
+    assert response.is_streamed
+    assert response.headers['X-Mock-Fault'] == 'truncated'
+    body = response.get_data()
+    assert len(body) < 1000 < len(full)
+    assert full.startswith(body)
+
+def test_fault_profile_unknown(client, fault_profiles):
+    response = client.post(f'/v3/{uuid4()}/BankingServices/Authorize', headers={'X-Mock-Profile': 'missing'})
+    assert response.status_code == 400
+    assert 'missing' in response.get_json()['error']
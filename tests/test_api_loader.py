@@ -0,0 +1,86 @@
+import hashlib
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import api_loader
+from app.upload_loader import STATEMENT_SCHEMA
+
+def _ipc_payload(table) -> bytes:
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+class _FakeSession:
+    """Serves one prepared (mimetype, body, next cursor) page per request, keyed by cursor."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, params, headers, stream):
+        self.requests.append(params)
+        mimetype, body, next_cursor = self.pages[params.get('cursor')]
+        return SimpleNamespace(
+            headers={'Content-Type': mimetype, **({'X-Next-Cursor': next_cursor} if next_cursor else {})},
+            raw=io.BytesIO(body),
+            raise_for_status=lambda: None,
+        )
+
+def test_spool_statement_pages_follows_the_cursor_and_hashes_before_parsing(tmp_path):
+    """Test that every page is spooled as sent, and that the fingerprint covers all of them."""
+    import pyarrow as pa
+    first = _ipc_payload(pa.table({'Email': ['a@b.com'], 'Request ID': ['r1']}))
+    second = _ipc_payload(pa.table({'Email': ['a@b.com'], 'Request ID': ['r2']}))
+    session = _FakeSession({
+        None: (api_loader.ARROW_STREAM_MIMETYPE, first, '1'),
+        '1': (api_loader.ARROW_STREAM_MIMETYPE, second, None),
+    })
+
+    pages, fingerprint = api_loader.spool_statement_pages(session, 'http://api', 'a@b.com', str(tmp_path), page_size=1)
+    assert [params.get('cursor') for params in session.requests] == [None, '1']
+    assert all(params['limit'] == 1 for params in session.requests)
+    assert fingerprint == hashlib.sha256(first + second).hexdigest()
+    assert [open(path, 'rb').read() for path, _ in pages] == [first, second]
+
+    batches = api_loader.StatementBatches(pages)
+    table = batches.reader().read_all()
+    assert table.schema == STATEMENT_SCHEMA
+    assert table.column('Request ID').to_pylist() == ['r1', 'r2']
+    assert table.column('Username').null_count == 2
+    assert (batches.num_rows, batches.request_ids) == (2, {'r1', 'r2'})
+
+def test_statement_batches_parse_ndjson_block_by_block(tmp_path):
+    """Test that an NDJSON page is parsed into batches of whole lines, in the statement schema."""
+    path = tmp_path / 'page'
+    lines = [json.dumps({'Email': 'a@b.com', 'Request ID': f'r{i}', 'Deposits': str(i), 'Extra': 1}) for i in range(7)]
+    path.write_bytes(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    batches = api_loader.StatementBatches([(str(path), api_loader.NDJSON_MIMETYPE)], batch_size=3)
+    parsed = list(batches.reader())
+    assert all(batch.schema == STATEMENT_SCHEMA for batch in parsed)
+    assert sum(batch.num_rows for batch in parsed) == 7
+    assert [batch.num_rows for batch in parsed] == [3, 3, 1]
+    assert batches.num_rows == 7
+
+def test_statement_batches_fall_back_to_json(tmp_path):
+    """Test that JSON pages, as an array or a page object, are read into the statement schema."""
+    transactions = [{'Date': '2024-01-02', 'Email': 'a@b.com', 'Deposits': 10.5}]
+    array_page, object_page = tmp_path / 'array', tmp_path / 'object'
+    array_page.write_text(json.dumps(transactions))
+    object_page.write_text(json.dumps({'Transactions': transactions, 'NextCursor': None}))
+
+    batches = api_loader.StatementBatches([(str(array_page), api_loader.JSON_MIMETYPE),
+                                           (str(object_page), api_loader.JSON_MIMETYPE)])
+    table = batches.reader().read_all()
+    assert table.schema == STATEMENT_SCHEMA
+    assert table.column('Deposits').to_pylist() == ['10.5', '10.5']
+
+    mimetype = api_loader.statement_mimetype(SimpleNamespace(headers={'Content-Type': 'application/json; charset=utf-8'}))
+    assert mimetype == api_loader.JSON_MIMETYPE
+    with pytest.raises(ValueError):
+        api_loader.statement_mimetype(SimpleNamespace(headers={'Content-Type': 'text/html'}))
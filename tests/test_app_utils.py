@@ -1,7 +1,9 @@
 import pytest
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, MagicMock
+import os
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 import logging
 
 # Import functions from the app_utils module
@@ -30,58 +32,21 @@ def test_convert_to_json_serializable():
     assert isinstance(b_val[0], float)
     assert converted_data.get('c') is None
 
-# --- Tests for _call_taktile_api ---
-
-@patch('app.app_utils.requests')
-@patch.dict('os.environ', {'TAKTILE_DEMO_API_KEY': 'test-key'})
-def test_call_taktile_api_sync_success(mock_requests):
-    """Test a successful synchronous (200) API call to Taktile."""
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {"decision": "approved"}
-    mock_requests.post.return_value = mock_response
-
-    response = app_utils._call_taktile_api({}, logging.getLogger())
-    assert response == {"decision": "approved"}
-
-@patch('app.app_utils.requests')
-@patch('app.app_utils.time.sleep', return_value=None)
-@patch.dict('os.environ', {'TAKTILE_DEMO_API_KEY': 'test-key'})
-def test_call_taktile_api_async_success(mock_sleep, mock_requests):
-    """Test a successful asynchronous (202) API call with polling."""
-    # First response is 202, second is 200
-    async_response = MagicMock()
-    async_response.status_code = 202
-    async_response.json.return_value = {"metadata": {"decision_id": "123"}}
-    
-    sync_response = MagicMock()
-    sync_response.status_code = 200
-    sync_response.json.return_value = {"decision": "approved_async"}
-
-    mock_requests.post.return_value = async_response
-    mock_requests.get.return_value = sync_response
-
-    response = app_utils._call_taktile_api({}, logging.getLogger())
-    assert response == {"decision": "approved_async"}
-    assert mock_requests.post.call_count == 1
-    assert mock_requests.get.call_count == 1
-
-def test_call_taktile_api_no_key():
-    """Test that an EnvironmentError is raised if the API key is not set."""
-    with patch.dict('os.environ', {}, clear=True):
-        with pytest.raises(EnvironmentError):
-            app_utils._call_taktile_api({}, logging.getLogger())
-
 # --- Tests for run_analysis_pipeline ---
 
-@patch('app.app_utils.write_deltalake')
-@patch('app.app_utils.subprocess.run')
-@patch('app.app_utils.duckdb.connect')
+@patch('app.app_utils.run_metrics.record_run_metrics')
+@patch('app.app_utils.run_namespace.cleanup_run')
+@patch('app.app_utils.run_namespace.publish_docs')
+@patch('app.app_utils.run_namespace.publish_run')
+@patch('app.app_utils.run_namespace.new_run_id', return_value='run1')
+@patch('deltalake.write_deltalake')
+@patch('app.app_utils.orchestrator.run_pipeline')
+@patch('duckdb.connect')
 @patch('app.app_utils.st')
-def test_run_analysis_pipeline_success(mock_st, mock_duckdb, mock_subprocess, mock_write_deltalake):
+def test_run_analysis_pipeline_success(mock_st, mock_duckdb, mock_run_pipeline, mock_write_deltalake, mock_new_run_id, mock_publish_run, mock_publish_docs, mock_cleanup_run, mock_record_metrics):
     """Test the successful execution of the analysis pipeline orchestrator."""
     # Setup mocks
-    mock_subprocess.return_value = MagicMock(stdout="", stderr="", returncode=0)
+    mock_run_pipeline.return_value = [{'stage': 'transform', 'action': 'run', 'reason': 'never run'}]
     mock_st.session_state = {} # Use a real dict for session_state
     
     mock_conn = MagicMock()
@@ -97,20 +62,29 @@ def test_run_analysis_pipeline_success(mock_st, mock_duckdb, mock_subprocess, mo
 
     # Assertions
     mock_write_deltalake.assert_called_once()
+    bronze_path = mock_write_deltalake.call_args[0][0]
+    assert bronze_path.endswith(os.path.join('data_lake', 'runs', 'run1', 'bronze'))
     
-    # Check that subprocess.run was called correctly
-    expected_calls = [
-        call(["python", "-m", "pipelines.transform_statements", "--write-mode", "overwrite"], check=True, capture_output=True, text=True),
-        call(["dbt", "run", "--full-refresh"], cwd="analytics", check=True, capture_output=True, text=True),
-        call(["dbt", "docs", "generate"], cwd="analytics", check=True, capture_output=True, text=True)
-    ]
-    mock_subprocess.assert_has_calls(expected_calls, any_order=False)
+    # Check that the transform and dbt stages were run in the run namespace
+    # with no orchestrator state, since the namespace is new every run
+    stages, state_path = mock_run_pipeline.call_args[0]
+    assert [stage['name'] for stage in stages] == ['transform', 'dbt_run', 'dbt_docs']
+    assert state_path is None
+
+    # The run is published to the shared tables and its namespace removed
+    mock_publish_run.assert_called_once_with('run1', app_utils.DATA_LAKE_ROOT)
+    mock_publish_docs.assert_called_once_with('run1', app_utils.DATA_LAKE_ROOT)
+    mock_cleanup_run.assert_called_once_with('run1', app_utils.DATA_LAKE_ROOT)
+
+    # Every stage is timed and recorded to the run-metrics table
+    metrics = mock_record_metrics.call_args[0][0]
+    assert metrics.run_id == 'run1'
+    assert mock_run_pipeline.call_args.kwargs['metrics'] is metrics
+    assert [s['name'] for s in metrics.spans if s['kind'] == 'stage'] == ['bronze_write', 'publish', 'duckdb_read']
+    assert all(s['status'] == 'success' for s in metrics.spans)
     
-    # Check that streamlit components were called to display results
+    # Check that streamlit reported success; results are rendered by results_view
     assert mock_st.success.called
-    assert mock_st.subheader.called
-    assert mock_st.dataframe.called
-    assert mock_st.line_chart.called
     
     # Check that results were stored in session state
     assert "credit_metrics_df" in mock_st.session_state
@@ -130,7 +104,7 @@ def test_display_reset_button():
     mock_st = MagicMock()
     mock_st.session_state = {
         "credit_metrics_df": pd.DataFrame(),
-        "taktile_decision_resp": {}
+        "taktile_decision_resps": [{}]
     }
     # Simulate the button being clicked
     mock_st.button.return_value = True
@@ -138,28 +112,77 @@ def test_display_reset_button():
     app_utils.display_reset_button(mock_st, logging.getLogger())
 
     assert "credit_metrics_df" not in mock_st.session_state
-    assert "taktile_decision_resp" not in mock_st.session_state
+    assert "taktile_decision_resps" not in mock_st.session_state
     assert mock_st.rerun.called
 
-@patch('app.app_utils._call_taktile_api')
-def test_display_taktile_interface_sends_payload(mock_call_taktile_api):
-    """Test that the Taktile interface correctly builds and sends a payload."""
+@patch('app.app_utils.taktile_client.get_client')
+def test_display_taktile_interface_sends_payload(mock_get_client):
+    """Test that the Taktile interface builds and sends a payload for every row."""
     mock_st = MagicMock()
     mock_st.session_state = {
-        "credit_metrics_df": pd.DataFrame([{
-            "request_id": "req123", "email": "test@test.com", "revenue_total": 5000
-        }])
+        "credit_metrics_df": pd.DataFrame([
+            {"request_id": "req123", "email": "test@test.com", "revenue_total": np.int64(5000)},
+            {"request_id": "req456", "email": "other@test.com", "revenue_total": np.int64(7000)},
+        ])
     }
+    mock_get_client.return_value.decide_many.return_value = [{"data": {}}, {"data": {}}]
+    mock_st.selectbox.return_value = 0
     # Simulate the "Send to Taktile" button being clicked
     mock_st.button.return_value = True
     
     app_utils.display_taktile_interface(mock_st, logging.getLogger(), key_prefix="test")
 
-    mock_call_taktile_api.assert_called_once()
-    # Check some key fields in the payload that was sent
-    call_args, _ = mock_call_taktile_api.call_args
-    payload = call_args[0]
-    assert payload['metadata']['entity_id'] == 'req123'
-    assert payload['data']['revenue_total'] == 5000
-    assert payload['data']['email'] == 'test@test.com'
-    assert mock_st.rerun.called 
+    mock_get_client.return_value.decide_many.assert_called_once()
+    # Check some key fields in the payloads that were sent
+    payloads = mock_get_client.return_value.decide_many.call_args[0][0]
+    assert [p['metadata']['entity_id'] for p in payloads] == ['req123', 'req456']
+    assert payloads[0]['data']['revenue_total'] == 5000
+    assert isinstance(payloads[0]['data']['revenue_total'], int)
+    assert payloads[1]['data']['email'] == 'other@test.com'
+    assert len(mock_st.session_state["taktile_decision_resps"]) == 2
+    assert mock_st.rerun.called
+
+@patch('app.app_utils.taktile_client.get_client')
+def test_display_taktile_interface_all_decisions_fail(mock_get_client):
+    """Test that an error is shown and nothing persisted when every decision fails."""
+    mock_st = MagicMock()
+    mock_st.session_state = {"credit_metrics_df": pd.DataFrame([{"request_id": "req123", "email": "test@test.com"}])}
+    mock_get_client.return_value.decide_many.return_value = [RuntimeError("boom")]
+    mock_st.button.return_value = True
+
+    app_utils.display_taktile_interface(mock_st, logging.getLogger(), key_prefix="test")
+
+    assert mock_st.error.called
+    assert "taktile_decision_resps" not in mock_st.session_state
+
+def test_describe_source_arrow_table():
+    """Test that Arrow tables from the upload loader are summarized without conversion."""
+    table = pa.table({'Email': ['a@b.com', 'a@b.com'], 'Date': ['2024-01-01', '2024-01-02']})
+    num_rows, columns, _ = app_utils._describe_source(table)
+    assert num_rows == 2
+    assert columns == ['Email', 'Date']
+    assert app_utils._first_email(table) == 'a@b.com'
+    assert app_utils._first_email(pa.table({'Date': ['2024-01-01']})) == 'Unknown Email'
+
+@patch('app.app_utils.run_metrics.record_run_metrics')
+@patch('app.app_utils.fingerprints.record_fingerprints')
+@patch('app.app_utils.run_namespace')
+@patch('deltalake.write_deltalake')
+@patch('app.app_utils.orchestrator.run_pipeline', return_value=[])
+@patch('duckdb.connect')
+@patch('app.app_utils.st')
+def test_run_analysis_pipeline_reuses_known_statements(mock_st, mock_duckdb, mock_run_pipeline, mock_write_deltalake, mock_run_namespace, mock_record, mock_record_metrics):
+    """Test that fully known statements skip the bronze write and transform, but still run dbt."""
+    mock_st.session_state = {}
+    mock_run_namespace.new_run_id.return_value = 'run1'
+    mock_run_namespace.lake_paths.return_value = {'bronze': 'b', 'dbt_db': 'db', 'dbt_target': 't', 'orchestrator_state': 's'}
+    mock_conn = MagicMock()
+    mock_duckdb.return_value.__enter__.return_value = mock_conn
+    mock_conn.table.return_value.to_df.return_value = pd.DataFrame()
+
+    app_utils.run_analysis_pipeline(None, reused_request_ids=['r1'])
+
+    mock_write_deltalake.assert_not_called()
+    stages = mock_run_pipeline.call_args[0][0]
+    assert [stage['name'] for stage in stages] == ['transform', 'seed_reused', 'dbt_run', 'dbt_docs']
+    mock_run_namespace.publish_run.assert_called_once()
@@ -0,0 +1,150 @@
+import asyncio
+import io
+import json
+import zipfile
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+import pyarrow as pa
+import pytest
+
+from api_mock import create_app
+from api_mock.asgi import create_asgi_app
+from api_mock.services import fault_service
+
+ACCOUNT_NUMBER = '010-30800-0095971396'
+EMAIL = 'joelschaubel@gmail.com'
+
+
+def call(app, method: str, url: str, body: bytes = b'', headers: dict | None = None) -> dict:
+    """Sends one HTTP request to an ASGI app and returns its status, headers, body and whether it completed."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': parts.path, 'raw_path': parts.path.encode(), 'query_string': parts.query.encode(), 'root_path': '',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        'server': ('testserver', 80), 'client': ('testclient', 50000),
+    }
+    messages, requests = [], [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # Streaming responses listen for the client going away until they finish.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    bodies = [message for message in messages[1:] if message['type'] == 'http.response.body']
+    return {
+        'status': start['status'],
+        'headers': {name.decode(): value.decode() for name, value in start['headers']},
+        'body': b''.join(message.get('body', b'') for message in bodies),
+        'complete': not bodies[-1].get('more_body', False),
+    }
+
+
+def post_json(app, url: str, payload: dict, headers: dict | None = None) -> dict:
+    return call(app, 'POST', url, json.dumps(payload).encode(), {'Content-Type': 'application/json', **(headers or {})})
+
+
+@pytest.fixture
+def app():
+    return create_asgi_app()
+
+
+@pytest.fixture
+def flask_client():
+    return create_app().test_client()
+
+
+def test_asgi_flinks_endpoints_match_flask(app, flask_client):
+    customer_id = uuid4()
+    authorize = json.loads(call(app, 'POST', f'/v3/{customer_id}/BankingServices/Authorize')['body'])
+    assert authorize['StatusCode'] == 200 and authorize['LoginId']
+
+    accounts = post_json(app, f'/v3/{customer_id}/BankingServices/GetAccountsDetail', {'LoginId': 'x'})
+    assert json.loads(accounts['body'])['Accounts'] == flask_client.post(
+        f'/v3/{customer_id}/BankingServices/GetAccountsDetail', json={'LoginId': 'x'}).get_json()['Accounts']
+
+    statements = post_json(app, f'/v3/{customer_id}/BankingServices/GetStatements',
+                           {'LoginId': 'x', 'AccountNumber': ACCOUNT_NUMBER})
+    flask_statements = flask_client.post(f'/v3/{customer_id}/BankingServices/GetStatements',
+                                         json={'LoginId': 'x', 'AccountNumber': ACCOUNT_NUMBER}).get_json()
+    assert json.loads(statements['body'])['Statements'][0]['Transactions'] == flask_statements['Statements'][0]['Transactions']
+
+    arrow = post_json(app, f'/v3/{customer_id}/BankingServices/GetStatements',
+                      {'LoginId': 'x', 'AccountNumber': ACCOUNT_NUMBER},
+                      headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    table = pa.ipc.open_stream(pa.py_buffer(arrow['body'])).read_all()
+    assert table.num_rows == len(flask_statements['Statements'][0]['Transactions'])
+    assert table.schema.metadata[b'LoginId'] == b'x'
+
+
+def test_asgi_validation_errors(app):
+    customer_id = uuid4()
+    response = post_json(app, f'/v3/{customer_id}/BankingServices/GetStatements', {'LoginId': 'x'})
+    assert response['status'] == 400
+    assert json.loads(response['body'])['error'] == 'AccountNumber is required'
+    assert call(app, 'POST', f'/v3/{customer_id}/BankingServices/GetAccountsDetail', b'not json')['status'] == 400
+    assert post_json(app, f'/v3/{customer_id}/BankingServices/GetStatements',
+                     {'LoginId': 'x', 'AccountNumber': 'missing'})['status'] == 404
+    assert call(app, 'GET', '/api/statements?email=missing@example.com')['status'] == 404
+    assert call(app, 'GET', f'/api/statements?email={EMAIL}&limit=0')['status'] == 400
+
+
+def test_asgi_combined_statements_match_flask(app, flask_client):
+    expected = flask_client.get('/api/statements', query_string={'email': EMAIL}).get_json()
+    assert json.loads(call(app, 'GET', f'/api/statements?email={EMAIL}')['body']) == expected
+
+    page = call(app, 'GET', f'/api/statements?email={EMAIL}&limit=10', headers={'Accept': 'application/x-ndjson'})
+    assert [json.loads(line) for line in page['body'].splitlines()] == expected[:10]
+    assert page['headers']['x-next-cursor']
+
+
+def test_asgi_statements_revalidate_with_etag(app, flask_client):
+    url = f'/v3/{uuid4()}/BankingServices/GetStatements'
+    body = {'LoginId': 'x', 'AccountNumber': ACCOUNT_NUMBER}
+    etag = post_json(app, url, body)['headers']['etag']
+    assert etag == flask_client.post(url, json=body).headers['ETag']
+
+    not_modified = post_json(app, url, body, headers={'If-None-Match': etag})
+    assert not_modified['status'] == 304 and not_modified['body'] == b''
+    etag = call(app, 'GET', f'/api/statements?email={EMAIL}')['headers']['etag']
+    assert call(app, 'GET', f'/api/statements?email={EMAIL}', headers={'If-None-Match': etag})['status'] == 304
+
+
+def test_asgi_bulk_statements_match_flask(app, flask_client):
+    url = f'/v3/{uuid4()}/BankingServices/GetStatementsBulk'
+    arrow = post_json(app, url, {'LoginId': 'x'}, headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    expected = flask_client.post(url, json={'LoginId': 'x'}, headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    assert pa.ipc.open_stream(arrow['body']).read_all().equals(pa.ipc.open_stream(expected.data).read_all())
+
+
+def test_asgi_downloads(app):
+    form = {'Content-Type': 'application/x-www-form-urlencoded'}
+    download = json.loads(call(app, 'POST', '/download', f'email={EMAIL}'.encode(), form)['body'])
+    assert [s['AccountNumber'] for s in download['Statements']] == [ACCOUNT_NUMBER, '010-30800-0095983938']
+
+    archive = call(app, 'POST', '/download/zip', f'email={EMAIL}'.encode(), form)
+    assert archive['headers']['content-type'] == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(archive['body'])) as zf:
+        assert zf.namelist() == [f'statement_{ACCOUNT_NUMBER}.csv', 'statement_010-30800-0095983938.csv']
+    assert call(app, 'GET', '/download/zip')['status'] == 400
+
+
+def test_asgi_fault_profiles(app, monkeypatch):
+    monkeypatch.setattr(fault_service, 'PROFILES', {'profiles': {
+        'failing': {'authorize': {'error_rate': 1, 'error_statuses': [502]}},
+        'truncated': {'get_combined_statements_by_email': {'truncate_rate': 1}},
+    }})
+    response = call(app, 'POST', f'/v3/{uuid4()}/BankingServices/Authorize', headers={'X-Mock-Profile': 'failing'})
+    assert response['status'] == 502
+
+    response = call(app, 'GET', f'/api/statements?email={EMAIL}', headers={'X-Mock-Profile': 'truncated'})
+    assert not response['complete']
+    assert len(response['body']) < int(response['headers']['content-length'])
+    assert response['headers']['x-mock-fault'] == 'truncated'
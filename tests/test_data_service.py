@@ -1,5 +1,6 @@
+import os
+import json
 import pytest
-from unittest.mock import mock_open, patch
 from api_mock.services import data_service
 
 @pytest.fixture
@@ -9,12 +10,16 @@ def mock_csv_data():
            "2023-01-15,Payment,100.00,,4900.00\n" \
            "2023-01-10,Deposit,,200.00,5000.00\n"
 
-def test_load_transactions_success(monkeypatch, mock_csv_data):
-    """Test successful loading and parsing of transactions."""
-    mock_file = mock_open(read_data=mock_csv_data)
-    monkeypatch.setattr("builtins.open", mock_file)
-    monkeypatch.setattr("os.path.exists", lambda _: True)
+@pytest.fixture
+def statement_file(tmp_path, monkeypatch, mock_csv_data):
+    """Serves the mock CSV data as the statement file of account 001_statement_a."""
+    (tmp_path / "statement.csv").write_text(mock_csv_data)
+    monkeypatch.setattr(data_service, "DATA_DIR", str(tmp_path))
+    monkeypatch.setitem(data_service.STATEMENTS_MAPPING, '001_statement_a', "statement.csv")
+    return tmp_path / "statement.csv"
 
+def test_load_transactions_success(statement_file):
+    """Test successful loading and parsing of transactions."""
     transactions = data_service.load_transactions('001_statement_a')
 
     assert len(transactions) == 2
@@ -25,6 +30,48 @@ def test_load_transactions_success(monkeypatch, mock_csv_data):
     assert transactions[1]['Amount'] == 200.0
     assert transactions[1]['Type'] == 'credit'
 
+def test_load_transactions_amount_precedence(statement_file):
+    """Test that amounts come from the first non-empty amount column, without thousands separators."""
+    statement_file.write_text(
+        "Date,Description,Withdrawals,Deposits,Balance\n"
+        "2023-01-15,Payroll,,\"1,200.50\",4900.00\n"
+        "2023-01-16,Both,10.00,20.00,4900.00\n"
+        "2023-01-17,Neither,,,4900.00\n"
+    )
+    transactions = data_service.load_transactions('001_statement_a')
+    assert [t['Amount'] for t in transactions] == [1200.5, 20.0, 0.0]
+    assert [t['Type'] for t in transactions] == ['credit', 'credit', 'debit']
+    assert transactions[0]['Deposits'] == "1,200.50"
+
+def test_statement_is_parsed_once_until_the_file_changes(statement_file, monkeypatch):
+    """Test that a statement file is reused across requests and parsed again when it changes on disk."""
+    parses = []
+    parse = data_service._parse_statement_file
+    monkeypatch.setattr(data_service, "_parse_statement_file", lambda path: parses.append(path) or parse(path))
+
+    assert len(data_service.load_transactions('001_statement_a')) == 2
+    assert len(data_service.load_raw_transactions('001_statement_a')[0]) == 2
+    assert len(parses) == 1
+
+    with open(statement_file, 'a') as f:
+        f.write("2023-01-05,Deposit,,50.00,4800.00\n")
+    mtime = os.stat(statement_file).st_mtime_ns + 1_000_000_000
+    os.utime(statement_file, ns=(mtime, mtime))
+    assert len(data_service.load_transactions('001_statement_a')) == 3
+    assert len(parses) == 2
+
+def test_statement_etag_follows_file_content(statement_file):
+    """Test that the statement ETag changes with the file's content and the response variant only."""
+    etag = data_service.statement_etag(['001_statement_a'], 'application/json')
+    assert etag == data_service.statement_etag(['001_statement_a'], 'application/json')
+    assert etag != data_service.statement_etag(['001_statement_a'], 'application/vnd.apache.arrow.stream')
+    assert data_service.statement_etag(['missing'], 'application/json') is None
+
+    statement_file.write_text(statement_file.read_text().replace('Payment', 'Paymemt'))
+    mtime = os.stat(statement_file).st_mtime_ns + 1_000_000_000
+    os.utime(statement_file, ns=(mtime, mtime))
+    assert data_service.statement_etag(['001_statement_a'], 'application/json') != etag
+
 def test_load_transactions_invalid_account():
     """Test that loading transactions for an invalid account returns an empty list."""
     transactions = data_service.load_transactions('invalid_id')
@@ -76,3 +123,60 @@ def test_load_raw_transactions(monkeypatch):
     transactions, headers = data_service.load_raw_transactions('non_existent_id')
     assert transactions == []
     assert headers == []
+
+def test_get_account_ids_by_email_is_normalized():
+    """Test that email lookups ignore case and surrounding whitespace."""
+    assert data_service.get_account_ids_by_email("  JoelSchaubel@Gmail.com ") == ["001_statement_a", "002_statement_b"]
+
+def test_get_account():
+    """Test retrieving an account by its internal ID."""
+    assert data_service.get_account('001_statement_a') == data_service.ACCOUNTS[0]
+    assert data_service.get_account('non_existent_id') is None
+
+def test_accounts_are_reloaded_when_config_changes(tmp_path, monkeypatch):
+    """Test that the account indexes are rebuilt when config.json changes on disk, and kept when it is invalid."""
+    config_path = tmp_path / "config.json"
+    monkeypatch.setattr(data_service, "CONFIG_PATH", str(config_path))
+
+    def write_config(content: str, mtime_s: int):
+        config_path.write_text(content)
+        os.utime(config_path, ns=(mtime_s * 1_000_000_000, mtime_s * 1_000_000_000))
+
+    account = {'Id': 'new_account', 'AccountNumber': '123', 'Holder': {'Email': 'new@example.com'}, 'statementFile': 'new.csv'}
+    write_config(json.dumps({'accounts': [account]}), 1)
+    assert data_service.get_account_id_by_number('123') == 'new_account'
+    assert data_service.get_account_ids_by_email('new@example.com') == ['new_account']
+    assert data_service.get_account_ids_by_email('joelschaubel@gmail.com') == []
+    assert data_service.is_valid_account('new_account') is True
+
+    write_config("{not json", 2)
+    assert data_service.get_account_id_by_number('123') == 'new_account'
+
+    write_config(json.dumps({'accounts': []}), 3)
+    assert data_service.get_account_id_by_number('123') is None
+    assert data_service.get_accounts() == []
+
+    # Reload the repository config, so that later tests see its accounts again.
+    monkeypatch.undo()
+    assert len(data_service.get_accounts()) == 2
+
+def test_resumed_combined_page_reads_only_later_accounts(statement_file, monkeypatch):
+    """Test that resuming the combined transactions skips earlier accounts, and still drops their duplicates."""
+    (statement_file.parent / "other.csv").write_text(
+        "Date,Description,Withdrawals,Deposits,Balance\n"
+        "2023-01-10,Deposit,,200.00,5000.00\n"
+        "2023-02-01,Rent,900.00,,4100.00\n"
+    )
+    monkeypatch.setitem(data_service.STATEMENTS_MAPPING, '002_statement_b', "other.csv")
+    account_ids = ['001_statement_a', '002_statement_b']
+    transactions = list(data_service.iter_combined_transactions(account_ids))
+    assert [(position, row['Description']) for position, row in transactions] == [(0, 'Payment'), (1, 'Deposit'), (3, 'Rent')]
+
+    reads = []
+    load_raw_transactions = data_service.load_raw_transactions
+    monkeypatch.setattr(data_service, "load_raw_transactions",
+                        lambda account_id: reads.append(account_id) or load_raw_transactions(account_id))
+    assert list(data_service.iter_combined_transactions(account_ids, start=2)) == transactions[2:]
+    assert reads == ['002_statement_b']
+    table, next_cursor = data_service.combined_transactions_table(account_ids, start=1, limit=1)
+    assert (table.column('Description').to_pylist(), next_cursor) == (['Deposit'], 2)
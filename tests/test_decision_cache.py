@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import patch
+
+from app.decision_cache import DecisionCache, decision_key
+
+@pytest.fixture
+def cache(tmp_path):
+    return DecisionCache(str(tmp_path / "cache" / "decisions.sqlite"), ttl_seconds=60, max_entries=2)
+
+def test_decision_key_is_canonical():
+    """Test that key order does not change the key, but the payload and flow version do."""
+    assert decision_key({"a": 1, "b": 2}, "v1") == decision_key({"b": 2, "a": 1}, "v1")
+    assert decision_key({"a": 1}, "v1") != decision_key({"a": 2}, "v1")
+    assert decision_key({"a": 1}, "v1") != decision_key({"a": 1}, "v2")
+
+def test_get_put_and_counters(cache):
+    """Test a miss, a store and a hit."""
+    assert cache.get("k") is None
+    cache.put("k", {"data": {"risk_tier": "Low"}})
+    assert cache.get("k") == {"data": {"risk_tier": "Low"}}
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+def test_entries_expire_after_ttl(cache):
+    """Test that entries older than the TTL are treated as misses."""
+    with patch('app.decision_cache.time.time', return_value=1000):
+        cache.put("k", {"x": 1})
+    with patch('app.decision_cache.time.time', return_value=1061):
+        assert cache.get("k") is None
+
+def test_least_recently_used_entries_are_evicted(cache):
+    """Test that the least recently used entry is evicted beyond max_entries."""
+    with patch('app.decision_cache.time.time', side_effect=range(1, 10)):
+        cache.put("a", {"x": 1})
+        cache.put("b", {"x": 2})
+        cache.get("a")
+        cache.put("c", {"x": 3})
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == {"x": 1}
+
+def test_cache_persists_across_instances(tmp_path):
+    """Test that decisions survive a restart of the app."""
+    path = str(tmp_path / "decisions.sqlite")
+    DecisionCache(path).put("k", {"x": 1})
+    assert DecisionCache(path).get("k") == {"x": 1}
@@ -0,0 +1,44 @@
+import random
+import pytest
+from api_mock.services import fault_service
+
+
+def test_endpoint_settings_override_the_wildcard():
+    profile = {'*': {'error_rate': 0.1, 'latency': {'ms': 5}}, 'get_statements': {'error_rate': 0.5}}
+    assert fault_service.endpoint_settings(profile, 'get_statements') == {'error_rate': 0.5, 'latency': {'ms': 5}}
+    assert fault_service.endpoint_settings(profile, 'authorize') == profile['*']
+
+
+@pytest.mark.parametrize('latency, low, high', [
+    ({'distribution': 'fixed', 'ms': 40}, 40, 40),
+    ({'distribution': 'uniform', 'min_ms': 10, 'max_ms': 20}, 10, 20),
+    ({'distribution': 'normal', 'mean_ms': 50, 'stddev_ms': 100}, 0, float('inf')),
+    ({'distribution': 'lognormal', 'median_ms': 100, 'sigma': 2, 'max_ms': 300}, 0, 300),
+    ({'distribution': 'exponential', 'mean_ms': 30, 'max_ms': 90}, 0, 90),
+])
+def test_sample_latency_ms_stays_within_bounds(latency, low, high):
+    rng = random.Random(0)
+    samples = [fault_service.sample_latency_ms(latency, rng) for _ in range(1000)]
+    assert all(low <= sample <= high for sample in samples)
+
+
+def test_sample_latency_ms_rejects_unknown_distribution():
+    with pytest.raises(ValueError):
+        fault_service.sample_latency_ms({'distribution': 'pareto'})
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    now = [0.0]
+    bucket = fault_service.TokenBucket(rate=2, burst=3, clock=lambda: now[0])
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.take() == 0
+    assert bucket.take() > 0
+
+
+def test_plan_faults_unknown_profile(monkeypatch):
+    monkeypatch.setattr(fault_service, 'PROFILES', {'profiles': {'none': {}}})
+    assert fault_service.plan_faults('none', 'get_statements') == {'delay_s': 0.0}
+    with pytest.raises(KeyError):
+        fault_service.plan_faults('missing', 'get_statements')
@@ -1,13 +1,20 @@
+import json
+import io
 import pytest
 from unittest.mock import patch, MagicMock
 import pandas as pd
+import pyarrow as pa
 from deltalake import DeltaTable
 import os
+import sys
+import threading
 import requests
 
 # Import the functions to be tested
-from pipelines.ingest_statements import fetch_data_from_api, main as ingest_main
+from pipelines.ingest_statements import fetch_data_from_api, fetch_statements_batches, fetch_bulk_statements, bronze_schema, load_high_water_marks, main as ingest_main
 from pipelines.transform_statements import main as transform_main
+from pipelines.categorize import CATEGORY_COLUMN, categorize
+from pipelines import run_namespace, fingerprints, run_metrics, orchestrator, profile_dbt
 
 @pytest.fixture
 def mock_api_success_response():
@@ -45,28 +52,174 @@ def test_fetch_data_from_api_failure(mock_post):
     
     assert result is None
 
-@patch('pipelines.ingest_statements.fetch_data_from_api')
-@patch('builtins.open')
-@patch('pipelines.ingest_statements.write_deltalake')
-def test_ingest_main(mock_write_deltalake, mock_open, mock_fetch, mock_api_success_response):
+def _mock_statements_response(transactions, arrow: bool):
+    """Builds a GetStatements response, as an Arrow IPC stream or as JSON."""
+    response = MagicMock()
+    if arrow:
+        table = pa.Table.from_pylist(transactions)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        response.raw = io.BytesIO(sink.getvalue().to_pybytes())
+        response.headers = {'Content-Type': 'application/vnd.apache.arrow.stream'}
+    else:
+        response.json.return_value = {'Statements': [{'Transactions': transactions}]}
+        response.headers = {'Content-Type': 'application/json'}
+    return response
+
+@pytest.mark.parametrize('arrow', [True, False])
+@patch('requests.post')
+def test_fetch_statements_batches(mock_post, arrow, mock_api_success_response):
+    """Test that statements are streamed as Arrow record batches, requesting Arrow IPC and accepting JSON."""
+    transactions = mock_api_success_response['Statements'][0]['Transactions']
+    mock_post.return_value = _mock_statements_response(transactions, arrow)
+
+    reader, _ = fetch_statements_batches("c_id", "l_id", "acc_num")
+
+    assert reader.read_all().to_pylist() == transactions
+    assert mock_post.call_args.kwargs['headers']['Accept'].startswith('application/vnd.apache.arrow.stream')
+    assert mock_post.call_args.kwargs['stream'] is True
+
+@patch('requests.post')
+def test_fetch_statements_batches_revalidates_with_etag(mock_post):
+    """Test that a known ETag makes the request conditional, and a 304 returns no reader."""
+    mock_post.return_value = MagicMock(status_code=304, headers={'ETag': '"abc"'})
+
+    reader, etag = fetch_statements_batches("c_id", "l_id", "acc_num", etag='"abc"')
+
+    assert reader is None and etag == '"abc"'
+    assert mock_post.call_args.kwargs['headers']['If-None-Match'] == '"abc"'
+
+@pytest.fixture
+def ingest_dir(tmp_path, monkeypatch):
+    """Runs the ingestion in a temporary directory with a config of one account."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'config.json').write_text('{"accounts": [{"Id": "acc_1", "AccountNumber": "123"}]}')
+    return tmp_path
+
+def _read_written_bronze(mock_write_bronze):
+    """Makes a mocked write_bronze read its record batch reader, as the Delta writer does, and returns the tables it read."""
+    written = []
+    mock_write_bronze.side_effect = lambda table_path, data, mode: written.append(data.read_all())
+    return written
+
+@patch('pipelines.ingest_statements.fetch_bulk_statements', MagicMock(return_value=None))
+@patch('pipelines.ingest_statements.fetch_statements_batches')
+@patch('pipelines.ingest_statements.write_bronze')
+def test_ingest_main(mock_write_deltalake, mock_fetch, ingest_dir, mock_api_success_response):
     """Test the main ingestion pipeline end-to-end."""
-    # Setup: Mock config.json and the API response
-    mock_fetch.return_value = mock_api_success_response
-    mock_open.return_value.__enter__.return_value.read.return_value = '{"accounts": [{"Id": "acc_1", "AccountNumber": "123"}]}'
-    
+    # Setup: Mock the API response
+    mock_fetch.return_value = (pa.Table.from_pylist(mock_api_success_response['Statements'][0]['Transactions']).to_reader(), '"v1"')
+    written = _read_written_bronze(mock_write_deltalake)
+
     ingest_main()
 
     # Verification
-    # Check that write_deltalake was called with the correct data
+    # Check that write_deltalake was called with the correct data, cast to the bronze schema
     mock_write_deltalake.assert_called_once()
     call_args, call_kwargs = mock_write_deltalake.call_args
     
-    written_df = call_args[1]
-    assert len(written_df) == 2
-    assert 'account_id' in written_df.columns
-    assert written_df['account_id'].iloc[0] == 'acc_1'
-    assert written_df['description'].iloc[0] == 'Payment'
+    written_table, = written
+    assert written_table.schema == bronze_schema()
+    assert written_table.num_rows == 2
+    assert 'account_id' in written_table.column_names
+    assert written_table.column('account_id')[0].as_py() == 'acc_1'
+    assert written_table.column('description')[0].as_py() == 'Payment'
     assert call_kwargs['mode'] == 'append'
+    assert json.loads((ingest_dir / 'data_lake' / 'ingest_etags.json').read_text()) == {'acc_1': '"v1"'}
+
+@patch('pipelines.ingest_statements.fetch_bulk_statements', MagicMock(return_value=None))
+@patch('pipelines.ingest_statements.fetch_statements_batches')
+@patch('pipelines.ingest_statements.write_bronze')
+def test_ingest_main_skips_unchanged_statements(mock_write_deltalake, mock_fetch, ingest_dir):
+    """Test that the cached ETag is sent, and an unchanged statement is not written to bronze again."""
+    (ingest_dir / 'data_lake').mkdir()
+    (ingest_dir / 'data_lake' / 'ingest_etags.json').write_text('{"acc_1": "\\"v1\\""}')
+    mock_fetch.return_value = (None, '"v1"')
+
+    ingest_main()
+
+    assert mock_fetch.call_args.kwargs['etag'] == '"v1"'
+    mock_write_deltalake.assert_not_called()
+
+@patch('pipelines.ingest_statements.fetch_bulk_statements', MagicMock(return_value=None))
+@patch('pipelines.ingest_statements.fetch_statements_batches')
+@patch('pipelines.ingest_statements.write_bronze')
+def test_ingest_main_fetches_after_high_water_mark(mock_write_deltalake, mock_fetch, ingest_dir, mock_api_success_response):
+    """Test that each account is fetched from the day after its newest ingested transaction, and only later days are written."""
+    transactions = mock_api_success_response['Statements'][0]['Transactions']
+    written = _read_written_bronze(mock_write_deltalake)
+    mock_fetch.return_value = (pa.Table.from_pylist(transactions).to_reader(), None)
+    ingest_main()
+    assert mock_fetch.call_args.kwargs['from_date'] is None
+    assert load_high_water_marks('data_lake/ingest_high_water_marks') == {'acc_1': '2023-01-15'}
+
+    # The server may ignore FromDate; the days already ingested are still not written again.
+    refund = {'Date': '2023-01-20', 'Description': 'Refund', 'Amount': 5.0, 'Balance': 4905.0}
+    mock_fetch.return_value = (pa.Table.from_pylist([refund, *transactions]).to_reader(), None)
+    ingest_main()
+    assert mock_fetch.call_args.kwargs['from_date'] == '2023-01-16'
+    assert written[-1].column('description').to_pylist() == ['Refund']
+    assert load_high_water_marks('data_lake/ingest_high_water_marks') == {'acc_1': '2023-01-20'}
+
+@pytest.fixture
+def mock_api_post():
+    """Routes requests.post to the mock API's Flask test client."""
+    from api_mock import create_app
+    client = create_app().test_client()
+
+    def post(url, json=None, headers=None, stream=False):
+        flask_response = client.post(url.replace('http://127.0.0.1:5000', ''), json=json, headers=headers)
+        response = MagicMock(status_code=flask_response.status_code, raw=io.BytesIO(flask_response.data),
+                             headers=dict(flask_response.headers))
+        response.json.return_value = flask_response.get_json(silent=True)
+        response.raise_for_status.side_effect = (
+            requests.exceptions.HTTPError(flask_response.status) if flask_response.status_code >= 400 else None)
+        return response
+
+    with patch('requests.post', side_effect=post) as mock_post:
+        yield mock_post
+
+def test_fetch_bulk_statements_matches_per_account_fetches(mock_api_post):
+    """Test that one bulk request streams each account's transactions and ETag as fetch_statements_batches does."""
+    import pyarrow.compute as pc
+    from api_mock.services import data_service
+    customer_id = "123e4567-e89b-12d3-a456-426614174000"
+    numbers = [account['AccountNumber'] for account in data_service.get_accounts()]
+
+    reader, etags = fetch_bulk_statements(customer_id, "l_id", numbers)
+    table = reader.read_all()
+
+    assert mock_api_post.call_count == 1
+    for number in numbers:
+        rows = table.filter(pc.equal(table.column('AccountNumber'), number))
+        expected_reader, expected_etag = fetch_statements_batches(customer_id, "l_id", number)
+        expected_table = expected_reader.read_all()
+        assert etags[number] == expected_etag
+        assert rows.select(expected_table.column_names).to_pylist() == expected_table.to_pylist()
+
+    # Unchanged accounts keep their ETag and have no transactions in the response.
+    reader, unchanged_etags = fetch_bulk_statements(customer_id, "l_id", numbers, etags={numbers[0]: etags[numbers[0]]})
+    account_numbers = set(reader.read_all().column('AccountNumber').to_pylist())
+    assert unchanged_etags[numbers[0]] == etags[numbers[0]]
+    assert numbers[0] not in account_numbers and numbers[1] in account_numbers
+
+@patch('pipelines.ingest_statements.fetch_bulk_statements')
+@patch('pipelines.ingest_statements.fetch_statements_batches')
+@patch('pipelines.ingest_statements.write_bronze')
+def test_ingest_main_uses_bulk_statements(mock_write_deltalake, mock_fetch, mock_fetch_bulk, ingest_dir, mock_api_success_response):
+    """Test that every account is fetched in one bulk request when the server has the endpoint."""
+    transactions = mock_api_success_response['Statements'][0]['Transactions']
+    table = pa.Table.from_pylist(transactions)
+    table = table.append_column('AccountNumber', pa.array(['123'] * table.num_rows, pa.string()))
+    mock_fetch_bulk.return_value = (table.to_reader(), {'123': '"v1"'})
+    written = _read_written_bronze(mock_write_deltalake)
+
+    ingest_main()
+
+    assert mock_fetch_bulk.call_args.args[2] == ['123']
+    mock_fetch.assert_not_called()
+    assert written[0].num_rows == 2 and set(written[0].column('account_id').to_pylist()) == {'acc_1'}
 
 # --- Tests for transform_statements.py ---
 
@@ -118,3 +271,496 @@ def test_transform_main_merge(bronze_table_path):
     
     silver_df = DeltaTable(silver_path).to_pandas()
     assert len(silver_df) == 2
+
+def test_transform_main_categorizes_transactions(bronze_table_path):
+    """Test that the silver table holds the category of each transaction."""
+    silver_path = os.path.join(bronze_table_path, "data_lake/silver")
+
+    transform_main(write_mode='overwrite', data_lake_root=bronze_table_path)
+
+    silver_df = DeltaTable(silver_path).to_pandas()
+    assert CATEGORY_COLUMN in silver_df.columns
+    assert (silver_df[CATEGORY_COLUMN] == '').all()
+
+def test_transform_main_normalizes_silver(tmp_path):
+    """Test that customer and account columns are written once per request and account, not per transaction."""
+    data_lake_root = str(tmp_path)
+    paths = run_namespace.lake_paths(data_lake_root)
+    customer = {'Email': 'a@a.com', 'Request ID': 'r1', 'Username': 'A', 'Login ID': 'l1', 'Tag': 'email=a@a.com'}
+    data = [
+        {**customer, 'Account Number': '001', 'Account Type': 'Operation', 'Date': '2023-01-15', 'Description': 'p1', 'Balance': '10'},
+        {**customer, 'Account Number': '001', 'Account Type': 'Operation', 'Date': '2023-01-16', 'Description': 'p2', 'Balance': '20'},
+        {**customer, 'Account Number': '002', 'Account Type': 'Savings', 'Date': '2023-01-16', 'Description': 'p3', 'Balance': '30'},
+    ]
+    from deltalake.writer import write_deltalake
+    write_deltalake(paths['bronze'], pd.DataFrame(data), mode='overwrite')
+
+    transform_main(write_mode='overwrite', data_lake_root=data_lake_root)
+    transform_main(write_mode='merge', data_lake_root=data_lake_root)
+
+    silver_df = DeltaTable(paths['silver']).to_pandas()
+    customers_df = DeltaTable(paths['silver_customers']).to_pandas()
+    accounts_df = DeltaTable(paths['silver_accounts']).to_pandas()
+    assert len(silver_df) == 3
+    assert set(silver_df.columns) == {'email', 'request_id', 'account_number', 'date', 'description', 'balance', CATEGORY_COLUMN}
+    assert customers_df.to_dict('records') == [{'email': 'a@a.com', 'request_id': 'r1', 'username': 'A', 'login_id': 'l1', 'tag': 'email=a@a.com'}]
+    assert sorted(zip(accounts_df['account_number'], accounts_df['account_type'])) == [('001', 'Operation'), ('002', 'Savings')]
+
+def _write_wide_silver(data_lake_root):
+    """Writes a shared silver table as it was before normalization, with one request merged in after it."""
+    from deltalake.writer import write_deltalake
+    paths = run_namespace.lake_paths(data_lake_root)
+    wide = pa.table({
+        'email': ['a@a.com', 'a@a.com', 'b@b.com'], 'request_id': ['r1', 'r1', 'r2'], 'account_number': ['001'] * 3,
+        'date': ['2023-01-15', '2023-01-16', '2023-01-16'], 'description': ['p1', 'p2', 'p3'],
+        'username': ['A', 'A', None], 'account_type': ['Operation', 'Operation', None],
+    })
+    write_deltalake(paths['silver'], wide, mode='overwrite')
+    # r2 was written since normalization: its columns are in the dimensions, NULL in silver.
+    write_deltalake(paths['silver_customers'], pa.table({'email': ['b@b.com'], 'request_id': ['r2'], 'username': ['B']}), mode='overwrite')
+    write_deltalake(paths['silver_accounts'], pa.table({'email': ['b@b.com'], 'request_id': ['r2'], 'account_number': ['001'],
+                                                        'account_type': ['Savings']}), mode='overwrite')
+    return paths
+
+def test_migrate_wide_silver_splits_it_in_place(tmp_path):
+    """Test that a silver table written before normalization is split into the dimensions without losing rows."""
+    from pipelines.transform_statements import migrate_wide_silver
+    data_lake_root = str(tmp_path)
+    paths = _write_wide_silver(data_lake_root)
+
+    assert migrate_wide_silver(data_lake_root)
+    assert not migrate_wide_silver(data_lake_root)
+
+    silver_df = DeltaTable(paths['silver']).to_pandas()
+    assert len(silver_df) == 3
+    assert set(silver_df.columns) == {'email', 'request_id', 'account_number', 'date', 'description'}
+    customers = DeltaTable(paths['silver_customers']).to_pandas()
+    assert sorted(zip(customers['request_id'], customers['username'])) == [('r1', 'A'), ('r2', 'B')]
+    accounts = DeltaTable(paths['silver_accounts']).to_pandas()
+    assert sorted(zip(accounts['request_id'], accounts['account_type'])) == [('r1', 'Operation'), ('r2', 'Savings')]
+
+def test_seed_run_from_wide_shared_silver(tmp_path):
+    """Test that seeding from a silver table written before normalization keeps the run's silver narrow."""
+    data_lake_root = str(tmp_path)
+    _write_wide_silver(data_lake_root)
+    run_id = run_namespace.new_run_id()
+
+    assert run_namespace.seed_run_from_shared(run_id, ['r1', 'r2'], data_lake_root) == 3
+
+    run = run_namespace.lake_paths(data_lake_root, run_id)
+    assert 'username' not in DeltaTable(run['silver']).to_pandas().columns
+    customers = DeltaTable(run['silver_customers']).to_pandas()
+    assert sorted(zip(customers['request_id'], customers['username'])) == [('r1', 'A'), ('r2', 'B')]
+
+def _sorted_records(path):
+    df = DeltaTable(path).to_pandas()
+    columns = sorted(column for column in df.columns if not column.startswith('__'))
+    return df[columns].sort_values(columns).to_dict('records')
+
+def test_write_partitions_reads_bronze_once_into_one_file_per_partition(tmp_path):
+    """Test that every request's rows land in exactly one partition file, and that the null counts cover all of bronze."""
+    import pyarrow.dataset as ds
+    from pipelines.transform_parallel import write_partitions
+    bronze = pa.table({'Request ID': [f'r{i % 7}' for i in range(40)] + [None], 'Amount': [1.0] * 40 + [None]})
+
+    files, null_counts, requests = write_partitions(ds.dataset(bronze), 'Request ID', 3, str(tmp_path))
+
+    partitions = [pa.ipc.open_file(pa.memory_map(path)).read_all() for path in files]
+    assert sum(partition.num_rows for partition in partitions) == bronze.num_rows
+    request_sets = [set(partition.column('Request ID').to_pylist()) for partition in partitions]
+    assert sum(len(request_set) for request_set in request_sets) == len(set().union(*request_sets)) == requests == 8
+    assert null_counts == {'Request ID': 1, 'Amount': 1}
+
+def test_transform_main_parallel_matches_serial(tmp_path):
+    """Test that the parallel transform writes the same tables as the serial one, and merges without duplicates."""
+    data = [
+        {'Email': f'{c}@a.com', 'Request ID': f'r{c}', 'Username': c, 'Account Number': f'00{n}',
+         'Date': f'2023-01-1{day}', 'Description': 'VISA PAYMENT' if day else 'p', 'Amount': float(day) if day else None}
+        for c in 'abcde' for n in (1, 2) for day in range(3)
+    ]
+    results = {}
+    for workers in (1, 3):
+        data_lake_root = str(tmp_path / str(workers))
+        paths = run_namespace.lake_paths(data_lake_root)
+        from deltalake.writer import write_deltalake
+        write_deltalake(paths['bronze'], pd.DataFrame(data), mode='overwrite')
+
+        transform_main(write_mode='overwrite', data_lake_root=data_lake_root, workers=workers)
+        transform_main(write_mode='merge', data_lake_root=data_lake_root, workers=workers)
+
+        results[workers] = {table: _sorted_records(paths[table]) for table in ('silver', 'silver_customers', 'silver_accounts', 'ledger')}
+    assert len(results[3]['silver']) == len(data)
+    assert results[3] == results[1]
+
+def test_transform_main_parallel_merges_new_requests_and_columns(bronze_table_path):
+    """Test that a parallel merge adds only the new requests to silver, and the columns silver does not have yet."""
+    silver_path = os.path.join(bronze_table_path, "data_lake/silver")
+    bronze_path = os.path.join(bronze_table_path, "data_lake/bronze")
+    transform_main(write_mode='overwrite', data_lake_root=bronze_table_path)
+
+    bronze_df = DeltaTable(bronze_path).to_pandas()
+    new_request = {'date': '2023-01-17', 'description': 'LOAN', 'amount': 5.0, 'email': 'c@c.com', 'request_id': 'r3', 'channel': 'web'}
+    from deltalake.writer import write_deltalake
+    write_deltalake(bronze_path, pd.concat([bronze_df, pd.DataFrame([new_request])]), mode='overwrite', schema_mode='overwrite')
+    transform_main(write_mode='merge', data_lake_root=bronze_table_path, workers=2)
+
+    silver_df = DeltaTable(silver_path).to_pandas().sort_values('request_id')
+    assert list(silver_df['request_id']) == ['r1', 'r2', 'r3']
+    assert list(silver_df['channel']) == [None, None, 'web']
+    assert list(silver_df[CATEGORY_COLUMN]) == ['', '', 'debt_payment']
+
+# --- Tests for categorize.py ---
+
+CATEGORY_RULES = [
+    {'name': 'credit_card_payment', 'patterns': ['VISA', 'CREDIT CARD']},
+    {'name': 'debt_payment', 'patterns': ['LOAN', 'MORTGAGE']},
+]
+
+def test_categorize_matches_whole_words_case_insensitively():
+    descriptions = pa.array(['Visa payment', 'TD VISA', 'VISAGE SPA', 'mortgage pymt', 'Payroll', None, ''])
+    assert categorize(descriptions, CATEGORY_RULES).to_pylist() == [
+        'credit_card_payment', 'credit_card_payment', '', 'debt_payment', '', '', '']
+
+def test_categorize_prefers_earlier_categories():
+    # The debt pattern comes first in the description, but credit card payments take precedence.
+    descriptions = pa.chunked_array([['LOAN TRANSFER TO CREDIT CARD'], ['LOAN TRANSFER']])
+    assert categorize(descriptions, CATEGORY_RULES).to_pylist() == ['credit_card_payment', 'debt_payment']
+
+def test_categorize_escapes_patterns_and_checks_names():
+    assert categorize(pa.array(['A.B CO', 'AXB CO']), [{'name': 'other', 'patterns': ['A.B']}]).to_pylist() == ['other', '']
+    with pytest.raises(ValueError):
+        categorize(pa.array(['VISA']), [{'name': 'credit card', 'patterns': ['VISA']}])
+
+# --- Tests for run_namespace.py ---
+
+@pytest.fixture
+def run_bronze_table(tmp_path):
+    """Creates a bronze table inside a run namespace and returns (data_lake_root, run_id)."""
+    data_lake_root = str(tmp_path / "data_lake_root")
+    run_id = run_namespace.new_run_id()
+    data = [
+        {'Date': '2023-01-15', 'Description': 'p1', 'Email': 'a@a.com', 'Request ID': 'r1'},
+        {'Date': '2023-01-16', 'Description': 'p2', 'Email': 'a@a.com', 'Request ID': 'r1'}
+    ]
+    from deltalake.writer import write_deltalake
+    write_deltalake(run_namespace.lake_paths(data_lake_root, run_id)['bronze'], pd.DataFrame(data), mode='overwrite')
+    return data_lake_root, run_id
+
+def test_lake_paths_are_isolated_per_run():
+    """Test that each run gets its own namespace, separate from the shared lake."""
+    shared = run_namespace.lake_paths("root")
+    run_a = run_namespace.lake_paths("root", "a")
+    run_b = run_namespace.lake_paths("root", "b")
+
+    assert shared['silver'] == os.path.join("root", "data_lake", "silver")
+    assert run_a['silver'] == os.path.join("root", "data_lake", "runs", "a", "silver")
+    assert run_a['bronze'] != run_b['bronze']
+    assert run_a['dbt_db'] != run_b['dbt_db']
+
+def test_transform_main_run_namespace(run_bronze_table):
+    """Test that a run-scoped transform only writes inside its namespace, with standardized columns."""
+    data_lake_root, run_id = run_bronze_table
+
+    transform_main(write_mode='overwrite', data_lake_root=data_lake_root, run_id=run_id)
+
+    run_silver = DeltaTable(run_namespace.lake_paths(data_lake_root, run_id)['silver']).to_pandas()
+    assert len(run_silver) == 2
+    assert 'request_id' in run_silver.columns
+    assert not os.path.exists(run_namespace.lake_paths(data_lake_root)['silver'])
+
+def test_publish_run_merges_into_shared_tables(run_bronze_table):
+    """Test that publishing is idempotent and keeps rows from other runs."""
+    data_lake_root, run_id = run_bronze_table
+    transform_main(write_mode='overwrite', data_lake_root=data_lake_root, run_id=run_id)
+
+    run_namespace.publish_run(run_id, data_lake_root)
+    run_namespace.publish_run(run_id, data_lake_root)
+
+    shared = run_namespace.lake_paths(data_lake_root)
+    assert len(DeltaTable(shared['silver']).to_pandas()) == 2
+    assert len(DeltaTable(shared['silver_customers']).to_pandas()) == 1
+    assert len(DeltaTable(shared['ledger']).to_pandas()) == 1
+
+    run_namespace.cleanup_run(run_id, data_lake_root)
+    assert not os.path.exists(run_namespace.lake_paths(data_lake_root, run_id)['root'])
+    assert len(DeltaTable(shared['silver']).to_pandas()) == 2
+
+def test_publish_docs_copies_run_docs_to_shared_target(tmp_path):
+    """Test that a run's generated dbt docs are copied to the shared docs directory, which outlives the run."""
+    data_lake_root, docs_dir = str(tmp_path / "lake"), str(tmp_path / "target")
+    assert not run_namespace.publish_docs('run1', data_lake_root, docs_dir)
+
+    run_target = run_namespace.lake_paths(data_lake_root, 'run1')['dbt_target']
+    os.makedirs(run_target)
+    for name in run_namespace.DBT_DOCS_FILES:
+        with open(os.path.join(run_target, name), 'w') as f:
+            f.write(f'run1 {name}')
+    assert run_namespace.publish_docs('run1', data_lake_root, docs_dir)
+    run_namespace.cleanup_run('run1', data_lake_root)
+
+    assert sorted(os.listdir(docs_dir)) == sorted(run_namespace.DBT_DOCS_FILES)
+    with open(os.path.join(docs_dir, 'catalog.json')) as f:
+        assert f.read() == 'run1 catalog.json'
+
+def test_seed_run_from_shared(run_bronze_table):
+    """Test that a run can pick up already-published requests without a bronze write."""
+    data_lake_root, run_id = run_bronze_table
+    transform_main(write_mode='overwrite', data_lake_root=data_lake_root, run_id=run_id)
+    run_namespace.publish_run(run_id, data_lake_root)
+
+    new_run_id = run_namespace.new_run_id()
+    seeded = run_namespace.seed_run_from_shared(new_run_id, ['r1', 'unknown'], data_lake_root)
+
+    new_run = run_namespace.lake_paths(data_lake_root, new_run_id)
+    assert seeded == 2
+    assert not os.path.exists(new_run['bronze'])
+    assert len(DeltaTable(new_run['silver']).to_pandas()) == 2
+    assert len(DeltaTable(new_run['ledger']).to_pandas()) == 1
+
+# --- Tests for fingerprints.py ---
+
+def test_fingerprint_file_is_streaming_and_rewinds(tmp_path):
+    """Test that file fingerprints depend only on content and leave the file readable."""
+    content = b"Date,Description\n2024-01-01,Payment\n"
+    path = tmp_path / "statement.csv"
+    path.write_bytes(content)
+    file = io.BytesIO(content)
+
+    fingerprint = fingerprints.fingerprint_file(file, chunk_size=4)
+
+    assert fingerprint == fingerprints.fingerprint_file(str(path))
+    assert fingerprint == fingerprints.fingerprint_chunks([content])
+    assert file.read() == content
+
+def test_record_and_find_fingerprints(tmp_path):
+    """Test that recorded fingerprints are found again, and recording is idempotent."""
+    data_lake_root = str(tmp_path)
+    record = {'fingerprint': 'abc', 'source': 'upload', 'name': 'a.csv', 'request_ids': ['r1'], 'num_rows': 2}
+
+    assert fingerprints.find_known_fingerprints(['abc'], data_lake_root) == {}
+    fingerprints.record_fingerprints([record], 'run1', data_lake_root)
+    fingerprints.record_fingerprints([record], 'run2', data_lake_root)
+
+    known = fingerprints.find_known_fingerprints(['abc', 'def'], data_lake_root)
+    assert list(known) == ['abc']
+    assert known['abc']['request_ids'] == ['r1']
+    assert known['abc']['run_id'] == 'run1'
+
+def test_run_metrics_spans_nest_and_record_errors():
+    """Test that nested spans become sub-steps and failing spans are marked as errors."""
+    metrics = run_metrics.RunMetrics('run1')
+    with metrics.span('publish'):
+        with metrics.span('publish_tables'):
+            pass
+    with pytest.raises(ValueError):
+        with metrics.span('dbt_run'):
+            raise ValueError("dbt failed")
+
+    publish, publish_tables, dbt_run = metrics.spans
+    assert (publish['kind'], publish['parent_id']) == ('stage', None)
+    assert (publish_tables['kind'], publish_tables['parent_id']) == ('step', publish['span_id'])
+    assert dbt_run['status'] == 'error'
+    assert all(s['wall_seconds'] >= 0 and s['peak_rss_mb'] > 0 for s in metrics.spans)
+
+def test_run_metrics_measure_each_span_on_its_own():
+    """Test that a span's peak RSS and CPU time are its own, not lifetime or other-thread figures."""
+    metrics = run_metrics.RunMetrics('run1')
+    with metrics.span('allocate'):
+        block = bytearray(200 * 2**20)
+        del block
+    busy = threading.Thread(target=lambda: sum(range(20_000_000)))
+    with metrics.span('wait'):
+        busy.start()
+        busy.join()
+
+    allocate, wait = metrics.spans
+    assert allocate['peak_rss_mb'] - wait['peak_rss_mb'] > 150
+    # The other thread's work is not this span's CPU time.
+    assert wait['cpu_seconds'] < wait['wall_seconds'] / 2
+
+def test_run_metrics_count_only_the_spans_own_subprocesses():
+    """Test that a span counts the CPU time of the subprocesses its thread ran, and not of other threads' ones."""
+    import subprocess
+    metrics = run_metrics.RunMetrics('run1')
+    busy = [sys.executable, "-c", "sum(range(20_000_000))"]
+    other = threading.Thread(target=lambda: run_metrics.run_subprocess(busy))
+    with metrics.span('other_thread'):
+        other.start()
+        other.join()
+    with metrics.span('own'):
+        assert run_metrics.run_subprocess(busy).returncode == 0
+
+    other_thread, own = metrics.spans
+    assert own['cpu_seconds'] > 0.2
+    assert other_thread['cpu_seconds'] < own['cpu_seconds'] / 2
+
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        run_metrics.run_subprocess([sys.executable, "-c", "import sys; print('out'); sys.exit('failed')"])
+    assert (failure.value.returncode, failure.value.stdout, failure.value.stderr) == (1, 'out\n', 'failed\n')
+
+def test_run_metrics_dbt_models_from_run_results(tmp_path):
+    """Test that dbt per-model timings are read from run_results.json under the dbt_run span."""
+    run_results = tmp_path / "run_results.json"
+    run_results.write_text(json.dumps({'results': [
+        {'unique_id': 'model.analytics.stg_transactions', 'status': 'success', 'execution_time': 0.4,
+         'timing': [{'name': 'execute', 'started_at': '2024-01-01T00:00:00.000000Z'}]},
+        {'unique_id': 'model.analytics.fct_credit_metrics_by_customer', 'status': 'error', 'execution_time': 1.5, 'timing': []},
+    ]}))
+    metrics = run_metrics.RunMetrics('run1')
+    with metrics.span('dbt_run'):
+        pass
+    metrics.add_dbt_models(str(run_results))
+    metrics.add_dbt_models(str(tmp_path / "missing.json"))
+
+    models = [s for s in metrics.spans if s['kind'] == 'dbt_model']
+    assert [m['wall_seconds'] for m in models] == [0.4, 1.5]
+    assert all(m['parent_id'] == 0 for m in models)
+    assert models[1]['status'] == 'error'
+
+def test_record_load_and_summarize_run_metrics(tmp_path):
+    """Test that spans are appended per run and summarized with percentiles across runs."""
+    data_lake_root = str(tmp_path)
+    assert run_metrics.load_run_metrics(data_lake_root).empty
+
+    for run_id in ('run1', 'run2'):
+        metrics = run_metrics.RunMetrics(run_id)
+        with metrics.span('transform'):
+            pass
+        run_metrics.record_run_metrics(metrics, data_lake_root)
+
+    spans = run_metrics.load_run_metrics(data_lake_root)
+    assert sorted(spans['run_id']) == ['run1', 'run2']
+
+    summary = run_metrics.summarize_run_metrics(spans, percentiles=(0.5, 0.9))
+    assert summary['name'].tolist() == ['transform']
+    assert summary['runs'].tolist() == [2]
+    assert {'wall_seconds_p50', 'wall_seconds_p90', 'cpu_seconds_p50', 'peak_rss_mb_p90'} <= set(summary.columns)
+
+@patch('pipelines.orchestrator.run_metrics.run_subprocess')
+def test_orchestrator_skips_unchanged_stages(mock_subprocess, run_bronze_table):
+    """Test that stages only rerun when their inputs change, and that dry runs execute nothing."""
+    data_lake_root, run_id = run_bronze_table
+    paths = run_namespace.lake_paths(data_lake_root, run_id)
+    stages = orchestrator.build_stages(data_lake_root, run_id, write_mode='overwrite', docs=False)
+
+    first = orchestrator.run_pipeline(stages, paths['orchestrator_state'])
+    assert [(e['stage'], e['action']) for e in first] == [('transform', 'run'), ('dbt_run', 'run')]
+    assert DeltaTable(paths['silver']).to_pandas().shape[0] == 2
+    dbt_command = mock_subprocess.call_args[0][0]
+    assert dbt_command[:3] == ["dbt", "run", "--full-refresh"]
+    assert mock_subprocess.call_args.kwargs['env']['SILVER_TABLE_PATH'].endswith(os.path.join(run_id, 'silver'))
+
+    # The dbt database is written by the (mocked) dbt run.
+    open(paths['dbt_db'], 'w').close()
+    orchestrator.run_pipeline(stages, paths['orchestrator_state'], force=['dbt_run'])
+    mock_subprocess.reset_mock()
+
+    second = orchestrator.run_pipeline(stages, paths['orchestrator_state'])
+    assert [e['action'] for e in second] == ['skip', 'skip']
+    mock_subprocess.assert_not_called()
+
+    # New bronze data changes the transform's input; the dry run only plans it.
+    from deltalake.writer import write_deltalake
+    write_deltalake(paths['bronze'], pd.DataFrame([{'Date': '2023-01-17', 'Description': 'p3', 'Email': 'a@a.com', 'Request ID': 'r1'}]), mode='append')
+    planned = orchestrator.run_pipeline(stages, paths['orchestrator_state'], dry_run=True)
+    assert [(e['action'], e['reason']) for e in planned] == [('run', 'inputs changed'), ('run', 'upstream transform will run')]
+    assert DeltaTable(paths['silver']).to_pandas().shape[0] == 2
+    mock_subprocess.assert_not_called()
+
+@patch('pipelines.orchestrator.run_metrics.run_subprocess')
+def test_orchestrator_without_state_runs_transform_on_warm_workers(mock_subprocess, run_bronze_table):
+    """Test that the app's pipeline, without saved state, runs every stage and the transform on the warm worker pool."""
+    data_lake_root, run_id = run_bronze_table
+    paths = run_namespace.lake_paths(data_lake_root, run_id)
+    stages = orchestrator.build_stages(data_lake_root, run_id, write_mode='overwrite', docs=False, in_process=False)
+
+    metrics = run_metrics.RunMetrics(run_id)
+    for _ in range(2):
+        entries = orchestrator.run_pipeline(stages, None, metrics=metrics)
+        assert [(e['stage'], e['action']) for e in entries] == [('transform', 'run'), ('dbt_run', 'run')]
+    assert DeltaTable(paths['silver']).to_pandas().shape[0] == 2
+    assert not os.path.exists(paths['orchestrator_state'])
+    # The workers outlive the runs, and their CPU time is counted towards the transform span.
+    assert orchestrator.transform_pool() is orchestrator.transform_pool()
+    assert all(span['cpu_seconds'] > 0 for span in metrics.spans if span['name'] == 'transform')
+
+def test_orchestrator_skips_transform_without_bronze(tmp_path):
+    """Test that a namespace without bronze data (e.g. only reused statements) skips the transform."""
+    stages = orchestrator.build_stages(str(tmp_path), 'run1', reused_request_ids=['r1'])
+    entries = orchestrator.plan(stages, {})
+    assert [(e['stage'], e['action']) for e in entries] == [
+        ('transform', 'skip'), ('seed_reused', 'run'), ('dbt_run', 'run'), ('dbt_docs', 'run')
+    ]
+
+def test_models_hash_changes_with_model_files(tmp_path):
+    """Test that the model hash covers the content of the dbt project files."""
+    (tmp_path / "models").mkdir()
+    model = tmp_path / "models" / "stg.sql"
+    model.write_text("select 1")
+    before = orchestrator.models_hash(str(tmp_path))
+    model.write_text("select 2")
+    assert orchestrator.models_hash(str(tmp_path)) != before
+
+# --- Tests for profile_dbt.py ---
+
+@pytest.fixture
+def dbt_target(tmp_path):
+    """Creates the dbt database and target directory of a finished dbt run, and returns (data_lake_root, paths)."""
+    import duckdb
+    data_lake_root = str(tmp_path)
+    paths = run_namespace.lake_paths(data_lake_root)
+    os.makedirs(os.path.join(paths['dbt_target'], 'compiled', 'customer_transactions', 'models'))
+    with duckdb.connect(paths['dbt_db']) as con:
+        con.execute("CREATE TABLE stg AS SELECT range AS a FROM range(10000)")
+    # The second model's SQL is only in the compiled directory, as with dbt versions that leave it out of run_results.json.
+    with open(os.path.join(paths['dbt_target'], 'compiled', 'customer_transactions', 'models', 'agg.sql'), 'w') as f:
+        f.write("SELECT a % 3 AS k, SUM(a) AS total FROM dbt.main.stg GROUP BY ALL")
+    results = [
+        {'unique_id': 'model.customer_transactions.stg', 'status': 'success', 'execution_time': 0.5,
+         'compiled_code': "SELECT range AS a FROM range(10000)"},
+        {'unique_id': 'model.customer_transactions.agg', 'status': 'success', 'execution_time': 0.2},
+        {'unique_id': 'model.customer_transactions.broken', 'status': 'error', 'execution_time': 0.1},
+        {'unique_id': 'test.customer_transactions.not_null', 'status': 'pass', 'execution_time': 0.1},
+    ]
+    with open(os.path.join(paths['dbt_target'], 'run_results.json'), 'w') as f:
+        json.dump({'results': results}, f)
+    return data_lake_root, paths
+
+def test_profile_dbt_run_reports_models_and_operators(dbt_target):
+    """Test that each model is profiled with DuckDB, ranked in the report and compared with the previous profile."""
+    data_lake_root, paths = dbt_target
+
+    first = profile_dbt.profile_dbt_run(paths['dbt_target'], paths['dbt_db'], data_lake_root)
+    models = {model['model']: model for model in first['models']}
+    assert set(models) == {'stg', 'agg', 'broken'}
+    assert models['agg']['rows'] == 3 and models['agg']['dbt_seconds'] == 0.2
+    assert models['broken']['status'] == 'error'
+    assert 'HASH_GROUP_BY' in [operator['operator'] for operator in models['agg']['operators']]
+    assert all(operator['operator'] != 'CREATE_TABLE_AS' for operator in models['agg']['operators'])
+    assert os.path.exists(os.path.join(paths['dbt_target'], profile_dbt.PROFILES_DIR, 'agg.json'))
+
+    profile_dbt.profile_dbt_run(paths['dbt_target'], paths['dbt_db'], data_lake_root)
+    assert len(profile_dbt.load_profiles(data_lake_root)) == 2
+    with open(os.path.join(paths['dbt_target'], profile_dbt.REPORT_FILE)) as f:
+        report = f.read()
+    assert "same models" in report
+    assert "| agg | HASH_GROUP_BY |" in report
+    assert "- broken: error" in report
+
+def test_orchestrator_profile_stage():
+    """Test that the profiling stage runs after dbt, only when asked for."""
+    assert 'dbt_profile' not in [stage['name'] for stage in orchestrator.build_stages(docs=False)]
+    stages = {stage['name']: stage for stage in orchestrator.build_stages(docs=False, profile=True)}
+    assert stages['dbt_profile']['depends_on'] == ['dbt_run']
+
+def test_pipeline_clis_do_not_import_heavy_modules():
+    """Test that importing the pipeline modules defers pandas, pyarrow, deltalake and requests to first use."""
+    import subprocess
+    import sys
+    code = (
+        "import sys, pipelines.orchestrator, pipelines.run_namespace, pipelines.transform_statements,"
+        " pipelines.ingest_statements, pipelines.fingerprints, pipelines.run_metrics;"
+        "print(sorted(m for m in ('pandas', 'pyarrow', 'deltalake', 'requests') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
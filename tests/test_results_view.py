@@ -0,0 +1,73 @@
+import logging
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+
+from app import results_view
+
+def test_lttb_keeps_endpoints_and_extremes():
+    """Test that LTTB keeps the first and last points and preserves spikes."""
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100.0   # A single spike that plain decimation would likely drop
+    y[750] = -50.0
+
+    indices = results_view.lttb_indices(x, y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 500 in indices and 750 in indices
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_short_series_unchanged():
+    """Test that series shorter than the threshold are returned as-is."""
+    assert list(results_view.lttb_indices(np.arange(10), np.arange(10), 50)) == list(range(10))
+
+def test_downsample_series_with_dates():
+    """Test that date-indexed frames are sorted and downsampled."""
+    dates = pd.date_range("2023-01-01", periods=400, freq="D")
+    df = pd.DataFrame({'date': dates[::-1], 'revised_average_balance': np.arange(400.0)})
+
+    result = results_view.downsample_series(df, 'date', 'revised_average_balance', max_points=100)
+
+    assert len(result) == 100
+    assert result['date'].is_monotonic_increasing
+
+def _results_df(num_customers, days=10):
+    return pd.DataFrame([
+        {'request_id': f'r{c:02d}', 'email': f'c{c}@x.com', 'date': pd.Timestamp('2023-01-01') + pd.Timedelta(days=d), 'revised_average_balance': float(d)}
+        for c in range(num_customers) for d in range(days)
+    ])
+
+def test_display_results_paginates_customers():
+    """Test that only the selected page of customers is rendered."""
+    mock_st = MagicMock()
+    mock_st.session_state = {"final_df": _results_df(12)}
+    mock_st.number_input.return_value = 3
+    mock_st.toggle.return_value = False
+
+    results_view.display_results(mock_st, logging.getLogger(), key_prefix="test", page_size=5)
+
+    assert mock_st.line_chart.call_count == 2  # Customers 11 and 12
+    rendered = [c.args[0] for c in mock_st.markdown.call_args_list]
+    assert rendered == ["#### Customer: `c10@x.com`", "#### Customer: `c11@x.com`"]
+    # Full-resolution tables are only rendered on demand
+    assert not mock_st.dataframe.called
+
+def test_display_results_full_resolution_on_demand():
+    """Test that the full table is rendered when the toggle is on."""
+    mock_st = MagicMock()
+    mock_st.session_state = {"final_df": _results_df(1)}
+    mock_st.toggle.return_value = True
+
+    results_view.display_results(mock_st, logging.getLogger(), key_prefix="test")
+
+    assert not mock_st.number_input.called
+    assert mock_st.dataframe.call_count == 1
+
+def test_display_results_without_results():
+    """Test that nothing is rendered before an analysis has run."""
+    mock_st = MagicMock()
+    mock_st.session_state = {}
+    results_view.display_results(mock_st, logging.getLogger(), key_prefix="test")
+    assert not mock_st.subheader.called
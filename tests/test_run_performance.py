@@ -0,0 +1,43 @@
+import pandas as pd
+from unittest.mock import patch, MagicMock
+
+from app import run_performance
+
+def _spans():
+    return pd.DataFrame([
+        {'run_id': 'old', 'span_id': 0, 'parent_id': None, 'name': 'dbt_run', 'kind': 'stage', 'status': 'success',
+         'wall_seconds': 3.0, 'cpu_seconds': 2.0, 'peak_rss_mb': 100.0, 'recorded_at': pd.Timestamp('2024-01-01', tz='UTC')},
+        {'run_id': 'new', 'span_id': 0, 'parent_id': None, 'name': 'publish', 'kind': 'stage', 'status': 'success',
+         'wall_seconds': 1.0, 'cpu_seconds': 0.5, 'peak_rss_mb': 120.0, 'recorded_at': pd.Timestamp('2024-01-02', tz='UTC')},
+        {'run_id': 'new', 'span_id': 1, 'parent_id': 0, 'name': 'publish_tables', 'kind': 'step', 'status': 'success',
+         'wall_seconds': 0.8, 'cpu_seconds': 0.4, 'peak_rss_mb': 120.0, 'recorded_at': pd.Timestamp('2024-01-02', tz='UTC')},
+    ])
+
+def test_latest_run_spans_indents_sub_steps():
+    """Test that only the latest run is shown, with sub-steps indented under their stage."""
+    latest = run_performance.latest_run_spans(_spans())
+    assert latest['span'].tolist() == ['publish', '  publish_tables']
+
+@patch('app.run_performance.run_metrics.load_run_metrics')
+def test_display_run_performance(mock_load):
+    """Test that the panel renders the latest run and the percentiles across runs."""
+    mock_load.return_value = _spans()
+    mock_st = MagicMock()
+
+    run_performance.display_run_performance(mock_st, MagicMock(), data_lake_root='lake')
+
+    mock_load.assert_called_once_with('lake')
+    assert mock_st.dataframe.call_count == 2
+    summary = mock_st.dataframe.call_args_list[1].args[0]
+    assert summary['name'].tolist() == ['dbt_run', 'publish', 'publish_tables']
+
+@patch('app.run_performance.run_metrics.load_run_metrics')
+def test_display_run_performance_without_runs(mock_load):
+    """Test that the panel explains that no runs were recorded yet."""
+    mock_load.return_value = pd.DataFrame()
+    mock_st = MagicMock()
+
+    run_performance.display_run_performance(mock_st, MagicMock())
+
+    mock_st.info.assert_called_once()
+    mock_st.dataframe.assert_not_called()
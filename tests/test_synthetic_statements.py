@@ -0,0 +1,48 @@
+import json
+import os
+import pyarrow.compute as pc
+
+from app.upload_loader import STATEMENT_SCHEMA, parse_statement_csv
+from benchmarks.synthetic_statements import generate_statements, write_mock_api_dataset
+from benchmarks.bench_pipeline import compare
+
+def test_generate_statements_is_deterministic():
+    """Test that the same arguments and seed produce the same statements."""
+    assert generate_statements(3, 2, 2, 30, seed=1).equals(generate_statements(3, 2, 2, 30, seed=1))
+    assert not generate_statements(3, 2, 2, 30, seed=1).equals(generate_statements(3, 2, 2, 30, seed=2))
+
+def test_generate_statements_layout():
+    """Test the column layout, customers, accounts and history length."""
+    statements = generate_statements(customers=3, accounts_per_customer=2, transactions_per_day=3, history_days=30)
+
+    assert statements.schema == STATEMENT_SCHEMA
+    assert pc.count_distinct(statements['Email']).as_py() == 3
+    assert pc.count_distinct(statements['Account Number']).as_py() == 6
+    assert pc.min(statements['Date']).as_py() >= '2024-01-11'
+    assert pc.max(statements['Date']).as_py() <= '2024-02-09'
+    # Every transaction is either a deposit or a withdrawal.
+    has_deposit = pc.not_equal(statements['Deposits'], '')
+    has_withdrawal = pc.not_equal(statements['Withdrawals'], '')
+    assert pc.all(pc.xor(has_deposit, has_withdrawal)).as_py()
+
+def test_write_mock_api_dataset(tmp_path):
+    """Test that the dataset has one readable statement file per account in the config."""
+    statements = generate_statements(customers=2, accounts_per_customer=2, transactions_per_day=2, history_days=10)
+    config_path = write_mock_api_dataset(statements, str(tmp_path))
+
+    with open(config_path) as f:
+        accounts = json.load(f)['accounts']
+    assert len(accounts) == 4
+    parsed = [parse_statement_csv(os.path.join(tmp_path, 'data', a['statementFile'])) for a in accounts]
+    assert sum(t.num_rows for t in parsed) == statements.num_rows
+
+def test_compare_flags_regressions():
+    """Test that timings slower than the threshold are flagged against the previous result."""
+    previous = {'git_commit': 'abc', 'metrics': {'transform_s': 1.0, 'dbt_run_s': 2.0}}
+    result = {'metrics': {'transform_s': 1.5, 'dbt_run_s': 2.1, 'silver_rows': 10}}
+
+    lines = compare(result, previous, threshold=0.2)
+
+    assert 'REGRESSION' in lines[0] and '+50.0%' in lines[0]
+    assert 'REGRESSION' not in lines[1]
+    assert lines[2].split() == ['silver_rows', '10']
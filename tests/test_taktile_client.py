@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import patch, MagicMock
+import requests
+
+from app import taktile_client
+from app.decision_cache import DecisionCache
+
+def _response(status_code, payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"{status_code} error")
+    return response
+
+@pytest.fixture
+def client():
+    client = taktile_client.TaktileClient("http://taktile.test", "test-key", max_concurrency=4, poll_deadline=5)
+    client.session = MagicMock()
+    return client
+
+def test_decide_sync_success(client):
+    """Test a successful synchronous (200) decision."""
+    client.session.post.return_value = _response(200, {"decision": "approved"})
+
+    assert client.decide({}) == {"decision": "approved"}
+    assert client.session.post.call_args[0][0] == "http://taktile.test/run/api/v1/flows/underwriting/sandbox/decide"
+
+@patch('app.taktile_client.time.sleep', return_value=None)
+def test_decide_async_polls_with_backoff(mock_sleep, client):
+    """Test that a 202 decision is polled with exponentially growing intervals."""
+    client.session.post.return_value = _response(202, {"metadata": {"decision_id": "123"}})
+    client.session.get.side_effect = [_response(202), _response(202), _response(200, {"decision": "approved_async"})]
+
+    assert client.decide({}) == {"decision": "approved_async"}
+    assert client.session.get.call_args[0][0].endswith("/decide/123")
+    intervals = [c.args[0] for c in mock_sleep.call_args_list]
+    assert intervals == [0.25, 0.5, 1.0]
+
+@patch('app.taktile_client.time.sleep', return_value=None)
+@patch('app.taktile_client.time.monotonic')
+def test_decide_async_deadline(mock_monotonic, mock_sleep, client):
+    """Test that polling stops with a TimeoutError once the deadline has passed."""
+    mock_monotonic.side_effect = [0, 1, 3, 6]
+    client.session.post.return_value = _response(202, {"metadata": {"decision_id": "123"}})
+    client.session.get.return_value = _response(202)
+
+    with pytest.raises(TimeoutError):
+        client.decide({})
+    assert client.session.get.call_count == 2
+
+def test_decide_many_keeps_order_and_isolates_failures(client):
+    """Test that concurrent decisions return in order, with failures returned not raised."""
+    def post(url, json, timeout):
+        if json["id"] == 2:
+            return _response(500)
+        return _response(200, {"id": json["id"]})
+    client.session.post.side_effect = post
+
+    results = client.decide_many([{"id": i} for i in range(5)])
+
+    assert [r["id"] for i, r in enumerate(results) if i != 2] == [0, 1, 3, 4]
+    assert isinstance(results[2], requests.HTTPError)
+
+def test_get_client_no_key():
+    """Test that an EnvironmentError is raised if the API key is not set."""
+    with patch.dict('os.environ', {}, clear=True):
+        with pytest.raises(EnvironmentError):
+            taktile_client.get_client()
+
+def test_get_client_is_shared():
+    """Test that the pooled client is reused across calls."""
+    env = {'TAKTILE_DEMO_API_KEY': 'k', 'TAKTILE_BASE_URL': 'http://x', 'TAKTILE_DECISION_CACHE_PATH': ':memory:'}
+    with patch.dict('os.environ', env):
+        assert taktile_client.get_client() is taktile_client.get_client()
+        assert taktile_client.get_client().cache is not None
+
+def test_decide_uses_cache(client):
+    """Test that an identical data payload is decided once and then served from the cache."""
+    client.cache = DecisionCache(":memory:")
+    client.session.post.return_value = _response(200, {"decision": "approved"})
+
+    first = client.decide({"data": {"a": 1, "b": 2}, "metadata": {"entity_id": "1"}})
+    second = client.decide({"data": {"b": 2, "a": 1}, "metadata": {"entity_id": "1"}})
+
+    assert first == second == {"decision": "approved"}
+    assert client.session.post.call_count == 1
+    assert client.cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+def test_decide_does_not_cache_failures(client):
+    """Test that failed decisions are not cached."""
+    client.cache = DecisionCache(":memory:")
+    client.session.post.return_value = _response(500)
+
+    with pytest.raises(requests.HTTPError):
+        client.decide({"data": {"a": 1}})
+    assert len(client.cache) == 0
@@ -0,0 +1,122 @@
+import pytest
+import json
+from unittest.mock import patch
+from taktile_mock import create_app
+from taktile_mock.services import decision_service
+from taktile_mock.api import routes
+
+DECIDE_URL = '/run/api/v1/flows/underwriting/sandbox/decide'
+HEADERS = {'X-Api-Key': 'test-key', 'X-Mock-Latency-Ms': '0'}
+
+def _payload(execution_mode='sync', **overrides):
+    data = {
+        'request_id': 'request-1',
+        'email': 'customer@example.com',
+        'revenue_recent_90d': 300000,
+        'revenue_91_to_180d': 280000,
+        'debits_recent_90d': 240000,
+        'most_recent_balance_across_bank_accounts': 90000,
+        'estimated_annual_revenue': 1200000,
+        'average_daily_balance': 80000,
+        'smart_revenue': 1100000,
+        'existing_debt_payments_consideration': 5000,
+        'average_weekly_revenue': 23000,
+        **overrides,
+    }
+    return {'data': data, 'metadata': {'entity_id': 'request-1'}, 'control': {'execution_mode': execution_mode}}
+
+@pytest.fixture
+def client():
+    """Create and configure a test client for the emulator."""
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_decide_requires_api_key(client):
+    """Test that a decision without an API key is rejected."""
+    response = client.post(DECIDE_URL, json=_payload())
+    assert response.status_code == 401
+
+def test_decide_rejects_missing_data(client):
+    """Test that a payload without a data object is rejected."""
+    response = client.post(DECIDE_URL, json={'metadata': {}}, headers=HEADERS)
+    assert response.status_code == 422
+
+def test_decide_sync_returns_display_fields(client):
+    """Test that a synchronous decision returns every field the Analyst UI renders."""
+    response = client.post(DECIDE_URL, json=_payload(), headers=HEADERS)
+    assert response.status_code == 200
+    body = json.loads(response.data)
+    assert body['metadata']['entity_id'] == 'request-1'
+    assert body['metadata']['version'] == decision_service.CONFIG['flow_version']
+    data = body['data']
+    for field in ('risk_tier', 'credit_limit', 'credit_approval_amount', 'card_approval_amount',
+                  'capital_approval_amount', 'length_multiplier_in_weeks', 'repayment_frequency',
+                  'debt_guardrail', 'runway_months', 'average_risk_score'):
+        assert field in data
+    assert data['email'] == 'customer@example.com'
+
+def test_decide_async_is_polled(client):
+    """Test that an async decision is accepted and returned once processed."""
+    response = client.post(DECIDE_URL, json=_payload('async'), headers=HEADERS)
+    assert response.status_code == 202
+    decision_id = json.loads(response.data)['metadata']['decision_id']
+
+    with patch('taktile_mock.api.routes.time.monotonic', return_value=0):
+        assert client.get(f'{DECIDE_URL}/{decision_id}').status_code == 202
+
+    with patch('taktile_mock.api.routes.time.monotonic', return_value=float('inf')):
+        response = client.get(f'{DECIDE_URL}/{decision_id}')
+    assert response.status_code == 200
+    assert json.loads(response.data)['data']['risk_tier']
+    # The decision is only returned once.
+    assert client.get(f'{DECIDE_URL}/{decision_id}').status_code == 404
+
+def test_decide_async_expires_unpolled_decisions(client):
+    """Test that async decisions never polled are dropped once past the TTL, when a new one is accepted."""
+    with patch('taktile_mock.api.routes.time.monotonic', return_value=0):
+        response = client.post(DECIDE_URL, json=_payload('async'), headers=HEADERS)
+    decision_id = json.loads(response.data)['metadata']['decision_id']
+
+    ttl_seconds = routes.ASYNC_CONFIG['ttl_seconds']
+    with patch('taktile_mock.api.routes.time.monotonic', return_value=ttl_seconds + 10):
+        client.post(DECIDE_URL, json=_payload('async'), headers=HEADERS)
+        assert client.get(f'{DECIDE_URL}/{decision_id}').status_code == 404
+
+@pytest.mark.parametrize('latency', ['fast', 'nan', 'inf', '-inf'])
+def test_decide_rejects_non_numeric_latency_header(client, latency):
+    """Test that a latency override that is not a finite number is a client error."""
+    response = client.post(DECIDE_URL, json=_payload(), headers={**HEADERS, 'X-Mock-Latency-Ms': latency})
+    assert response.status_code == 400
+
+def test_decide_rejects_non_finite_latency_setting(client, monkeypatch):
+    """Test that a server-wide latency override that is not finite is a client error too."""
+    monkeypatch.setenv('TAKTILE_MOCK_LATENCY_MS', 'nan')
+    headers = {key: value for key, value in HEADERS.items() if key != 'X-Mock-Latency-Ms'}
+    assert client.post(DECIDE_URL, json=_payload(), headers=headers).status_code == 400
+
+def test_score_factor_directions():
+    """Test scoring in both directions, with missing values scored as low risk."""
+    higher = {'thresholds': [3, 6], 'higher_is_better': True}
+    lower = {'thresholds': [0.1, 0.3], 'higher_is_better': False}
+    assert [decision_service.score_factor(v, higher) for v in (7, 4, 1, None)] == [1, 2, 3, 1]
+    assert [decision_service.score_factor(v, lower) for v in (0.05, 0.2, 0.5)] == [1, 2, 3]
+
+def test_decide_healthy_business_gets_low_tier():
+    """Test the tiering and the guardrail on the credit limit."""
+    decision = decision_service.decide(_payload()['data'])
+    assert decision['risk_tier'] == 'Low (Tier 1)'
+    assert decision['runway_months'] is None  # Revenue exceeds debits, so there is no burn
+    assert decision['credit_limit'] == min(decision['debt_remaining_capacity'], decision['debt_guardrail'])
+    assert decision['credit_approval_amount'] % decision_service.CONFIG['credit_rounding'] == 0
+
+def test_decide_stressed_business_gets_high_tier():
+    """Test that declining revenue, heavy debt and a short runway give the highest tier."""
+    decision = decision_service.decide(_payload(
+        revenue_recent_90d=150000, debits_recent_90d=600000,
+        most_recent_balance_across_bank_accounts=10000, existing_debt_payments_consideration=60000,
+        average_daily_balance=5000,
+    )['data'])
+    assert decision['risk_tier'] == 'High (Tier 4)'
+    assert decision['capital_approval_amount'] >= decision['capital_mca_approval_amount']
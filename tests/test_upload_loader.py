@@ -0,0 +1,63 @@
+import io
+import pytest
+
+from app import upload_loader
+
+@pytest.fixture
+def statement_csv():
+    """A statement CSV with a subset of the columns, as bytes."""
+    return (
+        b"Email,Request ID,Date,Description,Withdrawals,Deposits,Balance,Unexpected\n"
+        b"a@b.com,r1,2024-01-02,Payment,100.00,,900.00,x\n"
+        b"a@b.com,r1,2024-01-01,Deposit,,1000.00,1000.00,y\n"
+    )
+
+def test_parse_statement_csv_uses_declared_schema(statement_csv):
+    """Test that every column is typed as declared, regardless of its contents."""
+    table = upload_loader.parse_statement_csv(io.BytesIO(statement_csv))
+
+    assert table.schema == upload_loader.STATEMENT_SCHEMA
+    assert table.num_rows == 2
+    # Amounts stay strings; empty cells stay empty strings for the dbt casts
+    assert table.column('Withdrawals').to_pylist() == ['100.00', '']
+    # Missing declared columns are null, undeclared columns are dropped
+    assert table.column('Username').null_count == 2
+    assert 'Unexpected' not in table.column_names
+
+def test_load_statement_files_concatenates(statement_csv, tmp_path):
+    """Test that files from memory and disk are combined into one table."""
+    path = tmp_path / "statement.csv"
+    path.write_bytes(statement_csv)
+
+    table = upload_loader.load_statement_files([io.BytesIO(statement_csv), str(path)], max_workers=2)
+
+    assert table.num_rows == 4
+    assert table.schema == upload_loader.STATEMENT_SCHEMA
+
+def test_load_statement_files_empty():
+    """Test that no files yield an empty table with the declared schema."""
+    table = upload_loader.load_statement_files([])
+    assert table.num_rows == 0
+    assert table.schema == upload_loader.STATEMENT_SCHEMA
+
+def test_load_new_statement_files_skips_known_files(statement_csv, tmp_path, monkeypatch):
+    """Test that already-ingested files are neither parsed nor returned for bronze."""
+    known_file = io.BytesIO(statement_csv)
+    new_file = io.BytesIO(statement_csv.replace(b"r1", b"r2"))
+    known_fingerprint = upload_loader.fingerprint_file(known_file)
+    monkeypatch.setattr(
+        upload_loader, 'find_known_fingerprints',
+        lambda fps, root: {known_fingerprint: {'fingerprint': known_fingerprint, 'request_ids': ['r1']}}
+    )
+    parsed = []
+    original_parse = upload_loader.parse_statement_csv
+    monkeypatch.setattr(upload_loader, 'parse_statement_csv', lambda f: parsed.append(f) or original_parse(f))
+
+    table, reused_request_ids, records = upload_loader.load_new_statement_files([known_file, new_file, new_file], str(tmp_path))
+
+    assert parsed == [new_file]
+    assert table.num_rows == 2
+    assert reused_request_ids == {'r1'}
+    assert len(records) == 1
+    assert records[0]['request_ids'] == ['r2']
+    assert records[0]['source'] == 'upload'